@@ -1,54 +1,568 @@
 import os
+import io
+import re
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 
-RAW_DATA_DIR = "C:\\Users\\stefa\\OneDrive\\Documents\\Okanagan_WL\\Okanagan_WL\\Training_data_raw"
-OUTPUT_DIR = "C:\\Users\\stefa\\OneDrive\\Documents\\Okanagan_WL\\Okanagan_WL\\aggregated_athletes"
-SET_COUNT = 8  # Number of sets per row
+import store
+import rollups
+import records
+import workload
+import sessions
+import intensity
+import set_arrays
+import athlete_index
+import training_db
+import normalization
+import xlsx_stream
+import timing
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Next to this script unless overridden by the environment or the command line
+RAW_DATA_DIR = os.environ.get('OKANAGAN_WL_RAW_DIR', os.path.join(BASE_DIR, "Training_data_raw"))
+OUTPUT_DIR = os.environ.get('OKANAGAN_WL_OUTPUT_DIR', os.path.join(BASE_DIR, "aggregated_athletes"))
+SET_COUNT = 8  # Default number of sets per row when the header has no set columns
+SET_COLUMN_RE = re.compile(r'^Set (\d+) (Reps|Weight)$')
+WEEK_FILE_RE = re.compile(r'^\d{4}_.*\.xlsx$')  # <year>_<week>.xlsx
+MANIFEST_FILE = "_manifest.json"  # Lives in OUTPUT_DIR, tracks which workbooks produced which rows
+MANIFEST_VERSION = 1
+# Sub-directories of the output with each athlete's <athlete>.<version>.csv of prescriptions and of note
+# texts; the <athlete>.csv in the output itself holds the set rows (store.split_facts) and their version
+PRESCRIPTIONS_DIR = "prescriptions"
+NOTES_DIR = "notes"
+CSV_READ_ATTEMPTS = 3  # Reads of an athlete's CSVs before giving up while the aggregator keeps replacing them
 
-# Find all Excel files in the raw data directory
-excel_files = [f for f in os.listdir(RAW_DATA_DIR) if f.endswith('.xlsx') and (f.startswith('2025_') or f.startswith('2024_') or f.startswith('2026_'))]
 
-athlete_data = {}
+def list_week_files(raw_dir):
+    """Return the weekly workbook file names in the raw data directory, sorted by week."""
+    return sorted(f for f in os.listdir(raw_dir) if WEEK_FILE_RE.match(f))
 
-for file in excel_files:
-    week_name = file.split('.')[0]
-    file_path = os.path.join(RAW_DATA_DIR, file)
-    xls = pd.ExcelFile(file_path)
-    for sheet_name in xls.sheet_names:
-        df = pd.read_excel(xls, sheet_name=sheet_name)
-        if df.empty:
+
+def file_hash(file_path):
+    """SHA-256 of the file contents."""
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def athlete_csv_path(output_dir, athlete):
+    return os.path.join(output_dir, f"{athlete.replace(' ', '_')}.csv")
+
+
+def table_csv_paths(output_dir, athlete, version):
+    """The prescription and note CSVs of one version of an athlete's set CSV."""
+    name = f"{athlete.replace(' ', '_')}.{version}.csv"
+    return [os.path.join(output_dir, PRESCRIPTIONS_DIR, name), os.path.join(output_dir, NOTES_DIR, name)]
+
+
+def csv_versions(output_dir, athlete):
+    """Versions of an athlete's prescription CSVs on disk, oldest first."""
+    pattern = re.compile(re.escape(athlete.replace(' ', '_')) + r'\.(\d+)\.csv')
+    prescriptions_dir = os.path.join(output_dir, PRESCRIPTIONS_DIR)
+    names = os.listdir(prescriptions_dir) if os.path.isdir(prescriptions_dir) else []
+    return sorted(int(m.group(1)) for m in map(pattern.fullmatch, names) if m)
+
+
+def csv_version(output_dir, athlete):
+    """Version of the tables an athlete's set CSV refers to; None for a missing CSV or a flat one from before the split."""
+    try:
+        head = pd.read_csv(athlete_csv_path(output_dir, athlete), dtype=str, nrows=1)
+    except (OSError, pd.errors.EmptyDataError):
+        return None
+    return int(head['Version'].iloc[0]) if 'Version' in head.columns and len(head) else None
+
+
+def athlete_csv_paths(output_dir, athlete):
+    """The set CSV of an athlete and the prescription and note CSVs it refers to, in store.split_facts() order."""
+    version = csv_version(output_dir, athlete)
+    return [athlete_csv_path(output_dir, athlete)] + (table_csv_paths(output_dir, athlete, version) if version is not None else [])
+
+
+def write_athlete_csv(output_dir, athlete, agg_df):
+    """Write an athlete's flat rows (CSV strings) as its set, prescription and note CSVs.
+
+    The three are published as one unit: the prescriptions and notes go to files of a new version,
+    then the set CSV, which names that version in its Version column, is swapped in and the older
+    versions are removed. Readers of the old set CSV that lose the race read the new one
+    (read_athlete_csv).
+    """
+    sets, prescriptions, notes = store.split_facts(agg_df)
+    versions = csv_versions(output_dir, athlete)
+    version = versions[-1] + 1 if versions else 1
+    for path, table in zip(table_csv_paths(output_dir, athlete, version), [prescriptions, notes]):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table.to_csv(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+    path = athlete_csv_path(output_dir, athlete)
+    sets.assign(Version=version).to_csv(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    remove_table_csvs(output_dir, athlete, versions)
+
+
+def remove_table_csvs(output_dir, athlete, versions):
+    """Remove the prescription and note CSVs of some versions of an athlete."""
+    for version in versions:
+        for path in table_csv_paths(output_dir, athlete, version):
+            try:
+                os.remove(path)
+            except OSError:
+                # Still open in a reader on Windows, or already gone; the next write retries
+                pass
+
+
+def read_athlete_csv(output_dir, athlete):
+    """An athlete's flat rows as CSV strings, joined from its set CSV and the prescription and note CSVs it refers to.
+
+    A CSV written before the split, with no Version column, already holds the flat rows.
+    """
+    for attempt in range(CSV_READ_ATTEMPTS):
+        sets = pd.read_csv(athlete_csv_path(output_dir, athlete), dtype=str, keep_default_na=False)
+        if 'Version' not in sets.columns:
+            return sets
+        version = sets.pop('Version').iloc[0] if len(sets) else csv_versions(output_dir, athlete)[-1]
+        try:
+            prescriptions, notes = (pd.read_csv(p, dtype=str, keep_default_na=False) for p in table_csv_paths(output_dir, athlete, version))
+        except FileNotFoundError:
+            # Replaced by a newer version since the set CSV was read
+            if attempt == CSV_READ_ATTEMPTS - 1:
+                raise
+            continue
+        break
+    sets['Prescription'] = pd.to_numeric(sets['Prescription'])
+    for col in ['Prescription'] + [c for c in store.NOTE_COLUMNS.values() if c in prescriptions.columns]:
+        prescriptions[col] = pd.to_numeric(prescriptions[col])
+    return store.join_facts(sets, prescriptions, notes, missing='')
+
+
+def remove_athlete_csv(output_dir, athlete):
+    """Remove an athlete's CSVs; returns whether there were any."""
+    path = athlete_csv_path(output_dir, athlete)
+    existed = os.path.exists(path)
+    if existed:
+        os.remove(path)
+    remove_table_csvs(output_dir, athlete, csv_versions(output_dir, athlete))
+    return existed
+
+
+def set_slot_count(columns):
+    """Number of set slots in a sheet header: the highest 'Set N Reps'/'Set N Weight' found, else SET_COUNT."""
+    slots = [int(m.group(1)) for m in map(SET_COLUMN_RE.match, map(str, columns)) if m]
+    return max(slots) if slots else SET_COUNT
+
+
+def stacked_set_values(df, kind, set_count):
+    """Concatenate the 'Set i <kind>' columns set by set (set 1 for every row, then set 2, ...)."""
+    n = len(df)
+    parts = []
+    for i in range(1, set_count + 1):
+        col = f'Set {i} {kind}'
+        parts.append(df[col].to_numpy() if col in df.columns else np.full(n, None, dtype=object))
+    return np.concatenate(parts) if parts else np.empty(0, dtype=object)
+
+
+def process_sheet(df, week_name, sheet_name):
+    """Turn one athlete sheet into long format (one row per set), or None if the sheet is empty."""
+    if df.empty:
+        return None
+    df['Week'] = week_name
+    df['Athlete'] = sheet_name
+    # Skip rows where both Category and Exercise are empty or missing
+    df = df[~((df['Category'].isna() | (df['Category'].astype(str).str.strip() == '')) & (df['Exercise'].isna() | (df['Exercise'].astype(str).str.strip() == '')))]
+    # Melt sets to long format: always output a row for each prescribed set. The prescription
+    # columns are gathered once with a tiled row index (set-major, like stacking one copy per
+    # set) and the set values come from stacking the Set i Reps/Weight columns directly.
+    set_count = set_slot_count(df.columns)
+    rows = np.tile(np.arange(len(df)), set_count)
+    data = {c: df[c].array.take(rows) for c in df.columns if not SET_COLUMN_RE.match(str(c))}
+    data['Set'] = np.repeat(np.arange(1, set_count + 1), len(df))
+    data['Set_Reps'] = stacked_set_values(df, 'Reps', set_count)
+    data['Set_Weight'] = stacked_set_values(df, 'Weight', set_count)
+    # Reorder columns
+    cols = ['Athlete', 'Week', 'Day of the Week', 'Category', 'Exercise', 'Reps', 'Sets', 'Set', 'Set_Reps', 'Set_Weight']
+    cols = [c for c in cols if c in data] + [c for c in data if c not in cols]
+    return pd.DataFrame({c: data[c] for c in cols})
+
+
+def iter_workbook(file_path, week_name, sheet_names=None):
+    """Stream a weekly workbook sheet by sheet, yielding (athlete, long-format DataFrame).
+
+    Only one sheet is in memory at a time. Sheets without the required header columns are
+    reported and skipped instead of failing the whole run.
+    """
+    for sheet_name, rows in xlsx_stream.iter_sheets(file_path, sheet_names):
+        try:
+            df = xlsx_stream.read_sheet(rows)
+        except ValueError as e:
+            print(f"Skipping {os.path.basename(file_path)} / {sheet_name}: {e}")
+            continue
+        long_df = process_sheet(df, week_name, sheet_name) if df is not None else None
+        if long_df is not None:
+            yield sheet_name, long_df
+
+
+def process_workbook(file_path, week_name):
+    """Parse one weekly workbook into {athlete: long-format DataFrame (one row per set)}."""
+    return dict(iter_workbook(file_path, week_name))
+
+
+def _parse_workbook_task(task):
+    """Process pool worker: parse a whole workbook."""
+    file_path, week_name = task
+    return process_workbook(file_path, week_name)
+
+
+def _parse_sheet_task(task):
+    """Process pool worker: parse a single (workbook, sheet) pair."""
+    file_path, week_name, sheet_name = task
+    return next(iter_workbook(file_path, week_name, [sheet_name]), (sheet_name, None))[1]
+
+
+def iter_parsed(raw_dir, files, workers=1):
+    """Parse workbooks and yield (file, athlete, long DataFrame) in the order of `files`.
+
+    Serially, sheets are parsed as they are consumed. With workers > 1 the parsing runs in a
+    process pool: whole workbooks are the unit of work while there are enough of them to keep
+    every worker busy; otherwise (e.g. an incremental run with one new week) each athlete sheet
+    is its own task. Results are yielded in submission order so the output matches a serial run.
+    """
+    if workers <= 1 or not files:
+        for file in files:
+            for athlete, long_df in iter_workbook(os.path.join(raw_dir, file), file.split('.')[0]):
+                yield file, athlete, long_df
+        return
+
+    # Workers forked while a trace is recording must not inherit it (memory tracing would slow parsing down)
+    with ProcessPoolExecutor(max_workers=workers, initializer=timing.stop) as pool:
+        if len(files) >= workers:
+            tasks = [(os.path.join(raw_dir, file), file.split('.')[0]) for file in files]
+            for file, frames in zip(files, pool.map(_parse_workbook_task, tasks)):
+                for athlete, long_df in frames.items():
+                    yield file, athlete, long_df
+            return
+
+        tasks = []
+        for file in files:
+            file_path = os.path.join(raw_dir, file)
+            tasks.extend((file, (file_path, file.split('.')[0], sheet_name)) for sheet_name in xlsx_stream.sheet_names(file_path))
+        for (file, (_, _, sheet_name)), long_df in zip(tasks, pool.map(_parse_sheet_task, [t for _, t in tasks])):
+            if long_df is not None:
+                yield file, sheet_name, long_df
+
+
+def load_manifest(output_dir):
+    """Load the manifest of previously aggregated workbooks, or None if missing/outdated."""
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def manifest_entry(file_path, athlete_rows, sha256=None):
+    """Describe a workbook (size, mtime, content hash) and the rows it produced per athlete ({athlete: row count})."""
+    st = os.stat(file_path)
+    return {
+        'size': st.st_size,
+        'mtime': st.st_mtime,
+        'sha256': sha256 or file_hash(file_path),
+        'rows': dict(athlete_rows),
+    }
+
+
+def changed_files(raw_dir, files, manifest):
+    """Split workbooks into (changed, unchanged) against the manifest.
+
+    Size + mtime match is trusted as unchanged; otherwise the content hash decides,
+    so a re-synced but identical file is not re-parsed.
+    """
+    changed, unchanged = [], []
+    known = manifest['files']
+    for file in files:
+        entry = known.get(file)
+        if entry is None:
+            changed.append(file)
+            continue
+        file_path = os.path.join(raw_dir, file)
+        st = os.stat(file_path)
+        if st.st_size == entry['size'] and st.st_mtime == entry['mtime']:
+            unchanged.append(file)
+        elif st.st_size == entry['size'] and file_hash(file_path) == entry['sha256']:
+            entry['mtime'] = st.st_mtime
+            unchanged.append(file)
+        else:
+            changed.append(file)
+    return changed, unchanged
+
+
+def as_csv_strings(df):
+    """Round-trip a frame through CSV text so spliced rows keep the exact formatting of a full run."""
+    return pd.read_csv(io.StringIO(df.to_csv(index=False)), dtype=str, keep_default_na=False)
+
+
+def write_derived(output_dir, athlete, store_df, index, since_week=None):
+    """Write the tables derived from an athlete's typed store frame and update its index entry.
+
+    With `since_week` (only weeks after it changed) the PR history, the workload table and the
+    session table are extended from those weeks instead of being rebuilt from every set.
+    """
+    with timing.span('rollup', athlete=athlete, rows=len(store_df)):
+        rollups.write_rollup(output_dir, athlete, store_df)
+    with timing.span('records', athlete=athlete) as info:
+        if since_week is not None and records.has_records(output_dir, athlete):
+            new_rows = store_df[store_df['Week'].astype(str) > since_week]
+            history = records.extend_history(records.read_records(output_dir, athlete), new_rows)
+        else:
+            new_rows = store_df
+            history = records.pr_history(store_df)
+        records.write_records(output_dir, athlete, history)
+        info['rows'] = len(new_rows)
+    with timing.span('workload', athlete=athlete) as info:
+        if since_week is not None and workload.has_workload(output_dir, athlete):
+            table = workload.extend_workload(workload.read_workload(output_dir, athlete), new_rows)
+        else:
+            table = workload.athlete_workload(store_df)
+        workload.write_workload(output_dir, athlete, table)
+        info['rows'] = len(table)
+    with timing.span('sessions', athlete=athlete) as info:
+        if since_week is not None and sessions.has_sessions(output_dir, athlete):
+            table = sessions.extend_sessions(sessions.read_sessions(output_dir, athlete), new_rows)
+        else:
+            table = sessions.session_table(store_df)
+        sessions.write_sessions(output_dir, athlete, table)
+        info['rows'] = len(table)
+    with timing.span('index_entry', athlete=athlete):
+        index[athlete] = athlete_index.index_entry(athlete, store_df)
+
+
+def has_derived(output_dir, athlete, index):
+    """Whether an athlete's derived outputs exist, split into set and prescription tables, and were built
+    with the current normalization rules and 1RM formula."""
+    return (store.has_athlete(output_dir, athlete) and store.is_split(output_dir, athlete)
+            and csv_version(output_dir, athlete) is not None and rollups.has_rollup(output_dir, athlete)
+            and records.has_records(output_dir, athlete) and workload.has_workload(output_dir, athlete)
+            and sessions.has_sessions(output_dir, athlete)
+            and index.get(athlete, {}).get('normalization') == normalization.NORMALIZATION_VERSION
+            and index.get(athlete, {}).get('e1rm_formula') == intensity.E1RM_FORMULA)
+
+
+class AthleteCsvWriter:
+    """Appends athlete chunks to flat <athlete>.csv.parts files as they are parsed; publish() splits them.
+
+    A chunk that brings columns the file does not have yet rewrites that athlete's file with the
+    widened header, so the result matches concatenating all chunks at once.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.columns = {}  # athlete -> header of the file written so far
+
+    def tmp_path(self, athlete):
+        return athlete_csv_path(self.output_dir, athlete) + '.parts'
+
+    def append(self, athlete, df):
+        path = self.tmp_path(athlete)
+        columns = self.columns.get(athlete)
+        if columns is None:
+            df.to_csv(path, index=False)
+            self.columns[athlete] = list(df.columns)
+        elif all(c in columns for c in df.columns):
+            df.reindex(columns=columns).to_csv(path, mode='a', header=False, index=False)
+        else:
+            existing = pd.read_csv(path, dtype=str, keep_default_na=False)
+            widened = pd.concat([existing, as_csv_strings(df)], ignore_index=True).fillna('')
+            widened.to_csv(path, index=False)
+            self.columns[athlete] = list(widened.columns)
+
+    def publish(self):
+        """Write each athlete's CSVs (write_athlete_csv) from its parts file and yield (athlete, flat rows)."""
+        for athlete in self.columns:
+            with timing.span('read_csv', athlete=athlete) as info:
+                agg_df = pd.read_csv(self.tmp_path(athlete), dtype=str, keep_default_na=False)
+                info['rows'] = len(agg_df)
+            with timing.span('write_csv', athlete=athlete, rows=len(agg_df)):
+                write_athlete_csv(self.output_dir, athlete, agg_df)
+            os.remove(self.tmp_path(athlete))
+            yield athlete, agg_df
+
+
+def run_full(raw_dir, output_dir, workers=1):
+    """Re-parse every workbook and rewrite all athlete outputs and the manifest.
+
+    Sheets stream from the workbooks straight into per-athlete parts files, and the athlete CSVs,
+    Parquet store and rollups are then built one athlete at a time, so memory is bounded by the
+    largest sheet or athlete rather than by the whole archive.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    writer = AthleteCsvWriter(output_dir)
+    file_rows = {}
+    # Parsing happens in the workers; this span is parse wall time plus the CSV appends
+    with timing.span('parse', workers=workers) as info:
+        for file, athlete, df in iter_parsed(raw_dir, list_week_files(raw_dir), workers):
+            writer.append(athlete, df)
+            file_rows.setdefault(file, {})[athlete] = len(df)
+        info['rows'] = sum(n for rows in file_rows.values() for n in rows.values())
+
+    manifest = {'version': MANIFEST_VERSION, 'files': {}}
+    for file in list_week_files(raw_dir):
+        manifest['files'][file] = manifest_entry(os.path.join(raw_dir, file), file_rows.get(file, {}))
+
+    # Build each athlete's typed Parquet store, rollup and index entry from its rows
+    index = {}
+    for athlete, agg_df in writer.publish():
+        with timing.span('store', athlete=athlete, rows=len(agg_df)):
+            store_df = store.write_athlete(output_dir, athlete, agg_df)
+        write_derived(output_dir, athlete, store_df, index)
+        print(f"Saved: {athlete_csv_path(output_dir, athlete)} ({len(agg_df)} rows)")
+    with timing.span('save_index'):
+        athlete_index.save_index(output_dir, index)
+    with timing.span('training_db'):
+        training_db.build(output_dir)
+    with timing.span('set_arrays'):
+        set_arrays.build(output_dir)
+    save_manifest(output_dir, manifest)
+
+
+def run_incremental(raw_dir, output_dir, workers=1):
+    """Re-parse only new or modified workbooks and splice their rows into the athlete outputs.
+
+    Falls back to a full rebuild when there is no usable manifest or an athlete CSV is missing.
+    """
+    manifest = load_manifest(output_dir)
+    if manifest is None:
+        print("No manifest found, running full aggregation.")
+        return run_full(raw_dir, output_dir, workers)
+
+    files = list_week_files(raw_dir)
+    with timing.span('changed_files', files=len(files)):
+        changed, _ = changed_files(raw_dir, files, manifest)
+    removed = [f for f in manifest['files'] if f not in files]
+    # Athletes aggregated before the Parquet store/rollups/index existed, or with older normalization
+    # rules or another 1RM formula, get them (re)written from their CSV
+    index = athlete_index.load_index(output_dir) or {}
+    missing_store = {a for e in manifest['files'].values() for a in e['rows'] if not has_derived(output_dir, a, index)}
+    if not changed and not removed and not missing_store:
+        if not training_db.is_current(output_dir):
+            training_db.build(output_dir)
+        if not set_arrays.is_current(output_dir):
+            set_arrays.build(output_dir)
+        save_manifest(output_dir, manifest)  # Persist refreshed mtimes
+        print("No new or modified workbooks.")
+        return
+
+    # Athletes that had rows from the stale weeks must be rewritten even if they are gone now
+    stale_weeks = set()
+    affected = set(missing_store)
+    for file in changed + removed:
+        stale_weeks.add(file.split('.')[0])
+        affected.update(manifest['files'].get(file, {}).get('rows', {}))
+    for file in removed:
+        del manifest['files'][file]
+
+    new_rows = {}
+    file_rows = {file: {} for file in changed}
+    print(f"Parsing: {', '.join(changed) or 'nothing'}")
+    with timing.span('parse', workers=workers) as info:
+        for file, athlete, df in iter_parsed(raw_dir, changed, workers):
+            new_rows.setdefault(athlete, []).append(as_csv_strings(df))
+            file_rows[file][athlete] = len(df)
+        info['rows'] = sum(n for rows in file_rows.values() for n in rows.values())
+    for file, athlete_rows in file_rows.items():
+        manifest['files'][file] = manifest_entry(os.path.join(raw_dir, file), athlete_rows)
+    affected.update(new_rows)
+
+    for athlete in sorted(affected):
+        out_path = athlete_csv_path(output_dir, athlete)
+        expected = any(athlete in e['rows'] and f.split('.')[0] not in stale_weeks for f, e in manifest['files'].items())
+        if expected and not os.path.exists(out_path):
+            print(f"Missing output {out_path}, running full aggregation.")
+            return run_full(raw_dir, output_dir, workers)
+        with timing.span('splice', athlete=athlete) as info:
+            parts = []
+            if os.path.exists(out_path):
+                existing = read_athlete_csv(output_dir, athlete)
+                parts.append(existing[~existing['Week'].isin(stale_weeks)])
+            parts.extend(new_rows.get(athlete, []))
+            agg_df = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+            info['rows'] = len(agg_df)
+        if agg_df.empty:
+            store.remove_athlete(output_dir, athlete)
+            rollups.remove_rollup(output_dir, athlete)
+            records.remove_records(output_dir, athlete)
+            workload.remove_workload(output_dir, athlete)
+            sessions.remove_sessions(output_dir, athlete)
+            index.pop(athlete, None)
+            if remove_athlete_csv(output_dir, athlete):
+                print(f"Removed: {out_path} (no rows left)")
             continue
-        df['Week'] = week_name
-        df['Athlete'] = sheet_name
-        # Skip rows where both Category and Exercise are empty or missing
-        df = df[~((df['Category'].isna() | (df['Category'].astype(str).str.strip() == '')) & (df['Exercise'].isna() | (df['Exercise'].astype(str).str.strip() == '')))]
-        # Melt sets to long format: always output a row for each prescribed set
-        set_rows = []
-        for i in range(1, SET_COUNT + 1):
-            reps_col = f'Set {i} Reps'
-            weight_col = f'Set {i} Weight'
-            temp = df.copy()
-            temp['Set'] = i
-            temp['Set_Reps'] = temp[reps_col] if reps_col in df.columns else None
-            temp['Set_Weight'] = temp[weight_col] if weight_col in df.columns else None
-            set_rows.append(temp)
-        long_df = pd.concat(set_rows, ignore_index=True)
-        # Drop original set columns
-        drop_cols = [f'Set {i} Reps' for i in range(1, SET_COUNT+1)] + [f'Set {i} Weight' for i in range(1, SET_COUNT+1)]
-        long_df = long_df.drop(columns=[c for c in drop_cols if c in long_df.columns])
-        # Reorder columns
-        cols = ['Athlete', 'Week', 'Day of the Week', 'Category', 'Exercise', 'Reps', 'Sets', 'Set', 'Set_Reps', 'Set_Weight']
-        cols = [c for c in cols if c in long_df.columns] + [c for c in long_df.columns if c not in cols]
-        long_df = long_df[cols]
-        athlete_data.setdefault(sheet_name, []).append(long_df)
-
-# Save each athlete's aggregated data as CSV
-for athlete, dfs in athlete_data.items():
-    agg_df = pd.concat(dfs, ignore_index=True)
-    out_path = os.path.join(OUTPUT_DIR, f"{athlete.replace(' ', '_')}.csv")
-    agg_df.to_csv(out_path, index=False)
-    print(f"Saved: {out_path} ({len(agg_df)} rows)")
-
-print("Aggregation complete.")
\ No newline at end of file
+        # Keep weeks in the same order as a full run; stable sort preserves row order within a week
+        with timing.span('write_csv', athlete=athlete, rows=len(agg_df)):
+            agg_df = agg_df.sort_values('Week', kind='mergesort').fillna('')
+            write_athlete_csv(output_dir, athlete, agg_df)
+        # New weeks after everything the athlete had so far only extend the PR history; athletes whose
+        # derived tables are missing or were built with other rules are rebuilt from every set
+        last_week = index.get(athlete, {}).get('last_week')
+        extend = last_week and stale_weeks and min(stale_weeks) > last_week and athlete not in missing_store
+        since_week = last_week if extend else None
+        with timing.span('store', athlete=athlete, rows=len(agg_df)):
+            store_df = store.write_athlete(output_dir, athlete, agg_df)
+        write_derived(output_dir, athlete, store_df, index, since_week)
+        print(f"Saved: {out_path} ({len(agg_df)} rows)")
+    with timing.span('save_index'):
+        athlete_index.save_index(output_dir, index)
+    with timing.span('training_db', athletes=len(affected)):
+        training_db.update(output_dir, sorted(affected))
+    with timing.span('set_arrays'):
+        set_arrays.build(output_dir)
+    save_manifest(output_dir, manifest)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate weekly training workbooks into per-athlete CSVs and a Parquet store.")
+    parser.add_argument('--full', action='store_true', help="Re-parse every workbook instead of only new or modified ones.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Number of worker processes for workbook parsing (1 = serial).")
+    parser.add_argument('--raw-dir', default=RAW_DATA_DIR, help="Folder of the weekly workbooks (default: $OKANAGAN_WL_RAW_DIR or ./Training_data_raw).")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help="Folder of the aggregated outputs (default: $OKANAGAN_WL_OUTPUT_DIR or ./aggregated_athletes).")
+    parser.add_argument('--e1rm-formula', choices=list(intensity.E1RM_FORMULAS), default=intensity.E1RM_FORMULA,
+                        help="Formula of the estimated 1RM stored for every set (default: $OKANAGAN_WL_E1RM_FORMULA or epley).")
+    parser.add_argument('--trace', help="Append timing spans (seconds, rows, memory delta per stage) to this JSON-lines file and print a summary.")
+    args = parser.parse_args()
+    intensity.E1RM_FORMULA = args.e1rm_formula
+
+    if args.trace:
+        timing.start(memory=True)
+    try:
+        with timing.span('aggregate', full=args.full):
+            if args.full:
+                run_full(args.raw_dir, args.output_dir, args.workers)
+            else:
+                run_incremental(args.raw_dir, args.output_dir, args.workers)
+    finally:
+        trace = timing.stop()
+        if trace is not None:
+            timing.write_trace(trace, args.trace)
+            print(timing.summary(trace).to_string(index=False))
+    print("Aggregation complete.")
+
+
+if __name__ == "__main__":
+    main()
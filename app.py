@@ -2,57 +2,31 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import streamlit as st
 import pandas as pd
-import os
+import data_layer
+import metrics
+import normalization
+import sessions
+import timing
 
 # Set the app to wide layout mode
 # st.set_page_config(layout="wide")
 
 
 def load_data_from_folder(folder_path):
-    """Load all Excel files from the specified folder as a dictionary of week-wise data."""
-    excel_files = [f for f in os.listdir(folder_path) if f.endswith('.xlsx') and (f.startswith('2025_') or f.startswith('2024_'))]
-    weeks_data = {}
-    for file in excel_files:
-        week_name = file.split('.')[0]
-        try:
-            weeks_data[week_name] = pd.read_excel(os.path.join(folder_path, file), sheet_name=None)
-        except Exception as e:
-            st.error(f"Error loading {file}: {e}")
-    return weeks_data
+    """Lazy week-wise view of the Excel files in the specified folder: {week: {athlete: DataFrame}}.
+
+    Only file and sheet names are read until a sheet is accessed; parsed sheets are cached and
+    shared across sessions (see data_layer).
+    """
+    return data_layer.WorkbookCatalog(folder_path)
 
 def calculate_metrics(data):
     """Calculate adherence, total volume, and missed lifts."""
-    adherence = []
-    total_volume = []
-    missed_lifts = []
-    total_executed_sets = []
-
-
-    for _, row in data.iterrows():
-        planned_sets = row.get('Sets', 0)
-        completed_sets = sum(pd.notna(row.get(f'Set {i} Reps')) for i in range(1, 9))
-        adherence.append(completed_sets / planned_sets if planned_sets > 0 else 0)
-        total_executed_sets.append(completed_sets)  # Count executed sets
-
-
-        volume = sum(
-            (row.get(f'Set {i} Reps', 0) or 0) * (row.get(f'Set {i} Weight', 0) or 0)
-            for i in range(1, 9)
-            if pd.notna(row.get(f'Set {i} Reps')) and pd.notna(row.get(f'Set {i} Weight'))
-        )
-        total_volume.append(volume)
-
-        missed = sum(
-            max(0, (row.get('Reps', 0) or 0) - (row.get(f'Set {i} Reps', 0) or 0))
-            for i in range(1, 9)
-            if pd.notna(row.get(f'Set {i} Reps'))
-        )
-        missed_lifts.append(missed)
-
-    data['Adherence'] = adherence
-    data['Total Volume'] = total_volume
-    data['Missed Lifts'] = missed_lifts
-    data['Total_Executed_Sets'] = total_executed_sets  # Add column here
+    row = metrics.row_metrics(data)
+    data['Adherence'] = row['Adherence']
+    data['Total Volume'] = row['Total Volume']
+    data['Missed Lifts'] = row['Missed Lifts']
+    data['Total_Executed_Sets'] = row['Total_Executed_Sets']  # Add column here
 
     return data
 
@@ -65,36 +39,23 @@ def calculate_personal_records(data, week_name):
     # Define categories of interest
     categories_of_interest = ["Snatch", "Clean", "Jerk", "Clean and Jerk", "Back Squat", "Front Squat"]
 
-    # Map alternative names for Back Squat and Front Squat
-    squat_mapping = {
-        "Front Squat": ["Front squat", "Front Squat", "Gambe avanti", "Gambe Avanti"],
-        "Back Squat": ["Back squat", "Back Squat", "Gambe dietro", "Gambe Dietro"]
-    }
+    # Squats are told apart by exercise; canonical names cover 'Gambe avanti'/'Gambe dietro' and other spellings
+    squat_exercises = ["Front Squat", "Back Squat"]
+    exercises = normalization.normalize(data['Exercise'], 'Exercise')
+    categories = normalization.normalize(data['Category'], 'Category')
 
     pr_data = []
+    # Heaviest successful set per row, skipping failed (Reps = 0) and empty sets
+    max_weights = metrics.row_metrics(data)['Max Weight']
 
     for category in categories_of_interest:
-        # Handle squats with alternative names
-        if category in squat_mapping:
-            category_data = data[data['Exercise'].isin(squat_mapping[category]) & (data['Reps'] == 1)]
+        if category in squat_exercises:
+            category_data = data[(exercises == category) & (data['Reps'] == 1)]
         else:
-            category_data = data[(data['Category'] == category) & (data['Reps'] == 1)]
-
-        max_weight = 0  # Initialize max weight for the category
-        exercise_name = None  # Initialize exercise name
-
-        for _, row in category_data.iterrows():
-            # Extract weights from the sets, skipping invalid, failed, or NaN values
-            weights = [
-                row.get(f'Set {i} Weight', 0)
-                for i in range(1, 9)
-                if pd.notna(row.get(f'Set {i} Weight')) and pd.notna(row.get(f'Set {i} Reps')) and row.get(f'Set {i} Reps') > 0
-            ]
-            if weights:  # Check if there are valid weights
-                row_max_weight = max(weights)
-                if row_max_weight > max_weight:
-                    max_weight = row_max_weight
-                    exercise_name = row['Exercise']  # Store the exercise name
+            category_data = data[(categories == normalization.canonical('Category', category)) & (data['Reps'] == 1)]
+
+        max_weight, best_row = metrics.best_lift(max_weights[category_data.index])
+        exercise_name = category_data.loc[best_row, 'Exercise'] if best_row is not None else None
 
         if max_weight > 0:  # Only add if a valid max weight exists
             pr_data.append({
@@ -108,6 +69,21 @@ def calculate_personal_records(data, week_name):
 
 
 
+def calculate_athlete_personal_records(weeks_data, athlete_name):
+    """Best personal record per category over all weeks for an athlete."""
+    pr_table = pd.DataFrame()
+    # Loop through all weeks to calculate PRs
+    for week_name, week_data in weeks_data.items():
+        if athlete_name in week_data:
+            athlete_week_data = week_data[athlete_name]
+            pr_week_table = calculate_personal_records(athlete_week_data, week_name)
+            pr_table = pd.concat([pr_table, pr_week_table], ignore_index=True)
+
+    # Drop duplicates to show only the highest PRs for each category
+    pr_table = pr_table.sort_values(by=["Category", "Personal Record (1RM Weight)"], ascending=False)
+    return pr_table.drop_duplicates(subset="Category", keep="first")
+
+
 def calculate_training_sessions_per_week(weeks_data, athlete_name):
     """
     Calculate the number of training sessions actually performed by the athlete for each week.
@@ -125,13 +101,9 @@ def calculate_training_sessions_per_week(weeks_data, athlete_name):
         if athlete_name in week_data:
             athlete_data = week_data[athlete_name]
 
-            # Group by 'Day of the Week' to identify distinct training sessions
+            # Each 'Day of the Week' is a session; count those where any set has actual completed reps
             if 'Day of the Week' in athlete_data.columns:
-                performed_sessions = athlete_data.groupby('Day of the Week').apply(
-                    lambda group: any(
-                        pd.notna(group[f'Set {i} Reps']).any() for i in range(1, 9)
-                    )
-                ).sum()  # Count sessions where any set has actual completed reps
+                performed_sessions = sessions.sheet_sessions(athlete_data)['Performed'].sum()
                 sessions_per_week.append({'Week': week_name, 'Performed Sessions': int(performed_sessions)})
             else:
                 sessions_per_week.append({'Week': week_name, 'Performed Sessions': 0})
@@ -180,37 +152,7 @@ def calculate_all_category_metrics(data):
     including categories with prescribed sets = 0.
     """
     categories = ["Snatch", "Clean", "Jerk", "Clean and Jerk", "Squat", "Accessory", "Clean pull", "Snatch pull"]
-    metrics = []
-
-    for category in categories:
-        category_data = data[data['Category'] == category]
-        total_prescribed_sets = category_data['Sets'].sum()
-
-        total_executed_sets = category_data['Total_Executed_Sets'].sum()
-        total_missed_lifts = category_data['Missed Lifts'].sum()
-        total_lifted_weight = sum(
-            sum((row[f'Set {i} Reps'] or 0) * (row[f'Set {i} Weight'] or 0)
-                for i in range(1, 9)
-                if pd.notna(row[f'Set {i} Reps']) and pd.notna(row[f'Set {i} Weight']))
-            for _, row in category_data.iterrows()
-        )
-        total_reps = sum(
-            sum(row[f'Set {i} Reps'] or 0
-                for i in range(1, 9)
-                if pd.notna(row[f'Set {i} Reps']))
-            for _, row in category_data.iterrows()
-        )
-        average_load = round(total_lifted_weight / total_reps, 2) if total_reps > 0 else 0
-
-        metrics.append({    
-            'Category': category,
-            'Total Prescribed Sets': round(total_prescribed_sets, 2),
-            'Total Executed Sets': round(total_executed_sets, 2),
-            'Total Missed Lifts': round(total_missed_lifts, 2),
-            'Average Load Lifted': round(average_load, 2) if total_prescribed_sets > 0 else 0
-        })
-
-    return pd.DataFrame(metrics)
+    return metrics.category_metrics(data, categories)
 
 
 def split_sessions(data):
@@ -218,18 +160,13 @@ def split_sessions(data):
     Split data into training sessions based on 'Day of the Week'.
     Only return sessions with prescribed sets > 0.
     """
-    sessions = []
-
     if 'Day of the Week' not in data.columns:
         raise ValueError("'Day of the Week' column is missing from the data.")
 
-    # Group rows by 'Day of the Week'
-    for day, session_data in data.groupby('Day of the Week'):
-        # Filter out sessions with no prescribed sets
-        if session_data['Sets'].sum() > 0:
-            sessions.append(session_data.reset_index(drop=True))
-    
-    return sessions
+    # Prescribed sets of every day in one pass; only days with some are split out
+    prescribed = sessions.sheet_sessions(data)['Prescribed_Sets']
+    days = prescribed.index[prescribed > 0]
+    return [session_data.reset_index(drop=True) for day, session_data in data[data['Day of the Week'].isin(days)].groupby('Day of the Week')]
 
 def calculate_session_metrics(session):
     """Calculate metrics for a single training session grouped by category."""
@@ -254,6 +191,11 @@ def cumulate_athlete_data(weeks_data, athlete_name):
 # Streamlit app
 st.title("Athlete Training Progress Viewer")
 
+# Optional debug panel: timing spans of this run's data loading and metric computation (sidebar)
+show_timings = st.sidebar.checkbox("Show timings", key="show_timings")
+if show_timings:
+    timing.start(memory=st.sidebar.checkbox("Trace memory (slower)", key="trace_memory"))
+
 # Select folder containing Excel files
 folder_path = st.text_input("Enter the folder path containing Excel files:")
 
@@ -261,6 +203,7 @@ if folder_path:
     try:
         # Load data
         weeks_data = load_data_from_folder(folder_path)
+        data_version = weeks_data.identity()
 
         # Tabs for different views
         tab1, tab2 = st.tabs(["Weekly View", "Athlete Overview"])
@@ -284,9 +227,13 @@ if folder_path:
             st.subheader("Individual session view")
             # Display weekly metrics for all exercise categories
             try:
-                athlete_data = calculate_metrics(athlete_data)  # Ensure metrics are calculated
+                with timing.span('calculate_metrics', rows=len(athlete_data)):
+                    athlete_data = calculate_metrics(athlete_data)  # Ensure metrics are calculated
                 st.write("### Weekly Metrics by Exercise Category")
-                weekly_metrics = calculate_all_category_metrics(athlete_data)
+                weekly_metrics = data_layer.memoize(
+                    'weekly_category_metrics', data_version, (selected_week, selected_athlete),
+                    lambda: calculate_all_category_metrics(athlete_data)
+                )
 
                 if not weekly_metrics.empty:
                     # Format specific columns for display with 2 decimals
@@ -303,12 +250,13 @@ if folder_path:
 
             # Split sessions and display data for each session
             try:
-                sessions = split_sessions(athlete_data)
+                with timing.span('split_sessions', rows=len(athlete_data)):
+                    day_sessions = split_sessions(athlete_data)
 
-                if not sessions:
+                if not day_sessions:
                     st.warning("No prescribed training sessions for this week.")
                 else:
-                    for i, session in enumerate(sessions):
+                    for i, session in enumerate(day_sessions):
                         st.write(f"### Session {i + 1}")
                         st.write("#### Training Data")
                         st.dataframe(session.fillna(''))  # Replace None/NaN with empty cells
@@ -333,10 +281,17 @@ if folder_path:
 
             # Select athlete
             athlete_names = sorted(list(set(sheet_name for week in weeks_data.values() for sheet_name in week.keys())))
-            selected_athlete = st.selectbox("Select an athlete:", athlete_names)
+            # Nothing is preselected: an athlete's sheets are only loaded once someone is picked
+            selected_athlete = st.selectbox("Select an athlete:", athlete_names, index=None, placeholder="Choose an athlete")
 
             # Cumulate data
-            cumulated_data = cumulate_athlete_data(weeks_data, selected_athlete)
+            if selected_athlete is None:
+                cumulated_data = pd.DataFrame()
+            else:
+                cumulated_data = data_layer.memoize(
+                    'cumulate_athlete_data', data_version, (selected_athlete,),
+                    lambda: cumulate_athlete_data(weeks_data, selected_athlete)
+                ).copy(deep=False)
 
             if not cumulated_data.empty:
                 # Select category
@@ -353,49 +308,20 @@ if folder_path:
                         filtered_data = cumulated_data[cumulated_data['Category'] == selected_category]
 
                     if not filtered_data.empty:
-                        # Calculate total lifted weight, reps, and executed sets
-                        filtered_data['Total Lifted Weight'] = filtered_data.apply(
-                            lambda row: sum(
-                                (row[f'Set {i} Reps'] or 0) * (row[f'Set {i} Weight'] or 0)
-                                for i in range(1, 9)
-                                if pd.notna(row[f'Set {i} Reps']) and pd.notna(row[f'Set {i} Weight']) and row[f'Set {i} Reps'] > 0
-                            ),
-                            axis=1
-                        )
-                        filtered_data['Total Reps'] = filtered_data.apply(
-                            lambda row: sum(
-                                (row[f'Set {i} Reps'] or 0)
-                                for i in range(1, 9)
-                                if pd.notna(row[f'Set {i} Reps']) and pd.notna(row[f'Set {i} Weight']) and row[f'Set {i} Reps'] > 0
-                            ),
-                            axis=1
-                        )
-                        filtered_data['Total Executed Sets'] = filtered_data.apply(
-                            lambda row: sum(
-                                pd.notna(row[f'Set {i} Reps']) and pd.notna(row[f'Set {i} Weight']) and row[f'Set {i} Reps'] > 0
-                                for i in range(1, 9)
-                            ),
-                            axis=1
-                        )
-                        filtered_data['Average Load'] = filtered_data['Total Lifted Weight'] / filtered_data['Total Reps']
-                        filtered_data['Average Load'] = filtered_data['Average Load'].fillna(0)
-
-                        # Calculate max weight for each row (ignore failed reps where reps = 0)
-                        filtered_data['Max Weight'] = filtered_data.apply(
-                            lambda row: max(
-                                [(row[f'Set {i} Weight'] or 0) for i in range(1, 9)
-                                if pd.notna(row[f'Set {i} Weight']) and pd.notna(row[f'Set {i} Reps']) and row[f'Set {i} Reps'] > 0] or [0]
-                            ),
-                            axis=1
-                        )
-
-                        # Group by week
-                        weekly_metrics = filtered_data.groupby('Week').agg(
-                            Total_Lifted_Weight=('Total Lifted Weight', 'sum'),
-                            Total_Reps=('Total Reps', 'sum'),
-                            Total_Executed_Sets=('Total Executed Sets', 'sum'),
-                            Max_Weight=('Max Weight', 'max')  # Personal record for the week
-                        ).reset_index()
+                        # Calculate total lifted weight, reps, executed sets, average load and
+                        # max weight (failed reps where reps = 0 are ignored) in one pass
+                        with timing.span('overview_metrics', rows=len(filtered_data)):
+                            row_metrics = metrics.row_metrics(filtered_data)
+                            overview_columns = ['Total Lifted Weight', 'Total Reps', 'Total Executed Sets', 'Average Load', 'Max Weight']
+                            filtered_data = filtered_data.assign(**{c: row_metrics[c] for c in overview_columns})
+
+                            # Group by week
+                            weekly_metrics = filtered_data.groupby('Week').agg(
+                                Total_Lifted_Weight=('Total Lifted Weight', 'sum'),
+                                Total_Reps=('Total Reps', 'sum'),
+                                Total_Executed_Sets=('Total Executed Sets', 'sum'),
+                                Max_Weight=('Max Weight', 'max')  # Personal record for the week
+                            ).reset_index()
 
                         # Calculate weighted average load
                         weekly_metrics['Average_Load'] = weekly_metrics['Total_Lifted_Weight'] / weekly_metrics['Total_Reps']
@@ -444,14 +370,12 @@ if folder_path:
                             title=f"Average Load, Total Executed Sets, and Max Load for {selected_category} Over Time",
                             xaxis=dict(title='Week'),
                             yaxis=dict(
-                                title='Average Load / Max Weight',
-                                titlefont=dict(color='blue'),
+                                title=dict(text='Average Load / Max Weight', font=dict(color='blue')),
                                 tickfont=dict(color='blue'),
                                 showgrid=True
                             ),
                             yaxis2=dict(
-                                title='Total Executed Sets',
-                                titlefont=dict(color='orange'),
+                                title=dict(text='Total Executed Sets', font=dict(color='orange')),
                                 tickfont=dict(color='orange'),
                                 overlaying='y',
                                 side='right',
@@ -463,7 +387,8 @@ if folder_path:
                         )
 
                         # Show the updated plot in Streamlit
-                        st.plotly_chart(fig, use_container_width=True)
+                        with timing.span('render_overview_figure'):
+                            st.plotly_chart(fig, use_container_width=True)
 
 
 
@@ -471,17 +396,10 @@ if folder_path:
                 st.subheader("Personal Records")
                 with st.expander("View Personal Records", expanded=False):  # Default expanded can be set to False
                     try:
-                        pr_table = pd.DataFrame()
-                        # Loop through all weeks to calculate PRs
-                        for week_name, week_data in weeks_data.items():
-                            if selected_athlete in week_data:
-                                athlete_week_data = week_data[selected_athlete]
-                                pr_week_table = calculate_personal_records(athlete_week_data, week_name)
-                                pr_table = pd.concat([pr_table, pr_week_table], ignore_index=True)
-
-                        # Drop duplicates to show only the highest PRs for each category
-                        pr_table = pr_table.sort_values(by=["Category", "Personal Record (1RM Weight)"], ascending=False)
-                        pr_table = pr_table.drop_duplicates(subset="Category", keep="first")
+                        pr_table = data_layer.memoize(
+                            'athlete_personal_records', data_version, (selected_athlete,),
+                            lambda: calculate_athlete_personal_records(weeks_data, selected_athlete)
+                        )
 
                         # Display the PR table
                         if not pr_table.empty:
@@ -492,7 +410,10 @@ if folder_path:
                         st.error(f"Error calculating personal records: {e}")
 
                 # Calculate the number of performed training sessions
-                sessions_per_week = calculate_training_sessions_per_week(weeks_data, selected_athlete)
+                sessions_per_week = data_layer.memoize(
+                    'training_sessions_per_week', data_version, (selected_athlete,),
+                    lambda: calculate_training_sessions_per_week(weeks_data, selected_athlete)
+                )
                 # Add a subheader for the new plot
 
                 st.subheader("Training Sessions Per Week")
@@ -528,9 +449,19 @@ if folder_path:
                         st.warning("No training session data available for this athlete.")
                     
 
-            else:
+            elif selected_athlete is not None:
                 st.warning("No data available for the selected athlete.")
 
 
     except Exception as e:
         st.error(f"Error loading data: {e}")
+
+# --- Timing panel ---
+if show_timings:
+    trace = timing.stop()
+    cache = data_layer.get_cache()
+    st.sidebar.subheader("Timings (this run)")
+    st.sidebar.caption(f"Cache: {len(cache)} entries, {cache.hits} hits, {cache.misses} misses. Loads served from the cache have no span.")
+    st.sidebar.dataframe(timing.summary(trace), hide_index=True)
+    with st.sidebar.expander("All spans", expanded=False):
+        st.dataframe(timing.spans_frame(trace), hide_index=True)
@@ -16,231 +16,172 @@ if not st.session_state['authenticated']:
     st.stop()
 # --- End password protection ---
 
-import pandas as pd
 import os
-import plotly.graph_objects as go
-import datetime
+import charts
+import data_layer
+import intensity
+import metrics
+import records
+import rollups
+import sessions
+import timing
+import training_db
 
 AGGREGATED_DIR = "aggregated_athletes"
+TREND_MAX_WEEKS = 52  # Longer week ranges are plotted per training block, so the chart stays small
+SEARCH_PAGE_ROWS = 200  # Sets shown per page in the exercise search
+
+# Optional debug panel: timing spans of this run's data loading and metric computation (sidebar)
+show_timings = st.sidebar.checkbox("Show timings", key="show_timings")
+if show_timings:
+    timing.start(memory=st.sidebar.checkbox("Trace memory (slower)", key="trace_memory"))
 
 st.title("Athlete Training Progress Viewer (Aggregated)")
+# The aggregator's index lists athletes (real names), their weeks and categories without loading any rows
+athlete_index = data_layer.load_index(AGGREGATED_DIR) or {}
 # List available athlete CSVs
 def get_athlete_files():
     files = [f for f in os.listdir(AGGREGATED_DIR) if f.endswith('.csv')]
     return files
-athlete_files = get_athlete_files()
-# Sort athlete files alphabetically (removing .csv for display)
-athlete_files_sorted = sorted(athlete_files, key=lambda x: x.lower())
-# Replace underscores with spaces and remove .csv for display
-athlete_names = [f.replace('.csv', '').replace('_', ' ') for f in athlete_files_sorted]
-athlete_file_display = st.selectbox("Select athlete:", athlete_names)
-# Map back to filename for loading (restore underscores)
-athlete_file = athlete_file_display.replace(' ', '_') + '.csv' if athlete_file_display else None
+if athlete_index:
+    athlete_names = sorted(athlete_index, key=lambda x: x.lower())
+    athlete_file_display = st.selectbox("Select athlete:", athlete_names)
+    athlete_file = athlete_index[athlete_file_display]['file'] if athlete_file_display else None
+else:
+    athlete_files = get_athlete_files()
+    # Sort athlete files alphabetically (removing .csv for display)
+    athlete_files_sorted = sorted(athlete_files, key=lambda x: x.lower())
+    # Replace underscores with spaces and remove .csv for display
+    athlete_names = [f.replace('.csv', '').replace('_', ' ') for f in athlete_files_sorted]
+    athlete_file_display = st.selectbox("Select athlete:", athlete_names)
+    # Map back to filename for loading (restore underscores)
+    athlete_file = athlete_file_display.replace(' ', '_') + '.csv' if athlete_file_display else None
+athlete_entry = athlete_index.get(athlete_file_display)
 
 if 'athlete_file' in locals() and athlete_file:
-    df = pd.read_csv(os.path.join(AGGREGATED_DIR, athlete_file))
-    # Standardize category capitalization
-    if 'Category' in df.columns:
-        df['Category'] = df['Category'].astype(str).str.strip().str.title()
-        # Remove rows with missing, empty, or 'Nan' category
-        df = df[df['Category'].notna() & (df['Category'] != '') & (df['Category'].str.lower() != 'nan')]
-    # Ensure 'Volume' column exists for all downstream operations
-    if 'Volume' not in df.columns:
-        df['Volume'] = df['Set_Reps'] * df['Set_Weight']
+    # Loaded once per data version and shared across sessions; reruns hit the cache
+    df = data_layer.load_athlete(AGGREGATED_DIR, athlete_file)
+    data_version = data_layer.athlete_identity(AGGREGATED_DIR, athlete_file)
     with st.expander("Data for Week", expanded=False):
-        weeks = sorted(df['Week'].dropna().unique())
-        # Map week codes to date ranges
-        def week_code_to_range(week_code):
-            try:
-                year, week = map(int, str(week_code).split('_'))
-                # ISO week: Monday is the first day of the week
-                start_date = datetime.date.fromisocalendar(year, week, 1)
-                end_date = start_date + datetime.timedelta(days=6)
-                # Format: 2025 Dec 29th - Jan 04th
-                def suffix(day):
-                    return 'th' if 11<=day<=13 else {1:'st',2:'nd',3:'rd'}.get(day%10, 'th')
-                start_str = start_date.strftime(f"%b {start_date.day}{suffix(start_date.day)}")
-                end_str = end_date.strftime(f"%b {end_date.day}{suffix(end_date.day)}")
-                if start_date.year != end_date.year:
-                    end_str = end_date.strftime(f"%Y %b {end_date.day}{suffix(end_date.day)}")
-                return f"{year} {start_str} - {end_str}"
-            except Exception:
-                return str(week_code)
-        week_labels = [week_code_to_range(w) for w in weeks]
+        weeks = athlete_entry['weeks'] if athlete_entry else sorted(df['Week'].dropna().unique())
+        # Week codes labelled with their date ranges from the calendar table
+        week_labels = data_layer.load_calendar(weeks)['Label'].tolist()
         week_map = dict(zip(week_labels, weeks))
         selected_week_label = st.selectbox("Select week:", week_labels)
         selected_week = week_map[selected_week_label]
-        week_df = df[df['Week'] == selected_week]
+        week_df = data_layer.load_athlete_week(AGGREGATED_DIR, athlete_file, selected_week)
         st.subheader(f"Data for Week: {selected_week_label}")
         st.dataframe(week_df)
-        # Calculate volume per set
-        week_df['Volume'] = week_df['Set_Reps'] * week_df['Set_Weight']
         # Weekly/category metrics for the selected week
         st.header("Weekly Metrics by Category (Selected Week)")
-        weekly_metrics = week_df.groupby(['Category']).agg(
-            Total_Volume=('Volume', 'sum'),
-            Total_Reps=('Set_Reps', 'sum'),
-            Total_Executed_Sets=('Set', 'count'),
-            Max_Weight=('Set_Weight', 'max')
-        ).reset_index()
+        with timing.span('week_category_metrics', rows=len(week_df)):
+            weekly_metrics = metrics.week_category_metrics(week_df)
         st.dataframe(weekly_metrics)
     with st.expander("Trends by Category (All Weeks)", expanded=False):
         # Use all prescribed categories for the selector (not just those with executed sets)
-        prescribed_categories = sorted(df[df['Set'].notna() & df['Set_Reps'].notna()]['Category'].dropna().unique())
-        # Exclude 'Accessory' and 'Accessorio' from prescribed_categories
-        prescribed_categories = [cat for cat in prescribed_categories if cat.lower() not in ['accessory', 'accessorio']]
-        # Add virtual 'Pulls' category if both 'Snatch Pull' and 'Clean Pull' exist
-        pulls_present = any(cat.lower() == 'snatch pull' for cat in prescribed_categories) and any(cat.lower() == 'clean pull' for cat in prescribed_categories)
-        display_categories = prescribed_categories.copy()
-        if pulls_present:
-            display_categories.append('Pulls')
-        # Add 'Overall' as the first category (all except Accessory/Accessorio)
-        display_categories = ['Overall'] + display_categories
+        if athlete_entry:
+            prescribed_categories = athlete_entry['prescribed_categories']
+        else:
+            prescribed_categories = sorted(df[df['Set'].notna() & df['Set_Reps'].notna()]['Category'].dropna().unique())
+        # 'Overall' first, accessories left out, virtual 'Pulls' when both pulls are prescribed
+        display_categories = rollups.trend_categories(prescribed_categories)
         selected_category = st.selectbox("Select a category:", display_categories)
         # All unique weeks in the dataset
-        all_weeks = sorted(df['Week'].dropna().astype(str).unique())
-        # Map week codes to date ranges for plotting
-        def week_code_to_range(week_code):
-            try:
-                year, week = map(int, str(week_code).split('_'))
-                start_date = datetime.date.fromisocalendar(year, week, 1)
-                end_date = start_date + datetime.timedelta(days=6)
-                def suffix(day):
-                    return 'th' if 11<=day<=13 else {1:'st',2:'nd',3:'rd'}.get(day%10, 'th')
-                start_str = start_date.strftime(f"%b {start_date.day}{suffix(start_date.day)}")
-                end_str = end_date.strftime(f"%b {end_date.day}{suffix(end_date.day)}")
-                if start_date.year != end_date.year:
-                    end_str = end_date.strftime(f"%Y %b {end_date.day}{suffix(end_date.day)}")
-                return f"{year} {start_str} - {end_str}"
-            except Exception:
-                return str(week_code)
-        week_label_map = {w: week_code_to_range(w) for w in all_weeks}
-        # --- Category filtering logic ---
-        if selected_category == 'Pulls':
-            pulls_mask = df['Category'].str.lower().isin(['snatch pull', 'clean pull'])
-            prescribed_mask = pulls_mask
-        elif selected_category == 'Overall':
-            prescribed_mask = ~df['Category'].str.lower().isin(['accessory', 'accessorio'])
-        else:
-            prescribed_mask = (df['Category'] == selected_category)
-        prescribed_df = df[prescribed_mask]
-        prescribed_df = prescribed_df[prescribed_df['Set'].notna() & prescribed_df['Set_Reps'].notna()]
-        prescribed_df['Week'] = prescribed_df['Week'].astype(str)
-        prescribed_sets = prescribed_df.groupby('Week').apply(lambda x: x.drop_duplicates(subset=['Day of the Week', 'Set']).shape[0]).reset_index(name='Total_Prescribed_Sets')
-        prescribed_sets = prescribed_sets.set_index('Week').reindex(all_weeks, fill_value=0).reset_index()
-        # Executed sets: only rows with Set, Set_Reps, Set_Weight not null and Set_Reps > 0 (exclude missed lifts)
-        if selected_category == 'Pulls':
-            executed_mask = (
-                df['Category'].str.lower().isin(['snatch pull', 'clean pull'])
-                & df['Set'].notna()
-                & df['Set_Reps'].notna()
-                & (df['Set_Reps'] > 0)
-                & df['Set_Weight'].notna()
-            )
-        elif selected_category == 'Overall':
-            executed_mask = (
-                ~df['Category'].str.lower().isin(['accessory', 'accessorio'])
-                & df['Set'].notna()
-                & df['Set_Reps'].notna()
-                & (df['Set_Reps'] > 0)
-                & df['Set_Weight'].notna()
-            )
-        else:
-            executed_mask = (
-                (df['Category'] == selected_category)
-                & df['Set'].notna()
-                & df['Set_Reps'].notna()
-                & (df['Set_Reps'] > 0)
-                & df['Set_Weight'].notna()
-            )
-        cat_df = df[executed_mask]
-        cat_df['Week'] = cat_df['Week'].astype(str)
-        executed_sets = cat_df.groupby('Week').agg(
-            Total_Executed_Sets=('Set', 'count'),
-            Total_Lifted_Weight=('Volume', 'sum'),
-            Total_Reps=('Set_Reps', 'sum'),
-            Max_Weight=('Set_Weight', 'max')
-        ).reset_index()
-        executed_sets = executed_sets.set_index('Week').reindex(all_weeks, fill_value=0).reset_index()
-        # Merge prescribed and executed sets
-        week_group = pd.merge(prescribed_sets, executed_sets, on='Week', how='outer').sort_values('Week')
-        week_group['Total_Executed_Sets'] = week_group['Total_Executed_Sets'].fillna(0)
-        week_group['Total_Lifted_Weight'] = week_group['Total_Lifted_Weight'].fillna(0)
-        week_group['Total_Reps'] = week_group['Total_Reps'].fillna(0)
-        week_group['Max_Weight'] = week_group['Max_Weight'].fillna(0)
-        week_group['Average_Load'] = week_group['Total_Lifted_Weight'] / week_group['Total_Reps']
-        week_group['Average_Load'] = week_group['Average_Load'].fillna(0)
+        all_weeks = athlete_entry['weeks'] if athlete_entry else sorted(df['Week'].dropna().astype(str).unique())
+        # Calendar table of the athlete's weeks: date-range labels and ordinals for range filtering
+        calendar = data_layer.load_calendar(all_weeks)
+        # --- Category filtering logic: sums the precomputed weekly rollup rows of the category ---
+        rollup = data_layer.load_rollup(AGGREGATED_DIR, athlete_file)
+        week_group = data_layer.memoize(
+            'category_week_trend', data_version, (selected_category,),
+            lambda: rollups.category_week_trend(rollup, selected_category, all_weeks)
+        ).copy()
         # Add Week_Label for plotting
-        week_group['Week_Label'] = week_group['Week'].map(week_label_map)
+        week_group['Week_Label'] = week_group['Week'].map(calendar['Label'])
         # Add week range slider for filtering (below the plot)
-        week_label_list = [week_label_map[w] for w in all_weeks]
-        if len(week_label_list) > 1:
+        start_idx, end_idx = 0, len(all_weeks) - 1
+        if len(all_weeks) > 1:
             week_range = st.slider(
                 "Select week range to display:",
                 min_value=0,
-                max_value=len(week_label_list)-1,
-                value=(0, len(week_label_list)-1),
+                max_value=len(all_weeks)-1,
+                value=(0, len(all_weeks)-1),
                 format="",
                 step=1,
                 key="week_range_slider"
             )
             start_idx, end_idx = week_range
-            selected_labels = week_label_list[start_idx:end_idx+1]
-            selected_weeks = [w for w, lbl in week_label_map.items() if lbl in selected_labels]
-            # Filter week_group to selected weeks
-            week_group = week_group[week_group['Week'].isin(selected_weeks)]
-        # Plot (only once, after filtering)
-        fig = go.Figure()
-        fig.add_trace(go.Bar(x=week_group['Week_Label'], y=week_group['Total_Prescribed_Sets'], name='Prescribed Sets', marker_color='grey', opacity=0.5))
-        fig.add_trace(go.Bar(x=week_group['Week_Label'], y=week_group['Total_Executed_Sets'], name='Executed Sets', marker_color='orange', opacity=0.6))
-        fig.add_trace(go.Scatter(x=week_group['Week_Label'], y=week_group['Average_Load'], mode='lines+markers', name='Average Load', line=dict(color='blue'), yaxis='y2'))
-        fig.add_trace(go.Scatter(x=week_group['Week_Label'], y=week_group['Max_Weight'], mode='markers', name='Weekly max', marker=dict(color='red', size=10), yaxis='y2'))
-        fig.update_layout(
-            title=f"Average Load, Executed vs Prescribed Sets, and Max Load for {selected_category} Over Time",
-            xaxis=dict(title='Week'),
-            yaxis=dict(title='Sets', tickfont=dict(color='orange'), showgrid=True),
-            yaxis2=dict(title='Average Load / Max Weight', tickfont=dict(color='blue'), overlaying='y', side='right', showgrid=False),
-            legend=dict(x=1.02, y=1),
-            template='plotly_white',
-            bargap=0.5
+            # Filter week_group to the selected weeks by comparing ordinals
+            ordinals = calendar['Ordinal'].to_numpy()
+            week_ordinals = week_group['Week'].map(calendar['Ordinal'])
+            week_group = week_group[(week_ordinals >= ordinals[start_idx]) & (week_ordinals <= ordinals[end_idx])]
+        # Plot (only once, after filtering); long ranges are summed into training blocks server-side.
+        # The figure is cached per category, week range and data version, so reruns do not rebuild it
+        by_block = len(week_group) > TREND_MAX_WEEKS
+
+        def build_trend_figure():
+            if not by_block:
+                return charts.category_trend_figure(week_group, selected_category)
+            blocks = rollups.block_trend(week_group, calendar)
+            blocks['Week_Label'] = blocks['Season'].astype(str) + ' Block ' + blocks['Block'].astype(str)
+            return charts.category_trend_figure(blocks, selected_category, x_title='Training Block')
+
+        fig = data_layer.memoize(
+            'trend_figure', data_version, (selected_category, all_weeks[start_idx], all_weeks[end_idx], by_block),
+            build_trend_figure
         )
-        st.plotly_chart(fig, use_container_width=True)
+        if by_block:
+            st.caption(f"{len(week_group)} weeks selected: showing training blocks. Narrow the range to see single weeks.")
+        with timing.span('render_trend_figure'):
+            st.plotly_chart(fig, use_container_width=True)
     with st.expander("Personal Records (1RM)", expanded=False):
-        # Only consider rows where Set_Reps == 1 and Set_Weight is not null and > 0
-        pr_df = df[(df['Set_Reps'] == 1) & (df['Set_Weight'].notna()) & (df['Set_Weight'] > 0)]
-        # Find PR for each category and get the corresponding week and exercise
-        pr_table = (
-            pr_df.loc[pr_df.groupby('Category')['Set_Weight'].idxmax()]
-            .groupby('Category')
-            .agg(Personal_Record_1RM_Weight=('Set_Weight', 'max'),
-                 Week=('Week', 'first'),
-                 Exercise=('Exercise', 'first'))
-            .reset_index()
-        )
+        # PR history kept up to date by the aggregator; no scan over the sets
+        pr_history = data_layer.load_records(AGGREGATED_DIR, athlete_file)
+        with timing.span('pr_tables', rows=len(pr_history)):
+            pr_table = records.category_1rm_table(pr_history)
+            rep_max_table = records.rep_max_table(pr_history)
         st.dataframe(pr_table)
+        st.subheader("Rep Maxes by Category")
+        st.dataframe(rep_max_table)
+    with st.expander("Estimated 1RM and Intensity Zones", expanded=False):
+        # Estimated 1RM, best estimate so far and intensity zone are stored with every set
+        st.caption(f"Estimated 1RM ({data_layer.e1rm_formula(athlete_entry).title()}) of sets up to {intensity.MAX_E1RM_REPS} reps; "
+                   "intensity is the load over the best estimate for the exercise up to that session.")
+        st.dataframe(data_layer.memoize('best_e1rm', data_version, (), lambda: intensity.best_e1rm_table(df)), hide_index=True)
+        zone_category = st.selectbox("Category:", display_categories, key="zone_category")
+        zone_sets = data_layer.memoize(
+            'zone_sets', data_version, (zone_category,),
+            lambda: df[rollups.category_mask(df['Category'], zone_category) & df['Intensity_Zone'].notna()]
+        )
+        if not zone_sets.empty:
+            with timing.span('intensity_figures', rows=len(zone_sets)):
+                hist_fig = charts.intensity_histogram_figure(zone_sets, zone_category)
+                zone_fig = charts.zone_volume_figure(intensity.zone_week_reps(zone_sets), calendar, zone_category)
+            st.plotly_chart(hist_fig, use_container_width=True)
+            st.plotly_chart(zone_fig, use_container_width=True)
+            st.subheader("Reps per Session by Zone (Prilepin)")
+            st.dataframe(intensity.prilepin_table(zone_sets), hide_index=True)
+        else:
+            st.info(f"No {zone_category} sets with an estimated 1RM.")
+    with st.expander("Training Sessions", expanded=False):
+        # One precomputed row per session (week and day); counts and tables are lookups on it
+        session_df = data_layer.load_sessions(AGGREGATED_DIR, athlete_file)
+        if not session_df.empty:
+            per_week = data_layer.memoize('sessions_per_week', data_version, (), lambda: sessions.sessions_per_week(session_df))
+            st.plotly_chart(charts.sessions_per_week_figure(per_week, calendar), use_container_width=True)
+            session_calendar = calendar[calendar['Week'].isin(per_week['Week'])].sort_values('Ordinal')
+            session_weeks = session_calendar['Week'].tolist()
+            session_week = st.selectbox("Week:", session_weeks, index=len(session_weeks) - 1, format_func=calendar['Label'].get, key="session_week")
+            st.dataframe(session_df[session_df['Week'] == session_week].drop(columns='Week'), hide_index=True)
+            st.caption(f"A session is performed when any set has reps filled in. Executed sets, reps, volume and max weight count successful lifts; "
+                       f"duration is estimated at {sessions.MINUTES_PER_SET} minutes per executed set.")
+        else:
+            st.info("No training sessions for this athlete.")
     # --- New Section: Exercise Search and Display ---
     with st.expander("Search Exercise Data", expanded=False):
         if 'Exercise' in df.columns and 'Category' in df.columns:
-            # Standardize exercise and category names
-            df['Exercise'] = df['Exercise'].astype(str).str.strip().str.title()
-            df['Category'] = df['Category'].astype(str).str.strip().str.title()
-            # Mapping for exercise name variants
-            EXERCISE_MAPPING = {
-                "Strappo Da Terra": "Strappo",
-                "Strappo": "Strappo",
-                "Back Squat": "Back Squat",
-                "Gambe Dietro": "Back Squat",
-                "Front Squat": "Front Squat",
-                "Gambe Avanti": "Front Squat",
-                "Tirate Slancio": "Tirate Slancio",
-                "Tirata Slancio": "Tirate Slancio",
-                "Spinta": "Spinta in spaccata",
-                "Spinta in Spaccata": "Spinta in spaccata",
-                # Add more mappings as needed
-            }
-            df['Exercise'] = df['Exercise'].replace(EXERCISE_MAPPING)
             # Dropdown for category selection
-            unique_categories = sorted(df['Category'].dropna().unique())
+            unique_categories = athlete_entry['categories'] if athlete_entry else sorted(df['Category'].dropna().unique())
             selected_category = st.selectbox(
                 "Select a category to filter exercises:",
                 unique_categories,
@@ -270,7 +211,88 @@ if 'athlete_file' in locals() and athlete_file:
                 # Show only selected columns
                 display_cols = ["Week", "Day of the Week", "Exercise", "Variant", "Set_Reps", "Set_Weight"]
                 filtered_exercise_df = exercise_df[display_cols] if all(col in exercise_df.columns for col in display_cols) else exercise_df
-                st.dataframe(filtered_exercise_df)
+                # One page of sets at a time, so long histories are not all sent to the browser
+                pages = max(1, -(-len(filtered_exercise_df) // SEARCH_PAGE_ROWS))
+                page = st.number_input(f"Page (of {pages}):", min_value=1, max_value=pages, value=1, step=1, key="search_page") if pages > 1 else 1
+                first_row = (page - 1) * SEARCH_PAGE_ROWS
+                st.caption(f"Sets {first_row + 1 if len(filtered_exercise_df) else 0}-{min(first_row + SEARCH_PAGE_ROWS, len(filtered_exercise_df))} of {len(filtered_exercise_df)}")
+                st.dataframe(filtered_exercise_df.iloc[first_row:first_row + SEARCH_PAGE_ROWS])
         else:
             st.info("No 'Exercise' or 'Category' column found in the data.")
     # --- End New Section ---
+
+# --- Cohort comparison: one weekly metric for many athletes in a single chart ---
+if athlete_names:
+    with st.expander("Compare Athletes", expanded=False):
+        if athlete_index:
+            cohort_files = {name: athlete_index[name]['file'] for name in athlete_names}
+        else:
+            cohort_files = dict(zip(athlete_names, athlete_files_sorted))
+        selected_athletes = st.multiselect("Athletes:", athlete_names, default=athlete_names, key="cohort_athletes")
+        if athlete_index:
+            cohort_categories = sorted({cat for name in athlete_names for cat in athlete_index[name]['prescribed_categories']})
+        else:
+            cohort_categories = sorted({str(cat) for name in athlete_names for cat in data_layer.load_rollup(AGGREGATED_DIR, cohort_files[name])['Category'].dropna().unique()})
+        cohort_categories = rollups.trend_categories(cohort_categories)
+        cohort_category = st.selectbox("Category:", cohort_categories, key="cohort_category")
+        cohort_metric = st.selectbox("Metric:", list(charts.COHORT_METRIC_LABELS), format_func=charts.COHORT_METRIC_LABELS.get, key="cohort_metric")
+        if selected_athletes:
+            cohort_df = data_layer.load_cohort(AGGREGATED_DIR, {name: cohort_files[name] for name in selected_athletes}, cohort_category)
+            # Weeks of the whole cohort, so every athlete shares one x axis
+            cohort_calendar = data_layer.load_calendar(sorted(cohort_df['Week'].unique()))
+            with timing.span('cohort_figure', rows=len(cohort_df)):
+                fig = charts.cohort_figure(cohort_df, cohort_calendar, cohort_metric, cohort_category)
+            with timing.span('render_cohort_figure'):
+                st.plotly_chart(fig, use_container_width=True)
+            st.caption("PR is the athlete's heaviest successful set in the category; weeks without sets in the category are not shown.")
+
+    with st.expander("Squad Workload", expanded=False):
+        workload_category = st.selectbox("Category:", cohort_categories, key="workload_category")
+        workload_metric = st.selectbox("Metric:", list(charts.WORKLOAD_METRIC_LABELS), format_func=charts.WORKLOAD_METRIC_LABELS.get, key="workload_metric")
+        squad_df = data_layer.load_squad_workload(AGGREGATED_DIR, cohort_files, workload_category)
+        if not squad_df.empty:
+            with timing.span('workload_figure', rows=len(squad_df)):
+                fig = charts.workload_figure(squad_df, workload_metric, workload_category)
+            st.plotly_chart(fig, use_container_width=True)
+            # Latest week of every athlete
+            latest = squad_df.drop_duplicates('Athlete', keep='last')
+            st.dataframe(latest[['Athlete', 'Week'] + list(charts.WORKLOAD_METRIC_LABELS)].round(2), hide_index=True)
+            st.caption("Volume is reps x weight of executed sets, on the day given by 'Day of the Week' (1 = Monday). "
+                       "Values are taken at the end of each week; windows shorter than 7/28 days are blank.")
+        else:
+            st.info(f"No {workload_category} sets for these athletes.")
+
+    with st.expander("Squad Attendance", expanded=False):
+        squad_sessions = data_layer.load_squad_sessions(AGGREGATED_DIR, cohort_files)
+        if not squad_sessions.empty:
+            attendance = sessions.attendance_table(squad_sessions)
+            attendance_calendar = data_layer.load_calendar(sorted(attendance.columns))
+            with timing.span('attendance_figure', rows=len(squad_sessions)):
+                fig = charts.attendance_figure(attendance, attendance_calendar)
+            st.plotly_chart(fig, use_container_width=True)
+            st.caption("Sessions with any set logged, per athlete and week; blank weeks have no sheet for the athlete.")
+        else:
+            st.info("No training sessions for these athletes.")
+
+# --- SQL queries over every athlete, run inside the training database ---
+if data_layer.has_database(AGGREGATED_DIR):
+    with st.expander("Query Training Database (SQL)", expanded=False):
+        st.markdown("Tables: `rollup`, `records`, `calendar`, `category_groups`, `prescriptions`, `set_facts`, `week_notes`, "
+                    "`athletes`, `categories`, `exercises`, `notes`. "
+                    "Views: `sets` (one row per set, with notes), `category_week_trend`, `current_records`, `athlete_prs`, `set_intensity`.")
+        preset = st.selectbox("Start from:", list(training_db.PRESET_QUERIES), key="sql_preset")
+        sql = st.text_area("SQL (read-only):", training_db.PRESET_QUERIES[preset], height=180, key=f"sql_{preset}")
+        try:
+            st.dataframe(data_layer.query(AGGREGATED_DIR, sql), hide_index=True)
+        except Exception as e:
+            st.error(f"Query failed: {e}")
+
+# --- Timing panel ---
+if show_timings:
+    trace = timing.stop()
+    cache = data_layer.get_cache()
+    st.sidebar.subheader("Timings (this run)")
+    st.sidebar.caption(f"Cache: {len(cache)} entries, {cache.hits} hits, {cache.misses} misses. Loads served from the cache have no span.")
+    st.sidebar.dataframe(timing.summary(trace), hide_index=True)
+    with st.sidebar.expander("All spans", expanded=False):
+        st.dataframe(timing.spans_frame(trace), hide_index=True)
@@ -0,0 +1,60 @@
+import os
+import json
+
+import store
+import normalization
+import intensity
+
+INDEX_FILE = "_athletes.json"  # Lives in the aggregated output, one entry per athlete
+INDEX_VERSION = 1
+
+
+def index_entry(athlete, store_df):
+    """What the viewer needs to know about an athlete without loading its rows.
+
+    'years' maps each year to its [start, end) row range in the athlete's week-sorted store,
+    i.e. the rows of <PARQUET_DIR>/<athlete>/<year>.parquet. Weeks and categories only count
+    rows with a category, like the viewer does.
+    """
+    rows = store_df[store_df['Category'].notna()]
+    weeks = sorted(rows['Week'].dropna().astype(str).unique())
+    prescribed = rows[rows['Set'].notna() & rows['Set_Reps'].notna()]
+    return {
+        'file': f"{store.athlete_key(athlete)}.csv",
+        'normalization': normalization.NORMALIZATION_VERSION,
+        'e1rm_formula': intensity.E1RM_FORMULA,
+        'rows': len(store_df),
+        'years': {year: [start, end] for year, start, end in store.year_slices(store_df)},
+        'weeks': weeks,
+        'first_week': weeks[0] if weeks else None,
+        'last_week': weeks[-1] if weeks else None,
+        'categories': sorted(rows['Category'].dropna().astype(str).unique()),
+        'prescribed_categories': sorted(prescribed['Category'].dropna().astype(str).unique()),
+    }
+
+
+def index_path(output_dir):
+    return os.path.join(output_dir, INDEX_FILE)
+
+
+def load_index(output_dir):
+    """{athlete name: entry} from the index, or None if it is missing or outdated."""
+    path = index_path(output_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get('version') != INDEX_VERSION:
+        return None
+    return index['athletes']
+
+
+def save_index(output_dir, athletes):
+    path = index_path(output_dir)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': INDEX_VERSION, 'athletes': athletes}, f, indent=1, sort_keys=True, ensure_ascii=False)
+    os.replace(tmp_path, path)
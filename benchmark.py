@@ -0,0 +1,223 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import contextlib
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+import aggregator
+import athlete_index
+import cohort
+import metrics
+import records
+import rollups
+import store
+import synthetic_workbooks
+import xlsx_stream
+
+# Scale name -> (athletes, weeks); a season is a year of weekly workbooks
+SCALES = {
+    'season': (10, 52),
+    'five_seasons': (10, 260),
+    'hundred_athletes': (100, 52),
+}
+STAGES = ['ingest', 'reshape', 'row_metrics', 'rollup', 'personal_records', 'pr_history', 'trend', 'cohort']
+SEED = 0  # Fixed so every run benchmarks the same workbooks
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), 'okanagan_wl_benchmark')
+
+
+class Workload:
+    """Synthetic archive of one scale plus the inputs each stage needs, prepared (untimed) on first use."""
+
+    def __init__(self, data_dir, scale, workers):
+        self.athletes, self.weeks = SCALES[scale]
+        self.raw_dir = os.path.join(data_dir, scale, 'raw')
+        self.output_dir = os.path.join(data_dir, scale, 'aggregated')
+        self.workers = workers
+        synthetic_workbooks.generate_archive(self.raw_dir, self.athletes, self.weeks, SEED)
+        self._sheets = None
+        self._athletes = None
+
+    def aggregate(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            aggregator.run_full(self.raw_dir, self.output_dir, self.workers)
+        return sum(entry['rows'] for entry in athlete_index.load_index(self.output_dir).values())
+
+    def sheets(self):
+        """[(week, athlete, sheet DataFrame)] of every workbook."""
+        if self._sheets is None:
+            self._sheets = []
+            for file in aggregator.list_week_files(self.raw_dir):
+                for athlete, rows in xlsx_stream.iter_sheets(os.path.join(self.raw_dir, file)):
+                    self._sheets.append((file.split('.')[0], athlete, xlsx_stream.read_sheet(rows)))
+        return self._sheets
+
+    def athlete_frames(self):
+        """[(store frame, rollup, index entry)] per athlete, as the viewer loads them."""
+        if self._athletes is None:
+            if athlete_index.load_index(self.output_dir) is None:
+                self.aggregate()
+            self._athletes = []
+            for athlete, entry in sorted(athlete_index.load_index(self.output_dir).items()):
+                df = store.read_athlete(self.output_dir, athlete, columns=store.VIEW_COLUMNS)
+                df = df[df['Category'].notna()]
+                self._athletes.append((df, rollups.read_rollup(self.output_dir, athlete), entry))
+        return self._athletes
+
+
+def bench_ingest(workload):
+    return workload.aggregate()
+
+
+def bench_reshape(workload):
+    return sum(len(aggregator.process_sheet(df.copy(deep=False), week, athlete)) for week, athlete, df in workload.sheets())
+
+
+def bench_row_metrics(workload):
+    return sum(len(metrics.row_metrics(df)) for _, _, df in workload.sheets())
+
+
+def bench_rollup(workload):
+    for df, _, _ in workload.athlete_frames():
+        rollups.weekly_rollup(df)
+    return sum(len(df) for df, _, _ in workload.athlete_frames())
+
+
+def bench_personal_records(workload):
+    for df, _, _ in workload.athlete_frames():
+        metrics.personal_records_1rm(df)
+    return sum(len(df) for df, _, _ in workload.athlete_frames())
+
+
+def bench_pr_history(workload):
+    for df, _, _ in workload.athlete_frames():
+        records.pr_history(df)
+    return sum(len(df) for df, _, _ in workload.athlete_frames())
+
+
+def bench_trend(workload):
+    trends = 0
+    for _, rollup, entry in workload.athlete_frames():
+        for category in ['Overall', 'Pulls'] + entry['prescribed_categories']:
+            rollups.category_week_trend(rollup, category, entry['weeks'])
+            trends += 1
+    return trends
+
+
+def bench_cohort(workload):
+    athletes = sorted(athlete_index.load_index(workload.output_dir))
+    frames = workload.athlete_frames()
+    rollup = pd.concat([r.assign(Athlete=athlete) for athlete, (_, r, _) in zip(athletes, frames)], ignore_index=True)
+    prs = cohort.category_prs({athlete: records.read_records(workload.output_dir, athlete) for athlete in athletes})
+    return len(cohort.cohort_week_metrics(rollup, prs, 'Overall'))
+
+
+BENCHMARKS = {
+    'ingest': (bench_ingest, 'set rows'),
+    'reshape': (bench_reshape, 'set rows'),
+    'row_metrics': (bench_row_metrics, 'sheet rows'),
+    'rollup': (bench_rollup, 'set rows'),
+    'personal_records': (bench_personal_records, 'set rows'),
+    'pr_history': (bench_pr_history, 'set rows'),
+    'trend': (bench_trend, 'trends'),
+    'cohort': (bench_cohort, 'athlete weeks'),
+}
+
+
+def measure(run, repeat):
+    """(items, [seconds per run], peak traced bytes) of `repeat` timed runs plus one run under tracemalloc.
+
+    Memory is traced in a separate run so its overhead does not skew the timings. With worker
+    processes only the parent's allocations are traced.
+    """
+    run()  # Warm-up: imports, page cache, lazily prepared inputs
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = run()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return items, times, peak
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run_benchmarks(scales, stages, repeat=3, workers=1, data_dir=DEFAULT_DATA_DIR):
+    """Yield one result dict per (scale, stage)."""
+    env = environment()
+    for scale in scales:
+        workload = Workload(data_dir, scale, workers)
+        for stage in stages:
+            run, unit = BENCHMARKS[stage]
+            items, times, peak = measure(lambda: run(workload), repeat)
+            best = min(times)
+            yield {
+                'scale': scale,
+                'athletes': workload.athletes,
+                'weeks': workload.weeks,
+                'stage': stage,
+                'workers': workers if stage == 'ingest' else 1,
+                'items': items,
+                'unit': unit,
+                'repeat': repeat,
+                'seconds_min': round(best, 6),
+                'seconds_median': round(statistics.median(times), 6),
+                'items_per_second': round(items / best, 1) if best > 0 else None,
+                'peak_mb': round(peak / 2**20, 2),
+                **env,
+            }
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return {(r['scale'], r['stage']): r for r in map(json.loads, filter(str.strip, f))}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ingest and metrics on synthetic workbooks; prints one JSON result per line.")
+    parser.add_argument('--scale', nargs='+', choices=list(SCALES) + ['all'], default=['season'])
+    parser.add_argument('--stage', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage; the fastest is reported.")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes for the ingest stage.")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="Where the synthetic archives are generated (and reused).")
+    parser.add_argument('--output', help="Append results to this JSON-lines file instead of printing them.")
+    parser.add_argument('--compare', help="JSON-lines file of earlier results to compare the timings against.")
+    args = parser.parse_args()
+
+    scales = list(SCALES) if 'all' in args.scale else args.scale
+    baseline = load_results(args.compare) if args.compare else {}
+    out = open(args.output, 'a', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for result in run_benchmarks(scales, args.stage, args.repeat, args.workers, args.data_dir):
+            out.write(json.dumps(result) + '\n')
+            out.flush()
+            summary = f"{result['scale']:>16} {result['stage']:>16}: {result['seconds_min']:.3f}s, {result['items_per_second']} {result['unit']}/s, peak {result['peak_mb']} MB"
+            previous = baseline.get((result['scale'], result['stage']))
+            if previous:
+                summary += f" ({result['seconds_min'] / previous['seconds_min']:.2f}x baseline)"
+            print(summary, file=sys.stderr)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
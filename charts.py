@@ -0,0 +1,150 @@
+import plotly.graph_objects as go
+
+import intensity
+
+# Cohort metric -> axis/legend label
+COHORT_METRIC_LABELS = {
+    'Total_Lifted_Weight': 'Volume (kg)',
+    'Total_Executed_Sets': 'Executed Sets',
+    'Total_Prescribed_Sets': 'Prescribed Sets',
+    'Average_Load': 'Average Load',
+    'Max_Weight': 'Weekly Max',
+    'Relative_Intensity': 'Average Load / PR',
+    'Max_Relative_Intensity': 'Weekly Max / PR',
+}
+# Workload metric -> axis/legend label
+WORKLOAD_METRIC_LABELS = {
+    'ACWR': 'Acute:Chronic Ratio (7/28 days)',
+    'EWMA_ACWR': 'Acute:Chronic Ratio (EWMA)',
+    'Acute_Load': 'Acute Load (7-day volume, kg)',
+    'Chronic_Load': 'Chronic Load (28-day weekly average, kg)',
+    'EWMA_Acute': 'Acute Load (EWMA, kg/day)',
+    'EWMA_Chronic': 'Chronic Load (EWMA, kg/day)',
+    'Monotony': 'Monotony',
+    'Strain': 'Strain',
+}
+ACWR_BAND = (0.8, 1.3)  # Ratios usually considered safe, shaded on ratio charts
+
+
+def category_trend_figure(week_group, selected_category, x_title='Week'):
+    """Prescribed vs executed sets (bars) with average load and max (right axis) of a category trend with Week_Label."""
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=week_group['Week_Label'], y=week_group['Total_Prescribed_Sets'], name='Prescribed Sets', marker_color='grey', opacity=0.5))
+    fig.add_trace(go.Bar(x=week_group['Week_Label'], y=week_group['Total_Executed_Sets'], name='Executed Sets', marker_color='orange', opacity=0.6))
+    fig.add_trace(go.Scatter(x=week_group['Week_Label'], y=week_group['Average_Load'], mode='lines+markers', name='Average Load', line=dict(color='blue'), yaxis='y2'))
+    fig.add_trace(go.Scatter(x=week_group['Week_Label'], y=week_group['Max_Weight'], mode='markers', name='Weekly max', marker=dict(color='red', size=10), yaxis='y2'))
+    fig.update_layout(
+        title=f"Average Load, Executed vs Prescribed Sets, and Max Load for {selected_category} Over Time",
+        xaxis=dict(title=x_title),
+        yaxis=dict(title='Sets', tickfont=dict(color='orange'), showgrid=True),
+        yaxis2=dict(title='Average Load / Max Weight', tickfont=dict(color='blue'), overlaying='y', side='right', showgrid=False),
+        legend=dict(x=1.02, y=1),
+        template='plotly_white',
+        bargap=0.5
+    )
+    return fig
+
+
+def cohort_figure(cohort_df, calendar, metric, category):
+    """One line per athlete of a cohort metric, on the week labels of `calendar` (in calendar order)."""
+    calendar = calendar.sort_values('Ordinal', kind='mergesort')
+    label = COHORT_METRIC_LABELS.get(metric, metric)
+    fig = go.Figure()
+    for name, athlete_df in cohort_df.groupby('Athlete', sort=True):
+        fig.add_trace(go.Scatter(
+            x=athlete_df['Week'].map(calendar['Label']), y=athlete_df[metric],
+            mode='lines+markers', name=name
+        ))
+    fig.update_layout(
+        title=f"{label} for {category} by Athlete",
+        xaxis=dict(title='Week', categoryorder='array', categoryarray=calendar['Label'].tolist()),
+        yaxis=dict(title=label, tickformat='.0%' if 'Relative' in metric else None),
+        legend=dict(x=1.02, y=1),
+        template='plotly_white'
+    )
+    return fig
+
+
+def workload_figure(squad_df, metric, category):
+    """One line per athlete of an end-of-week workload metric over time."""
+    label = WORKLOAD_METRIC_LABELS.get(metric, metric)
+    fig = go.Figure()
+    for name, athlete_df in squad_df.groupby('Athlete', sort=True):
+        fig.add_trace(go.Scatter(x=athlete_df['Date'], y=athlete_df[metric], mode='lines+markers', name=name))
+    if metric in ('ACWR', 'EWMA_ACWR'):
+        fig.add_hrect(y0=ACWR_BAND[0], y1=ACWR_BAND[1], fillcolor='green', opacity=0.1, line_width=0)
+    fig.update_layout(
+        title=f"{label} for {category} by Athlete",
+        xaxis=dict(title='Week ending'),
+        yaxis=dict(title=label),
+        legend=dict(x=1.02, y=1),
+        template='plotly_white'
+    )
+    return fig
+
+
+def intensity_histogram_figure(sets, category):
+    """Distribution of set intensities (load / best estimated 1RM) with reps as weights."""
+    fig = go.Figure(go.Histogram(x=sets['E1RM_Intensity'], y=sets['Set_Reps'], histfunc='sum', xbins=dict(start=0.4, end=1.05, size=0.025),
+                                 marker_color='orange'))
+    for edge in intensity.ZONE_EDGES[1:]:
+        fig.add_vline(x=edge, line_dash='dot', line_color='grey')
+    fig.update_layout(
+        title=f"Reps by Intensity (% of Estimated 1RM) for {category}",
+        xaxis=dict(title='Load / Best Estimated 1RM', tickformat='.0%'),
+        yaxis=dict(title='Reps'),
+        template='plotly_white'
+    )
+    return fig
+
+
+def zone_volume_figure(zone_reps, calendar, category):
+    """Reps per intensity zone (stacked) for every week of `calendar`, in calendar order."""
+    calendar = calendar.sort_values('Ordinal', kind='mergesort')
+    fig = go.Figure()
+    for zone in intensity.ZONES:
+        rows = zone_reps[zone_reps['Intensity_Zone'] == zone]
+        fig.add_trace(go.Bar(x=rows['Week'].map(calendar['Label']), y=rows['Reps'], name=zone))
+    fig.update_layout(
+        barmode='stack',
+        title=f"Reps per Intensity Zone for {category}",
+        xaxis=dict(title='Week', categoryorder='array', categoryarray=calendar['Label'].tolist()),
+        yaxis=dict(title='Reps'),
+        legend=dict(x=1.02, y=1, title='% of Estimated 1RM'),
+        template='plotly_white'
+    )
+    return fig
+
+
+def sessions_per_week_figure(per_week, calendar):
+    """Performed next to prescribed training sessions for every week of `calendar`."""
+    calendar = calendar.sort_values('Ordinal', kind='mergesort')
+    labels = per_week['Week'].map(calendar['Label'])
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=labels, y=per_week['Prescribed_Sessions'], name='Prescribed', marker_color='lightgrey'))
+    fig.add_trace(go.Bar(x=labels, y=per_week['Performed_Sessions'], name='Performed', marker_color='green'))
+    fig.update_layout(
+        barmode='overlay',
+        title="Training Sessions per Week",
+        xaxis=dict(title='Week', categoryorder='array', categoryarray=calendar['Label'].tolist()),
+        yaxis=dict(title='Sessions', range=[0, 7]),
+        legend=dict(x=1.02, y=1),
+        template='plotly_white',
+        bargap=0.2
+    )
+    return fig
+
+
+def attendance_figure(attendance, calendar):
+    """Heatmap of performed sessions per athlete (rows) and week (columns, in calendar order)."""
+    calendar = calendar.sort_values('Ordinal', kind='mergesort')
+    attendance = attendance.reindex(columns=calendar['Week'])
+    fig = go.Figure(go.Heatmap(z=attendance.to_numpy(), x=calendar['Label'], y=attendance.index, colorscale='Greens', zmin=0,
+                               colorbar=dict(title='Sessions'), hovertemplate='%{y}<br>%{x}<br>%{z} sessions<extra></extra>'))
+    fig.update_layout(
+        title="Performed Sessions per Week",
+        xaxis=dict(title='Week'),
+        yaxis=dict(autorange='reversed'),
+        template='plotly_white'
+    )
+    return fig
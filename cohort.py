@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+import records
+import rollups
+
+COHORT_METRICS = ['Total_Prescribed_Sets', 'Total_Executed_Sets', 'Total_Lifted_Weight', 'Total_Reps', 'Average_Load',
+                  'Max_Weight', 'Relative_Intensity', 'Max_Relative_Intensity']
+
+
+def category_prs(histories):
+    """Heaviest successful set ever (any rep count) per athlete and category, from {athlete: PR history}."""
+    parts = []
+    for athlete, history in histories.items():
+        current = records.current_records(history)
+        current = current[current['Scope'] == 'Category']
+        parts.append(current.groupby('Name')['Weight'].max().rename('PR').rename_axis('Category').reset_index().assign(Athlete=athlete))
+    if not parts:
+        return pd.DataFrame({'Athlete': pd.Series(dtype='str'), 'Category': pd.Series(dtype='str'), 'PR': pd.Series(dtype='float64')})
+    return pd.concat(parts, ignore_index=True)[['Athlete', 'Category', 'PR']]
+
+
+def cohort_week_metrics(rollup, prs, selected_category):
+    """Weekly metrics per athlete for a (virtual) category, from the concatenated rollups of a cohort.
+
+    Same definitions as rollups.category_week_trend, computed for every athlete in one grouped
+    pass. Relative_Intensity is the rep-weighted mean of load / PR, with each row divided by
+    the athlete's PR of that row's category (so 'Overall' mixes lifts fairly); rows of a
+    category without a PR are left out of it. Max_Relative_Intensity is the heaviest set
+    relative to its PR.
+    """
+    rows = rollup[rollups.category_mask(rollup['Category'], selected_category)]
+    rows = rows.assign(Athlete=rows['Athlete'].astype(str), Week=rows['Week'].astype(str), Category=rows['Category'].astype(str))
+    keys = ['Athlete', 'Week']
+    prescribed = rollups.distinct_slots(rows, keys + ['Day of the Week'])
+    prescribed = prescribed.groupby(level=[0, 1]).sum() if not prescribed.empty else prescribed
+
+    pr = rows[['Athlete', 'Category']].merge(prs, on=['Athlete', 'Category'], how='left')['PR'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        has_pr = pr > 0
+        rows = rows.assign(
+            Relative_Volume=np.where(has_pr, rows['Total_Lifted_Weight'].to_numpy() / pr, 0.0),
+            Relative_Reps=np.where(has_pr, rows['Total_Reps'].to_numpy(), 0.0),
+            Relative_Max=np.where(has_pr, rows['Max_Weight'].to_numpy() / pr, np.nan),
+        )
+    executed = rows[rows['Executed_Sets'] > 0].groupby(keys).agg(
+        Total_Executed_Sets=('Executed_Sets', 'sum'),
+        Total_Lifted_Weight=('Total_Lifted_Weight', 'sum'),
+        Total_Reps=('Total_Reps', 'sum'),
+        Max_Weight=('Max_Weight', 'max'),
+        Relative_Volume=('Relative_Volume', 'sum'),
+        Relative_Reps=('Relative_Reps', 'sum'),
+        Max_Relative_Intensity=('Relative_Max', 'max'),
+    )
+    out = executed.join(prescribed.rename('Total_Prescribed_Sets'), how='outer') if not prescribed.empty else executed.assign(Total_Prescribed_Sets=0)
+    out = out.fillna(0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out['Average_Load'] = np.where(out['Total_Reps'] > 0, out['Total_Lifted_Weight'] / out['Total_Reps'], 0.0)
+        out['Relative_Intensity'] = np.where(out['Relative_Reps'] > 0, out['Relative_Volume'] / out['Relative_Reps'], 0.0)
+    out = out.rename_axis(keys).reset_index().sort_values(keys, kind='mergesort').reset_index(drop=True)
+    return out[keys + COHORT_METRICS]
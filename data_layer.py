@@ -0,0 +1,402 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+import pandas as pd
+
+import store
+import aggregator
+import rollups
+import records
+import cohort
+import workload
+import sessions
+import intensity
+import set_arrays
+import week_calendar
+import xlsx_stream
+import timing
+import training_db
+import athlete_index
+
+MAX_CACHE_ENTRIES = 256  # Loaded frames + derived aggregates kept in memory, least recently used evicted first
+
+
+class DataCache:
+    """Bounded, thread-safe LRU cache shared by every Streamlit session in the process.
+
+    Values are computed outside the lock, so two sessions asking for the same missing key at
+    the same time may both compute it; the last one wins, which is harmless.
+    """
+
+    def __init__(self, max_entries=MAX_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = DataCache()
+_hashes = {}  # (path, mtime_ns, size) -> sha256, so a file is hashed once per version
+_hashes_lock = threading.Lock()
+
+
+def get_cache():
+    return _cache
+
+
+def file_identity(path):
+    """(path, mtime, content hash) of a file: the cache key for anything loaded or derived from it.
+
+    The hash is only computed when the size/mtime pair has not been seen before, so on a rerun
+    this is a single stat call.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    stat_key = (path, st.st_mtime_ns, st.st_size)
+    with _hashes_lock:
+        digest = _hashes.get(stat_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        with _hashes_lock:
+            _hashes[stat_key] = digest
+    return (path, st.st_mtime_ns, digest)
+
+
+def _timed(name, compute, *args):
+    """compute(*args) as a timing span, with the row count of the frame it returns."""
+    with timing.span(name) as info:
+        result = compute(*args)
+        if isinstance(result, pd.DataFrame):
+            info['rows'] = len(result)
+    return result
+
+
+def stat_identity(path):
+    """(path, mtime, size) of a file: a cheap identity for metadata that is fine to re-read after a touch."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+def load_sheet_names(path):
+    """Sheet names of a workbook, without parsing any sheet."""
+    return _cache.get_or_compute(('sheet_names', stat_identity(path)), lambda: xlsx_stream.sheet_names(path))
+
+
+def load_sheet(path, sheet_name):
+    """One sheet of a workbook as a DataFrame, parsed once per file version."""
+    def read():
+        with timing.span('read_sheet', sheet=sheet_name, file=os.path.basename(path)) as info:
+            df = pd.read_excel(path, sheet_name=sheet_name)
+            info['rows'] = len(df)
+        return df
+
+    return _cache.get_or_compute(('sheet', file_identity(path), sheet_name), read).copy(deep=False)
+
+
+class WeekSheets(Mapping):
+    """{sheet name: DataFrame} of one workbook; names come from the workbook part, a sheet is parsed on first access."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __getitem__(self, sheet_name):
+        if sheet_name not in self:
+            raise KeyError(sheet_name)
+        return load_sheet(self.path, sheet_name)
+
+    def __contains__(self, sheet_name):
+        return sheet_name in load_sheet_names(self.path)
+
+    def __iter__(self):
+        return iter(load_sheet_names(self.path))
+
+    def __len__(self):
+        return len(load_sheet_names(self.path))
+
+
+class WorkbookCatalog(Mapping):
+    """{week name: WeekSheets} of the weekly workbooks in a folder.
+
+    Only the file names are read up front. Parsed sheets live in the shared bounded cache, so
+    memory follows what is viewed rather than the size of the folder.
+    """
+
+    def __init__(self, folder_path):
+        self.paths = week_workbooks(folder_path)
+
+    def __getitem__(self, week_name):
+        return WeekSheets(self.paths[week_name])
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def identity(self):
+        """Cache identity of the folder's workbooks, from their stats (no file contents are read)."""
+        return tuple(stat_identity(p) for p in sorted(self.paths.values()))
+
+
+def week_workbooks(folder_path):
+    """{week name: workbook path} for the weekly workbooks (<year>_<week>.xlsx) in a folder."""
+    return {f.split('.')[0]: os.path.join(folder_path, f) for f in aggregator.list_week_files(folder_path)}
+
+
+def load_index(output_dir):
+    """The aggregator's athlete index ({athlete name: entry}), or None when there is none."""
+    path = athlete_index.index_path(output_dir)
+    if not os.path.exists(path):
+        return None
+    return _cache.get_or_compute(('index', file_identity(path)), lambda: athlete_index.load_index(output_dir))
+
+
+def list_athletes(output_dir):
+    """{athlete name: aggregated file} of every athlete: from the index, else from the CSV file names."""
+    index = load_index(output_dir)
+    if index:
+        return {name: entry['file'] for name, entry in sorted(index.items(), key=lambda item: item[0].lower())}
+    files = sorted((f for f in os.listdir(output_dir) if f.endswith('.csv')), key=str.lower)
+    return {f.replace('.csv', '').replace('_', ' '): f for f in files}
+
+
+def athlete_files(output_dir, athlete_file):
+    """The files an athlete's aggregated data is read from: its Parquet store files, or the CSVs."""
+    athlete_key = athlete_file.replace('.csv', '')
+    if store.has_athlete(output_dir, athlete_key):
+        store_dir = store.athlete_store_dir(output_dir, athlete_key)
+        return [os.path.join(store_dir, f) for f in sorted(os.listdir(store_dir)) if f.endswith('.parquet')]
+    return [p for p in aggregator.athlete_csv_paths(output_dir, athlete_key) if os.path.exists(p)]
+
+
+def files_identity(paths):
+    return tuple(file_identity(p) for p in paths)
+
+
+def athlete_identity(output_dir, athlete_file):
+    """Cache identity of an athlete's aggregated data (changes whenever the aggregator rewrites it)."""
+    return files_identity(athlete_files(output_dir, athlete_file))
+
+
+def load_set_arrays(output_dir):
+    """Memory maps of the aggregator's set arrays, opened once per build (None without arrays)."""
+    path = set_arrays.current_path(output_dir)
+    if not os.path.exists(path):
+        return None
+
+    def open_arrays():
+        current = set_arrays.load_current(output_dir)
+        return set_arrays.SetArrays(output_dir, current) if current else None
+
+    return _cache.get_or_compute(('set_arrays', stat_identity(path)), open_arrays)
+
+
+def _read_athlete(output_dir, athlete_file):
+    athlete_key = athlete_file.replace('.csv', '')
+    arrays = load_set_arrays(output_dir)
+    if arrays is not None and arrays.has_athlete(athlete_key):
+        # Set columns mapped from the shared arrays; only the remaining columns are read from the store
+        with timing.span('read_set_arrays', athlete=athlete_key) as info:
+            other = [c for c in store.VIEW_COLUMNS + intensity.INTENSITY_COLUMNS if c not in set_arrays.ARRAY_DTYPES]
+            rest = store.read_athlete(output_dir, athlete_key, columns=['Category'] + other)
+            rest = rest[rest['Category'].notna()]
+            mapped = arrays.athlete_frame(athlete_key).set_axis(rest.index)
+            df = pd.concat([mapped, rest[[c for c in other if c in rest.columns]]], axis=1, copy=False)
+            df = df[[c for c in store.VIEW_COLUMNS + intensity.INTENSITY_COLUMNS if c in df.columns]]
+            info['rows'] = len(df)
+    elif store.has_athlete(output_dir, athlete_key):
+        # Category is already cleaned in the store; notes rows have no category
+        with timing.span('read_store', athlete=athlete_key) as info:
+            df = store.read_athlete(output_dir, athlete_key, columns=store.VIEW_COLUMNS + intensity.INTENSITY_COLUMNS)
+            df = df[df['Category'].notna()]
+            info['rows'] = len(df)
+    else:
+        with timing.span('read_csv', athlete=athlete_key) as info:
+            df = aggregator.read_athlete_csv(output_dir, athlete_key)
+            info['rows'] = len(df)
+        # Typed and with canonical category/exercise names, like the store has them
+        with timing.span('normalize', athlete=athlete_key, rows=len(df)):
+            df = store.to_store_frame(df)[store.VIEW_COLUMNS]
+        # Remove rows with a missing or empty category
+        df = df[df['Category'].notna()]
+    # Ensure 'Volume' column exists for all downstream operations
+    if 'Volume' not in df.columns:
+        df['Volume'] = df['Set_Reps'].astype('float64') * df['Set_Weight']
+    # Stores written before the intensity columns existed, and the CSV fallback, compute them here
+    if 'E1RM' not in df.columns:
+        with timing.span('intensity_columns', athlete=athlete_key, rows=len(df)):
+            df = intensity.add_intensity_columns(df)
+    return df
+
+
+def load_athlete(output_dir, athlete_file):
+    """An athlete's set-level rows (store when present, else CSV), read once per data version."""
+    key = ('athlete', athlete_identity(output_dir, athlete_file))
+    return _cache.get_or_compute(key, lambda: _read_athlete(output_dir, athlete_file)).copy(deep=False)
+
+
+def load_athlete_week(output_dir, athlete_file, week):
+    """All columns (including notes and comments) of one athlete week."""
+    athlete_key = athlete_file.replace('.csv', '')
+
+    def read():
+        if store.has_athlete(output_dir, athlete_key):
+            week_df = store.read_athlete(output_dir, athlete_key, weeks=[week])
+            return week_df[week_df['Category'].notna()]
+        df = load_athlete(output_dir, athlete_file)
+        return df[df['Week'] == week]
+
+    key = ('athlete_week', athlete_identity(output_dir, athlete_file), str(week))
+    return _cache.get_or_compute(key, read).copy(deep=False)
+
+
+def e1rm_formula(entry):
+    """1RM formula of an athlete's stored intensity columns (the current one when computed on load)."""
+    return (entry or {}).get('e1rm_formula', intensity.E1RM_FORMULA)
+
+
+def load_rollup(output_dir, athlete_file):
+    """An athlete's weekly rollup: the one the aggregator materialized, else built from the set-level rows."""
+    athlete_key = athlete_file.replace('.csv', '')
+    if rollups.has_rollup(output_dir, athlete_key):
+        path = rollups.rollup_path(output_dir, athlete_key)
+        return _cache.get_or_compute(('rollup', file_identity(path)), lambda: _timed('read_rollup', rollups.read_rollup, output_dir, athlete_key))
+    key = ('rollup', athlete_identity(output_dir, athlete_file))
+    return _cache.get_or_compute(key, lambda: _timed('weekly_rollup', rollups.weekly_rollup, load_athlete(output_dir, athlete_file)))
+
+
+def load_records(output_dir, athlete_file):
+    """An athlete's PR history: the one the aggregator maintains, else built from the set-level rows."""
+    athlete_key = athlete_file.replace('.csv', '')
+    if records.has_records(output_dir, athlete_key):
+        path = records.records_path(output_dir, athlete_key)
+        return _cache.get_or_compute(('records', file_identity(path)), lambda: _timed('read_records', records.read_records, output_dir, athlete_key))
+    key = ('records', athlete_identity(output_dir, athlete_file))
+    return _cache.get_or_compute(key, lambda: _timed('pr_history', records.pr_history, load_athlete(output_dir, athlete_file)))
+
+
+def load_cohort(output_dir, athletes, selected_category):
+    """Weekly cohort metrics (cohort.cohort_week_metrics) of {display name: athlete file} for one category.
+
+    Rollups and PR histories come from the per-athlete caches; the result is memoized on the
+    identity of all of them, so changing the selection or category reuses every loaded file.
+    """
+    names = sorted(athletes)
+    rollup_parts = [load_rollup(output_dir, athletes[name]) for name in names]
+    histories = {name: load_records(output_dir, athletes[name]) for name in names}
+    identity = tuple(athlete_identity(output_dir, athletes[name]) for name in names)
+
+    def compute():
+        # The display name labels each athlete, whatever the rows call them
+        parts = [part.assign(Athlete=name) for name, part in zip(names, rollup_parts)]
+        return cohort.cohort_week_metrics(pd.concat(parts, ignore_index=True), cohort.category_prs(histories), selected_category)
+
+    return memoize('cohort', identity, (tuple(names), selected_category), compute)
+
+
+def load_workload(output_dir, athlete_file):
+    """An athlete's daily workload table: the one the aggregator maintains, else computed from the set-level rows."""
+    athlete_key = athlete_file.replace('.csv', '')
+    if workload.has_workload(output_dir, athlete_key):
+        path = workload.workload_path(output_dir, athlete_key)
+        return _cache.get_or_compute(('workload', file_identity(path)), lambda: _timed('read_workload', workload.read_workload, output_dir, athlete_key))
+    key = ('workload', athlete_identity(output_dir, athlete_file))
+    return _cache.get_or_compute(key, lambda: _timed('athlete_workload', workload.athlete_workload, load_athlete(output_dir, athlete_file)))
+
+
+def load_squad_workload(output_dir, athletes, selected_category):
+    """End-of-week workload of {display name: athlete file} for one category, one row per athlete and week."""
+    names = sorted(athletes)
+    tables = [load_workload(output_dir, athletes[name]) for name in names]
+    identity = tuple(athlete_identity(output_dir, athletes[name]) for name in names)
+
+    def compute():
+        parts = [workload.weekly_workload(table[table['Category'] == selected_category]).assign(Athlete=name)
+                 for name, table in zip(names, tables)]
+        if not parts:
+            return pd.DataFrame(columns=['Athlete'] + workload.WORKLOAD_COLUMNS)
+        return pd.concat(parts, ignore_index=True)[['Athlete'] + workload.WORKLOAD_COLUMNS]
+
+    return memoize('squad_workload', identity, (tuple(names), selected_category), compute)
+
+
+def load_sessions(output_dir, athlete_file):
+    """An athlete's session table: the one the aggregator maintains, else computed from the set-level rows."""
+    athlete_key = athlete_file.replace('.csv', '')
+    if sessions.has_sessions(output_dir, athlete_key):
+        path = sessions.sessions_path(output_dir, athlete_key)
+        return _cache.get_or_compute(('sessions', file_identity(path)), lambda: _timed('read_sessions', sessions.read_sessions, output_dir, athlete_key))
+    key = ('sessions', athlete_identity(output_dir, athlete_file))
+    return _cache.get_or_compute(key, lambda: _timed('session_table', sessions.session_table, load_athlete(output_dir, athlete_file)))
+
+
+def load_squad_sessions(output_dir, athletes):
+    """Session tables of {display name: athlete file} in one frame, with an Athlete column."""
+    names = sorted(athletes)
+    tables = [load_sessions(output_dir, athletes[name]) for name in names]
+    identity = tuple(athlete_identity(output_dir, athletes[name]) for name in names)
+
+    def compute():
+        if not names:
+            return pd.DataFrame(columns=['Athlete'] + sessions.SESSION_COLUMNS)
+        parts = [table.assign(Athlete=name) for name, table in zip(names, tables)]
+        return pd.concat(parts, ignore_index=True)[['Athlete'] + sessions.SESSION_COLUMNS]
+
+    return memoize('squad_sessions', identity, (tuple(names),), compute)
+
+
+def has_database(output_dir):
+    return os.path.exists(training_db.db_path(output_dir))
+
+
+def query(output_dir, sql, params=()):
+    """Result of a read-only SQL query on the training database, cached until the database changes.
+
+    Filters and aggregations run inside SQLite, so only the result is loaded into pandas.
+    """
+    key = ('query', stat_identity(training_db.db_path(output_dir)), sql, tuple(params))
+    return _cache.get_or_compute(key, lambda: _timed('sql_query', training_db.query, output_dir, sql, params)).copy(deep=False)
+
+
+def load_calendar(weeks):
+    """Calendar table (dates, label, ordinal, season, block) of a list of week codes, indexed by code."""
+    weeks = tuple(str(w) for w in weeks)
+    return _cache.get_or_compute(('calendar', weeks), lambda: week_calendar.week_calendar(weeks).set_index('Week', drop=False))
+
+
+def memoize(name, identity, args, compute):
+    """Memoize a derived aggregate keyed by the identity of the data it came from plus its arguments.
+
+    The returned object is shared between sessions and must be treated as read-only.
+    """
+    return _cache.get_or_compute(('derived', name, identity, args), lambda: _timed(name, compute))
@@ -0,0 +1,98 @@
+import os
+import numpy as np
+import pandas as pd
+
+MAX_E1RM_REPS = 12  # Sets with more reps than this get no 1RM estimate; the formulas drift past it
+# %1RM that can be lifted for n reps at RPE 10 (the last column of the usual RPE chart)
+RPE10_PERCENT = {1: 1.0, 2: 0.955, 3: 0.922, 4: 0.892, 5: 0.863, 6: 0.837, 7: 0.811, 8: 0.786, 9: 0.762, 10: 0.739, 11: 0.707, 12: 0.68}
+# Name -> estimated 1RM from (reps, weight) arrays
+E1RM_FORMULAS = {
+    'epley': lambda reps, weight: weight * (1 + reps / 30),
+    'brzycki': lambda reps, weight: weight * 36 / (37 - reps),
+    'rpe': lambda reps, weight: weight / np.interp(reps, list(RPE10_PERCENT), list(RPE10_PERCENT.values())),
+}
+E1RM_FORMULA = os.environ.get('OKANAGAN_WL_E1RM_FORMULA', 'epley')  # Formula the aggregator stores; the index records it
+# Lower bound of each intensity zone (load / best estimated 1RM); the top four are Prilepin's zones
+ZONE_EDGES = [0.0, 0.55, 0.70, 0.80, 0.90]
+ZONES = ['<55%', '55-69%', '70-79%', '80-89%', '90%+']
+# Zone -> (optimal, lowest, highest) total reps per exercise in a session, from Prilepin's chart
+PRILEPIN_REPS = {'55-69%': (24, 18, 30), '70-79%': (18, 12, 24), '80-89%': (15, 10, 20), '90%+': (7, 4, 10)}
+INTENSITY_COLUMNS = ['E1RM', 'E1RM_Best', 'E1RM_Intensity', 'Intensity_Zone']
+
+
+def estimated_1rm(reps, weight, formula=None):
+    """Estimated 1RM of sets from their reps and weight; a single is its own 1RM, no estimate past MAX_E1RM_REPS."""
+    reps = np.asarray(reps, dtype=float)
+    weight = np.asarray(weight, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        estimate = E1RM_FORMULAS[formula or E1RM_FORMULA](reps, weight)
+        return np.where(reps == 1, weight, np.where((reps > 1) & (reps <= MAX_E1RM_REPS) & (weight > 0), estimate, np.nan))
+
+
+def add_intensity_columns(df, formula=None):
+    """Add the estimated 1RM of every executed set and its intensity against the athlete's best estimate.
+
+    E1RM_Best is the best estimate for the (normalized) exercise up to and including the set's
+    session, in week/day order, so intensities never look at later sessions. E1RM_Intensity is
+    the set's weight over it and Intensity_Zone its ZONES bucket.
+    """
+    reps = df['Set_Reps'].to_numpy(dtype=float, na_value=np.nan)
+    weight = df['Set_Weight'].to_numpy(dtype=float, na_value=np.nan)
+    lifted = (reps > 0) & (weight > 0) & df['Exercise'].notna().to_numpy()
+    e1rm = np.where(lifted, estimated_1rm(reps, weight, formula), np.nan)
+
+    keys = ['Exercise', 'Week', 'Day']
+    sessions = pd.DataFrame({
+        'Exercise': df['Exercise'].astype('string').to_numpy(),
+        'Week': df['Week'].astype(str).to_numpy(),
+        'Day': pd.to_numeric(df['Day of the Week'], errors='coerce').to_numpy(dtype=float, na_value=np.nan),
+        'E1RM': e1rm,
+    })
+    best = sessions.groupby(keys, dropna=False, sort=False)['E1RM'].max().reset_index()
+    best = best.sort_values(['Week', 'Day'], kind='mergesort', na_position='last')
+    # Running best per exercise; sessions without an estimate keep the best so far
+    best['E1RM_Best'] = best.groupby('Exercise', dropna=False)['E1RM'].cummax()
+    best['E1RM_Best'] = best.groupby('Exercise', dropna=False)['E1RM_Best'].ffill()
+    running = sessions[keys].merge(best[keys + ['E1RM_Best']], on=keys, how='left')['E1RM_Best'].to_numpy()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.where(lifted & (running > 0), weight / running, np.nan)
+    out = df.copy()
+    out['E1RM'] = e1rm
+    out['E1RM_Best'] = np.where(lifted, running, np.nan)
+    out['E1RM_Intensity'] = relative
+    out['Intensity_Zone'] = pd.cut(relative, ZONE_EDGES + [np.inf], labels=ZONES, right=False)
+    return out
+
+
+def best_e1rm_table(df):
+    """Best estimated 1RM per category and exercise, with the set it came from."""
+    sets = df[df['E1RM'].notna()]
+    rows = sets.loc[sets.groupby(['Category', 'Exercise'], observed=True)['E1RM'].idxmax().to_numpy()]
+    return pd.DataFrame({
+        'Category': rows['Category'].astype(str).to_numpy(),
+        'Exercise': rows['Exercise'].astype(str).to_numpy(),
+        'Estimated_1RM': rows['E1RM'].round(1).to_numpy(),
+        'Set': [f"{reps:g} x {weight:g}" for reps, weight in zip(rows['Set_Reps'], rows['Set_Weight'])],
+        'Week': rows['Week'].astype(str).to_numpy(),
+    }).sort_values(['Category', 'Estimated_1RM'], ascending=[True, False]).reset_index(drop=True)
+
+
+def zone_week_reps(df):
+    """Reps lifted per week and intensity zone, zones in ZONES order."""
+    sets = df[df['Intensity_Zone'].notna()]
+    return sets.groupby([sets['Week'].astype(str), 'Intensity_Zone'], observed=True)['Set_Reps'].sum().rename('Reps').reset_index()
+
+
+def prilepin_table(df):
+    """Average reps per exercise session in each zone next to Prilepin's optimal total and range."""
+    sets = df[df['Intensity_Zone'].notna()]
+    per_session = sets.groupby(['Intensity_Zone', sets['Week'].astype(str), 'Day of the Week', 'Exercise'], observed=True)['Set_Reps'].sum()
+    zones = per_session.groupby(level=0, observed=True).agg(['size', 'mean']).reindex(ZONES)
+    return pd.DataFrame({
+        'Zone': ZONES,
+        'Sessions': zones['size'].fillna(0).astype(int).to_numpy(),
+        'Reps_per_Session': zones['mean'].round(1).to_numpy(),
+        'Prilepin_Optimal': [PRILEPIN_REPS.get(zone, (None,) * 3)[0] for zone in ZONES],
+        'Prilepin_Range': [f"{PRILEPIN_REPS[zone][1]}-{PRILEPIN_REPS[zone][2]}" if zone in PRILEPIN_REPS else '' for zone in ZONES],
+    })
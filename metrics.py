@@ -0,0 +1,118 @@
+import numpy as np
+import pandas as pd
+
+SET_COUNT = 8  # Set columns in the weekly workbooks: 'Set 1 Reps', 'Set 1 Weight', ... 'Set 8 Weight'
+
+
+def set_matrix(data, kind, set_count=SET_COUNT):
+    """(n_rows x set_count) float array of the 'Set i <kind>' columns; missing columns and non-numeric cells are NaN."""
+    out = np.full((len(data), set_count), np.nan)
+    for i in range(set_count):
+        col = f'Set {i + 1} {kind}'
+        if col in data.columns:
+            out[:, i] = pd.to_numeric(data[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    return out
+
+
+def numeric_column(data, col):
+    if col not in data.columns:
+        return np.full(len(data), np.nan)
+    return pd.to_numeric(data[col], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+def row_metrics(data, set_count=SET_COUNT):
+    """Per-row training metrics for wide (one row per prescription) data, in a single pass.
+
+    Two notions of an executed set are used, matching the views that introduced them:
+    - 'Total_Executed_Sets', 'Executed Reps', 'Total Volume', 'Missed Lifts', 'Adherence':
+      every set with reps filled in (volume only where the weight is filled in too).
+    - 'Total Executed Sets', 'Total Reps', 'Total Lifted Weight', 'Average Load', 'Max Weight':
+      only sets with reps > 0 and a weight, i.e. successful lifts.
+    """
+    reps = set_matrix(data, 'Reps', set_count)
+    weights = set_matrix(data, 'Weight', set_count)
+    has_reps = ~np.isnan(reps)
+    has_both = has_reps & ~np.isnan(weights)
+    lifted = has_both & (reps > 0)
+
+    planned_sets = numeric_column(data, 'Sets')
+    completed_sets = has_reps.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        adherence = np.where(planned_sets > 0, completed_sets / planned_sets, 0.0)
+
+    prescribed_reps = numeric_column(data, 'Reps')[:, None]
+    missed = np.where(has_reps & ~np.isnan(prescribed_reps), np.maximum(0, prescribed_reps - reps), 0.0)
+
+    lifted_weight = np.where(lifted, reps * weights, 0.0).sum(axis=1)
+    lifted_reps = np.where(lifted, reps, 0.0).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        average_load = np.where(lifted_reps > 0, lifted_weight / lifted_reps, 0.0)
+    max_weight = np.where(lifted.any(axis=1), np.where(lifted, weights, -np.inf).max(axis=1), 0.0)
+
+    return pd.DataFrame({
+        'Adherence': adherence,
+        'Total Volume': np.where(has_both, reps * weights, 0.0).sum(axis=1),
+        'Missed Lifts': missed.sum(axis=1),
+        'Total_Executed_Sets': completed_sets,
+        'Executed Reps': np.where(has_reps, reps, 0.0).sum(axis=1),
+        'Total Lifted Weight': lifted_weight,
+        'Total Reps': lifted_reps,
+        'Total Executed Sets': lifted.sum(axis=1),
+        'Average Load': average_load,
+        'Max Weight': max_weight,
+    }, index=data.index)
+
+
+def category_metrics(data, categories, set_count=SET_COUNT):
+    """Prescribed/executed sets, missed lifts and average load per category (categories without rows get zeros)."""
+    rows = row_metrics(data, set_count)
+    rows['Sets'] = numeric_column(data, 'Sets')
+    totals = rows.groupby(data['Category']).sum().reindex(categories, fill_value=0)
+    metrics = []
+    for category, row in totals.iterrows():
+        average_load = round(row['Total Volume'] / row['Executed Reps'], 2) if row['Executed Reps'] > 0 else 0
+        metrics.append({
+            'Category': category,
+            'Total Prescribed Sets': round(row['Sets'], 2),
+            'Total Executed Sets': round(row['Total_Executed_Sets'], 2),
+            'Total Missed Lifts': round(row['Missed Lifts'], 2),
+            'Average Load Lifted': round(average_load, 2) if row['Sets'] > 0 else 0
+        })
+    return pd.DataFrame(metrics)
+
+
+def best_lift(max_weight):
+    """(weight, row label) of the heaviest lift in a 'Max Weight' series, or (0, None) if nothing above 0 was lifted.
+
+    Ties go to the first row, like scanning the rows in order.
+    """
+    if not (max_weight > 0).any():
+        return 0, None
+    best = max_weight.idxmax()
+    return max_weight[best], best
+
+
+def personal_records_1rm(df):
+    """Heaviest single (1-rep set) per category of set-level rows, with the week and exercise it was lifted in."""
+    # Only consider rows where Set_Reps == 1 and Set_Weight is not null and > 0
+    pr_df = df[(df['Set_Reps'] == 1) & (df['Set_Weight'].notna()) & (df['Set_Weight'] > 0)]
+    # Find PR for each category and get the corresponding week and exercise
+    return (
+        pr_df.loc[pr_df.groupby('Category', observed=True)['Set_Weight'].idxmax()]
+        .groupby('Category', observed=True)
+        .agg(Personal_Record_1RM_Weight=('Set_Weight', 'max'),
+             Week=('Week', 'first'),
+             Exercise=('Exercise', 'first'))
+        .reset_index()
+    )
+
+
+def week_category_metrics(week_df):
+    """Volume, reps, executed sets and max weight per category of one week's set-level rows."""
+    volume = week_df['Set_Reps'] * week_df['Set_Weight']
+    return week_df.assign(Volume=volume).groupby(['Category'], observed=True).agg(
+        Total_Volume=('Volume', 'sum'),
+        Total_Reps=('Set_Reps', 'sum'),
+        Total_Executed_Sets=('Set', 'count'),
+        Max_Weight=('Set_Weight', 'max')
+    ).reset_index()
@@ -0,0 +1,77 @@
+import re
+import difflib
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+NORMALIZATION_VERSION = 1  # Bump when the rules or tables below change; the aggregator then rebuilds its derived outputs
+FUZZY_CUTOFF = 0.85  # difflib similarity needed to map an unseen spelling onto a known name
+
+# Canonical categories, title-cased like the rest of the store
+CATEGORIES = ['Snatch', 'Clean', 'Jerk', 'Clean And Jerk', 'Squat', 'Snatch Pull', 'Clean Pull', 'Accessory']
+# Folded spelling -> canonical name, for variants that folding alone does not fix
+CATEGORY_ALIASES = {
+    'clean & jerk': 'Clean And Jerk',
+    'accessorio': 'Accessory',
+    'front squat': 'Squat',
+    'back squat': 'Squat',
+    'gambe dietro': 'Squat',
+    'gambe avanti': 'Squat',
+}
+EXERCISE_ALIASES = {
+    'gambe dietro': 'Back Squat',
+    'gambe avanti': 'Front Squat',
+    'strappo da terra': 'Strappo',
+    'tirata slancio': 'Tirate Slancio',
+    'tirata strappo': 'Tirate Strappo',
+    'spinta': 'Spinta In Spaccata',
+    'clean & jerk': 'Clean And Jerk',
+}
+# Column -> (aliases, closed vocabulary, fuzzy matching on by default)
+RULES = {
+    'Category': (CATEGORY_ALIASES, CATEGORIES, True),
+    'Exercise': (EXERCISE_ALIASES, [], False),
+}
+
+
+def fold(text):
+    """Case-folded text with whitespace trimmed and collapsed; the key used for every lookup."""
+    return re.sub(r'\s+', ' ', str(text)).strip().casefold()
+
+
+@lru_cache(maxsize=None)
+def canonical(column, text, fuzzy=None):
+    """Canonical name of one Category/Exercise spelling, or None if it is empty.
+
+    Aliases win, then the column's vocabulary, then (with fuzzy matching) the closest known
+    spelling; anything else is kept, title-cased.
+    """
+    aliases, vocabulary, fuzzy_default = RULES[column]
+    key = fold(text)
+    if not key or key == 'nan':
+        return None
+    if key in aliases:
+        return aliases[key]
+    known = {fold(name): name for name in vocabulary}
+    known.update({fold(name): name for name in aliases.values()})
+    if key in known:
+        return known[key]
+    if fuzzy_default if fuzzy is None else fuzzy:
+        match = difflib.get_close_matches(key, list(known) + list(aliases), n=1, cutoff=FUZZY_CUTOFF)
+        if match:
+            return aliases.get(match[0], known.get(match[0]))
+    return key.title()
+
+
+def normalize(series, column, fuzzy=None):
+    """Canonical names of a Category/Exercise column as a categorical Series.
+
+    Only the distinct spellings are normalized (and memoized across calls); rows just get codes.
+    """
+    codes, uniques = pd.factorize(series)
+    names = [canonical(column, value, fuzzy) for value in uniques]
+    categories = sorted({name for name in names if name is not None})
+    lookup = {name: i for i, name in enumerate(categories)}
+    # Factorize marks missing values with -1, which picks the trailing -1 here
+    new_codes = np.array([lookup[name] if name is not None else -1 for name in names] + [-1], dtype='int64')
+    return pd.Series(pd.Categorical.from_codes(new_codes[codes], categories), index=series.index, name=series.name)
@@ -0,0 +1,122 @@
+import os
+import numpy as np
+import pandas as pd
+
+import store
+
+RECORDS_DIR = "records"  # Sub-directory of the aggregated output, one <athlete>.parquet of PR history per athlete
+SCOPES = ['Category', 'Exercise']  # Records are kept per category and per exercise
+HISTORY_COLUMNS = ['Scope', 'Name', 'Reps', 'Weight', 'Previous_Weight', 'Week', 'Day of the Week', 'Category', 'Exercise']
+HISTORY_DTYPES = {'Scope': 'str', 'Name': 'str', 'Reps': 'int64', 'Weight': 'float64', 'Previous_Weight': 'float64',
+                  'Week': 'str', 'Day of the Week': 'string', 'Category': 'string', 'Exercise': 'string'}
+
+
+def session_bests(df):
+    """Heaviest successful set per (scope, name, rep count) in each session (week, day), in chronological order.
+
+    A rep count is the reps actually done in the set, so the 3RM is the heaviest set of exactly 3;
+    sets with a fractional rep count are left out. Ties within a session go to the first row.
+    """
+    sets = df[df['Category'].notna() & (df['Set_Reps'] >= 1) & (df['Set_Reps'] % 1 == 0) & (df['Set_Weight'] > 0)]
+    sets = sets.assign(
+        Reps=sets['Set_Reps'].astype('int64'),
+        Weight=sets['Set_Weight'].astype(float),
+        Week=sets['Week'].astype(str),
+        Day=pd.to_numeric(sets['Day of the Week'], errors='coerce'),
+    )
+    sets = sets.sort_values(['Week', 'Day'], kind='mergesort', na_position='last')
+    parts = []
+    for scope in SCOPES:
+        rows = sets[sets[scope].notna()]
+        rows = rows.assign(Scope=scope, Name=rows[scope].astype(str))
+        best = rows.groupby(['Name', 'Reps', 'Week', 'Day of the Week'], sort=False, dropna=False)['Weight'].idxmax()
+        parts.append(rows.loc[best.to_numpy()])
+    bests = pd.concat(parts, ignore_index=True) if parts else sets.iloc[:0]
+    return bests.sort_values(['Week', 'Day'], kind='mergesort', na_position='last')
+
+
+def record_events(bests, seed=None):
+    """The sessions whose best beat every earlier session (and the `seed` maxima) for their key."""
+    if bests.empty:
+        return pd.DataFrame({col: pd.Series(dtype=HISTORY_DTYPES[col]) for col in HISTORY_COLUMNS})
+    keys = ['Scope', 'Name', 'Reps']
+    # Running maximum of the sessions before each one, per key
+    running = bests.groupby(keys, sort=False)['Weight'].cummax()
+    previous = running.groupby([bests[k] for k in keys], sort=False).shift(1)
+    if seed is not None and not seed.empty:
+        seeded = bests[keys].merge(seed, on=keys, how='left')['Weight'].to_numpy()
+        previous = pd.Series(np.fmax(previous.to_numpy(), seeded), index=bests.index)
+    events = bests.assign(Previous_Weight=previous)
+    events = events[previous.isna() | (bests['Weight'] > previous)]
+    return events[HISTORY_COLUMNS].astype(HISTORY_DTYPES).reset_index(drop=True)
+
+
+def pr_history(store_df):
+    """Full PR history of an athlete: one row per session that set a new record for a (scope, name, reps) key."""
+    return record_events(session_bests(store_df))
+
+
+def current_records(history):
+    """Current record per (scope, name, reps): the last event of each key."""
+    return history.drop_duplicates(['Scope', 'Name', 'Reps'], keep='last').reset_index(drop=True)
+
+
+def extend_history(history, new_rows):
+    """Extend a PR history with rows from weeks after everything it covers, without rescanning older weeks."""
+    seed = current_records(history)[['Scope', 'Name', 'Reps', 'Weight']]
+    events = record_events(session_bests(new_rows), seed)
+    if history.empty or events.empty:
+        return events if history.empty else history
+    return pd.concat([history, events], ignore_index=True)
+
+
+def category_1rm_table(history):
+    """Heaviest single per category with the week and exercise it was lifted in (the viewer's PR table)."""
+    rows = current_records(history)
+    rows = rows[(rows['Scope'] == 'Category') & (rows['Reps'] == 1)].sort_values('Name')
+    return pd.DataFrame({
+        'Category': rows['Name'].to_numpy(),
+        'Personal_Record_1RM_Weight': rows['Weight'].to_numpy(),
+        'Week': rows['Week'].to_numpy(),
+        'Exercise': rows['Exercise'].to_numpy(),
+    })
+
+
+def rep_max_table(history, scope='Category', max_reps=5):
+    """Current 1RM..<max_reps>RM per category (or exercise) as a Name x '<n>RM' table."""
+    rows = current_records(history)
+    rows = rows[(rows['Scope'] == scope) & (rows['Reps'] <= max_reps)]
+    table = rows.pivot(index='Name', columns='Reps', values='Weight').sort_index()
+    table.columns = [f"{reps}RM" for reps in table.columns]
+    table.index.name = scope
+    return table
+
+
+def record_progression(history, scope, name, reps):
+    """Every record set for one (scope, name, reps) key, oldest first."""
+    return history[(history['Scope'] == scope) & (history['Name'] == name) & (history['Reps'] == reps)].reset_index(drop=True)
+
+
+def records_path(output_dir, athlete):
+    return os.path.join(output_dir, RECORDS_DIR, f"{store.athlete_key(athlete)}.parquet")
+
+
+def has_records(output_dir, athlete):
+    return os.path.exists(records_path(output_dir, athlete))
+
+
+def write_records(output_dir, athlete, history):
+    path = records_path(output_dir, athlete)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    history.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def remove_records(output_dir, athlete):
+    if has_records(output_dir, athlete):
+        os.remove(records_path(output_dir, athlete))
+
+
+def read_records(output_dir, athlete):
+    return pd.read_parquet(records_path(output_dir, athlete))
@@ -0,0 +1,173 @@
+import os
+import html
+import argparse
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+import charts
+import data_layer
+import metrics
+import records
+import rollups
+import store
+
+AGGREGATED_DIR = "aggregated_athletes"
+REPORT_DIR = "reports"  # Reports land in <REPORT_DIR>/<week>/<athlete>/
+TREND_WEEKS = 12  # Weeks of trend shown in a report, ending with the report week
+# Table file name -> heading in the HTML report
+TABLE_TITLES = {
+    'weekly_metrics': "Weekly Metrics by Category",
+    'trends': "Trends by Category",
+    'personal_records': "Personal Records (1RM)",
+    'rep_maxes': "Rep Maxes by Category",
+}
+
+
+def athlete_weeks(output_dir, name, athlete_file):
+    entry = (data_layer.load_index(output_dir) or {}).get(name)
+    if entry:
+        return entry['weeks']
+    return sorted(data_layer.load_athlete(output_dir, athlete_file)['Week'].dropna().astype(str).unique())
+
+
+def report_weeks(output_dir, athletes):
+    """Every week any of {athlete name: file} has data for."""
+    return sorted({week for name, athlete_file in athletes.items() for week in athlete_weeks(output_dir, name, athlete_file)})
+
+
+def latest_week(output_dir, athletes):
+    """The most recent week any of the athletes has data for."""
+    weeks = report_weeks(output_dir, athletes)
+    if not weeks:
+        return None
+    calendar = data_layer.load_calendar(weeks)
+    return calendar['Week'].iloc[calendar['Ordinal'].to_numpy().argmax()]
+
+
+def athlete_report(output_dir, name, athlete_file, week, trend_weeks=TREND_WEEKS):
+    """(tables, figures) of one athlete's report for a week: {file name: DataFrame}, {category: trend figure}.
+
+    The same data layer and metric functions as the viewer, so the numbers match what it shows.
+    """
+    weeks = athlete_weeks(output_dir, name, athlete_file)
+    calendar = data_layer.load_calendar(sorted(set(weeks) | {week}))
+    report_ordinal = calendar.loc[week, 'Ordinal']
+    if report_ordinal < 0:
+        raise ValueError(f"not a week code: {week}")
+    shown = [w for w in weeks if calendar.loc[w, 'Ordinal'] <= report_ordinal][-trend_weeks:]
+
+    if week in weeks:
+        week_df = data_layer.load_athlete_week(output_dir, athlete_file, week)
+    else:
+        week_df = data_layer.load_athlete(output_dir, athlete_file).iloc[:0]
+    tables = {'weekly_metrics': metrics.week_category_metrics(week_df)}
+
+    rollup = data_layer.load_rollup(output_dir, athlete_file)
+    prescribed = rollup[rollup['Week'].astype(str).isin(shown) & (rollup['Prescribed_Sets'] > 0)]['Category'].dropna().astype(str).unique()
+    figures = {}
+    trends = []
+    for category in rollups.trend_categories(sorted(prescribed)):
+        trend = rollups.category_week_trend(rollup, category, shown)
+        trend['Week_Label'] = trend['Week'].map(calendar['Label'])
+        figures[category] = charts.category_trend_figure(trend, category)
+        trends.append(trend.assign(Category=category))
+    tables['trends'] = pd.concat(trends, ignore_index=True) if trends else pd.DataFrame()
+
+    # Only records set up to the report week, so reports of past weeks do not show later ones
+    pr_history = data_layer.load_records(output_dir, athlete_file)
+    history_weeks = pr_history['Week'].astype(str)
+    history_ordinals = data_layer.load_calendar(sorted(history_weeks.unique()))['Ordinal']
+    pr_history = pr_history[(history_weeks.map(history_ordinals) <= report_ordinal).to_numpy()]
+    tables['personal_records'] = records.category_1rm_table(pr_history)
+    tables['rep_maxes'] = records.rep_max_table(pr_history).reset_index()
+    return tables, figures
+
+
+def render_html(title, tables, figures):
+    parts = [f"<html><head><meta charset='utf-8'><title>{html.escape(title)}</title></head><body>", f"<h1>{html.escape(title)}</h1>"]
+    for key, table in tables.items():
+        if key == 'trends':
+            continue  # Shown as figures
+        parts.append(f"<h2>{TABLE_TITLES[key]}</h2>")
+        parts.append(table.to_html(index=False, border=0, na_rep='') if not table.empty else "<p>No data.</p>")
+    parts.append(f"<h2>{TABLE_TITLES['trends']}</h2>")
+    for i, fig in enumerate(figures.values()):
+        # plotly.js is loaded once, by the first figure
+        parts.append(fig.to_html(full_html=False, include_plotlyjs='cdn' if i == 0 else False))
+    parts.append("</body></html>")
+    return '\n'.join(parts)
+
+
+def write_report(output_dir, report_dir, name, athlete_file, week, trend_weeks=TREND_WEEKS, png=False):
+    """Write one athlete's report (CSV tables, HTML, optionally PNG figures); returns the HTML path."""
+    tables, figures = athlete_report(output_dir, name, athlete_file, week, trend_weeks)
+    athlete_dir = os.path.join(report_dir, str(week), store.athlete_key(name))
+    os.makedirs(athlete_dir, exist_ok=True)
+    for key, table in tables.items():
+        table.to_csv(os.path.join(athlete_dir, f"{key}.csv"), index=False)
+    if png:
+        for category, fig in figures.items():
+            fig.write_image(os.path.join(athlete_dir, f"trend_{category.replace(' ', '_')}.png"), width=1200, height=600)
+    html_path = os.path.join(athlete_dir, "report.html")
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(render_html(f"{name} - {data_layer.load_calendar([week])['Label'].iloc[0]}", tables, figures))
+    return html_path
+
+
+def _write_report_task(args):
+    return write_report(*args)
+
+
+def write_reports(output_dir, report_dir, athletes, week, trend_weeks=TREND_WEEKS, png=False, workers=1):
+    """Write the reports of {athlete name: file} for a week, `workers` athletes at a time; returns {name: HTML path}."""
+    tasks = [(output_dir, report_dir, name, athlete_file, week, trend_weeks, png) for name, athlete_file in athletes.items()]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            paths = list(pool.map(_write_report_task, tasks))
+    else:
+        paths = [_write_report_task(task) for task in tasks]
+    paths = dict(zip(athletes, paths))
+
+    # Squad page linking every athlete's report
+    week_dir = os.path.join(report_dir, str(week))
+    links = ''.join(f"<li><a href='{html.escape(os.path.relpath(path, week_dir))}'>{html.escape(name)}</a></li>" for name, path in paths.items())
+    with open(os.path.join(week_dir, "index.html"), 'w', encoding='utf-8') as f:
+        f.write(f"<html><head><meta charset='utf-8'><title>Week {week}</title></head><body><h1>Week {week}</h1><ul>{links}</ul></body></html>")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write weekly per-athlete reports (CSV tables, HTML with charts) from the aggregated data.")
+    parser.add_argument('--aggregated-dir', default=AGGREGATED_DIR, help="Output folder of the aggregator.")
+    parser.add_argument('--report-dir', default=REPORT_DIR)
+    parser.add_argument('--week', help="Week code (e.g. 2025_14) to report on; defaults to the latest week with data.")
+    parser.add_argument('--athletes', nargs='+', help="Athlete names to report on; defaults to everyone.")
+    parser.add_argument('--trend-weeks', type=int, default=TREND_WEEKS, help="Weeks of trend in each report.")
+    parser.add_argument('--png', action='store_true', help="Also write the trend charts as PNG (needs the kaleido package).")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Number of worker processes (1 = serial).")
+    args = parser.parse_args()
+
+    if args.png and importlib.util.find_spec('kaleido') is None:
+        parser.error("--png needs the kaleido package (pip install kaleido)")
+    athletes = data_layer.list_athletes(args.aggregated_dir)
+    if args.athletes:
+        unknown = [name for name in args.athletes if name not in athletes]
+        if unknown:
+            parser.error(f"unknown athletes: {', '.join(unknown)}")
+        athletes = {name: athletes[name] for name in args.athletes}
+    week = args.week or latest_week(args.aggregated_dir, athletes)
+    if week is None:
+        parser.error("no data to report on")
+    if args.week:
+        if data_layer.load_calendar([week])['Ordinal'].iloc[0] < 0:
+            parser.error(f"--week {week} is not a week code like 2025_14")
+        if week not in report_weeks(args.aggregated_dir, athletes):
+            parser.error(f"--week {week}: none of the athletes has data for that week")
+
+    paths = write_reports(args.aggregated_dir, args.report_dir, athletes, week, args.trend_weeks, args.png, args.workers)
+    print(f"Wrote {len(paths)} reports for week {week} to {os.path.join(args.report_dir, str(week))}")
+
+
+if __name__ == "__main__":
+    main()
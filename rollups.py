@@ -0,0 +1,143 @@
+import os
+import numpy as np
+import pandas as pd
+
+import store
+
+ROLLUP_DIR = "rollup"  # Sub-directory of the aggregated output, one <athlete>.parquet per athlete
+ROLLUP_KEYS = ['Athlete', 'Week', 'Day of the Week', 'Category', 'Exercise']
+EXCLUDED_FROM_OVERALL = ['accessory', 'accessorio']
+PULL_CATEGORIES = ['snatch pull', 'clean pull']
+
+
+def weekly_rollup(df):
+    """Roll set-level rows up to one row per (athlete, week, day, category, exercise).
+
+    Prescribed sets are the set slots with reps filled in; executed sets additionally need
+    reps > 0 and a weight. Distinct prescribed slots are not additive across exercises of the
+    same day, so each row also carries them as a bitmask (bit i-1 = set i) that can be OR-ed
+    when rows are combined.
+    """
+    sets = df[df['Category'].notna() & df['Set'].notna() & df['Set_Reps'].notna()]
+    executed = ((sets['Set_Reps'] > 0) & sets['Set_Weight'].notna()).to_numpy()
+    reps = sets['Set_Reps'].to_numpy(dtype=float)
+    weights = sets['Set_Weight'].to_numpy(dtype=float, na_value=np.nan)
+    frame = sets[ROLLUP_KEYS].copy()
+    frame['Set'] = sets['Set'].astype('int64')
+    frame['Executed'] = executed.astype('int64')
+    frame['Volume'] = np.where(executed, reps * weights, 0.0)
+    frame['Reps'] = np.where(executed, reps, 0.0)
+    frame['Weight'] = np.where(executed, weights, np.nan)
+
+    group = frame.groupby(ROLLUP_KEYS, observed=True, dropna=False, sort=False)
+    rollup = group.agg(
+        Executed_Sets=('Executed', 'sum'),
+        Total_Lifted_Weight=('Volume', 'sum'),
+        Total_Reps=('Reps', 'sum'),
+        Max_Weight=('Weight', 'max'),
+    )
+    slots = frame.drop_duplicates(ROLLUP_KEYS + ['Set'])
+    slots = slots.assign(Bit=np.left_shift(1, slots['Set'] - 1))
+    slot_group = slots.groupby(ROLLUP_KEYS, observed=True, dropna=False, sort=False)
+    rollup['Prescribed_Sets'] = slot_group['Set'].size()
+    rollup['Prescribed_Set_Mask'] = slot_group['Bit'].sum()
+    return rollup.reset_index()[ROLLUP_KEYS + ['Prescribed_Sets', 'Prescribed_Set_Mask', 'Executed_Sets', 'Total_Lifted_Weight', 'Total_Reps', 'Max_Weight']]
+
+
+def category_mask(categories, selected_category):
+    """Rows belonging to a category, including the virtual 'Overall' (all but accessories) and 'Pulls'."""
+    lowered = categories.astype(str).str.lower()
+    if selected_category == 'Pulls':
+        return lowered.isin(PULL_CATEGORIES)
+    if selected_category == 'Overall':
+        return ~lowered.isin(EXCLUDED_FROM_OVERALL)
+    return categories == selected_category
+
+
+def trend_categories(prescribed_categories):
+    """Categories offered for trends: 'Overall' first, then the prescribed ones without accessories, then 'Pulls' if both pulls are there."""
+    categories = [cat for cat in prescribed_categories if cat.lower() not in EXCLUDED_FROM_OVERALL]
+    lowered = [cat.lower() for cat in categories]
+    if all(pull in lowered for pull in PULL_CATEGORIES):
+        categories.append('Pulls')
+    return ['Overall'] + categories
+
+
+def distinct_slots(rows, by):
+    """Number of distinct prescribed set slots per `by` group (OR of the slot bitmasks)."""
+    if rows.empty:
+        return pd.Series(dtype='int64')
+    masks = rows['Prescribed_Set_Mask'].to_numpy(dtype='int64')
+    width = max(int(masks.max()).bit_length(), 1)
+    bits = pd.DataFrame((masks[:, None] >> np.arange(width)) & 1, index=rows.index)
+    return bits.groupby([rows[c] for c in by], observed=True, dropna=False).max().sum(axis=1)
+
+
+def category_week_trend(rollup, selected_category, all_weeks):
+    """Weekly prescribed/executed sets, volume, reps, max weight and average load for a (virtual) category."""
+    rows = rollup[category_mask(rollup['Category'], selected_category)]
+    week = rows['Week'].astype(str)
+    rows = rows.assign(Week=week)
+    prescribed = distinct_slots(rows, ['Week', 'Day of the Week'])
+    prescribed = prescribed.groupby(level=0).sum() if not prescribed.empty else prescribed
+    week_group = pd.DataFrame({'Week': all_weeks})
+    week_group['Total_Prescribed_Sets'] = prescribed.reindex(all_weeks, fill_value=0).to_numpy()
+    executed = rows[rows['Executed_Sets'] > 0].groupby('Week').agg(
+        Total_Executed_Sets=('Executed_Sets', 'sum'),
+        Total_Lifted_Weight=('Total_Lifted_Weight', 'sum'),
+        Total_Reps=('Total_Reps', 'sum'),
+        Max_Weight=('Max_Weight', 'max')
+    ).reindex(all_weeks, fill_value=0)
+    for col in executed.columns:
+        week_group[col] = executed[col].fillna(0).to_numpy()
+    week_group['Average_Load'] = week_group['Total_Lifted_Weight'] / week_group['Total_Reps']
+    week_group['Average_Load'] = week_group['Average_Load'].fillna(0)
+    return week_group.sort_values('Week').reset_index(drop=True)
+
+
+def block_trend(week_group, calendar):
+    """A weekly trend summed into the calendar's training blocks (Season, Block), for long ranges.
+
+    Sets, volume and reps are summed, Max_Weight is the heaviest week and Average_Load is
+    re-weighted by reps. Week/Last_Week are the first and last week of each block.
+    """
+    weeks = calendar.loc[week_group['Week']]
+    rows = week_group.assign(Season=weeks['Season'].to_numpy(), Block=weeks['Block'].to_numpy(), Ordinal=weeks['Ordinal'].to_numpy())
+    blocks = rows.sort_values('Ordinal', kind='mergesort').groupby(['Season', 'Block'], sort=True).agg(
+        Week=('Week', 'first'),
+        Last_Week=('Week', 'last'),
+        Total_Prescribed_Sets=('Total_Prescribed_Sets', 'sum'),
+        Total_Executed_Sets=('Total_Executed_Sets', 'sum'),
+        Total_Lifted_Weight=('Total_Lifted_Weight', 'sum'),
+        Total_Reps=('Total_Reps', 'sum'),
+        Max_Weight=('Max_Weight', 'max')
+    ).reset_index()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        blocks['Average_Load'] = np.where(blocks['Total_Reps'] > 0, blocks['Total_Lifted_Weight'] / blocks['Total_Reps'], 0.0)
+    return blocks
+
+
+def rollup_path(output_dir, athlete):
+    return os.path.join(output_dir, ROLLUP_DIR, f"{store.athlete_key(athlete)}.parquet")
+
+
+def has_rollup(output_dir, athlete):
+    return os.path.exists(rollup_path(output_dir, athlete))
+
+
+def write_rollup(output_dir, athlete, store_df):
+    """Materialize an athlete's weekly rollup from its typed store frame."""
+    path = rollup_path(output_dir, athlete)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    weekly_rollup(store_df).to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def remove_rollup(output_dir, athlete):
+    if has_rollup(output_dir, athlete):
+        os.remove(rollup_path(output_dir, athlete))
+
+
+def read_rollup(output_dir, athlete):
+    return pd.read_parquet(rollup_path(output_dir, athlete))
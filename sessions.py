@@ -0,0 +1,119 @@
+import os
+import numpy as np
+import pandas as pd
+
+import store
+import metrics
+
+SESSIONS_DIR = "sessions"  # Sub-directory of the aggregated output, one <athlete>.parquet of training sessions per athlete
+MINUTES_PER_SET = 3  # Work plus rest per executed set, for the rough session duration
+SESSION_KEYS = ['Week', 'Day of the Week']
+SESSION_COLUMNS = SESSION_KEYS + ['Exercises', 'Prescribed_Sets', 'Executed_Sets', 'Total_Reps', 'Volume',
+                                  'Max_Weight', 'Duration_Minutes', 'Performed']
+
+
+def session_table(store_df):
+    """One row per training session (week and day with categorized rows) of an athlete's store frame.
+
+    Prescribed_Sets sums the 'Sets' column of the session's sheet rows; executed sets, reps,
+    volume and max weight count only successful lifts (reps > 0 and a weight), as the rollup does.
+    Performed is whether any set has reps filled in. Duration_Minutes is executed sets times
+    MINUTES_PER_SET.
+    """
+    rows = store_df[store_df['Category'].notna()]
+    reps = rows['Set_Reps'].to_numpy(dtype=float, na_value=np.nan)
+    weights = rows['Set_Weight'].to_numpy(dtype=float, na_value=np.nan)
+    executed = (reps > 0) & ~np.isnan(weights)
+    # Every sheet row is melted into its set slots; its prescription is counted on slot 1 only
+    first_slot = (rows['Set'] == 1).to_numpy(dtype=bool, na_value=False)
+    frame = pd.DataFrame({
+        'Week': rows['Week'].astype(str).to_numpy(),
+        'Day of the Week': rows['Day of the Week'].astype(str).to_numpy(),
+        'Exercise': rows['Exercise'].astype('string').to_numpy(),
+        'Sets': np.where(first_slot, rows['Sets'].to_numpy(dtype=float, na_value=np.nan), np.nan),
+        'Executed': executed.astype('int64'),
+        'Reps': np.where(executed, reps, 0.0),
+        'Volume': np.where(executed, reps * weights, 0.0),
+        'Weight': np.where(executed, weights, np.nan),
+        'Logged': ~np.isnan(reps),
+    })
+    table = frame.groupby(SESSION_KEYS, sort=False).agg(
+        Exercises=('Exercise', 'nunique'),
+        Prescribed_Sets=('Sets', 'sum'),
+        Executed_Sets=('Executed', 'sum'),
+        Total_Reps=('Reps', 'sum'),
+        Volume=('Volume', 'sum'),
+        Max_Weight=('Weight', 'max'),
+        Performed=('Logged', 'any'),
+    ).reset_index()
+    table['Duration_Minutes'] = table['Executed_Sets'] * MINUTES_PER_SET
+    return sort_sessions(table[SESSION_COLUMNS])
+
+
+def sort_sessions(table):
+    """Sessions in week order, numeric days first."""
+    day = pd.to_numeric(table['Day of the Week'], errors='coerce')
+    order = np.lexsort((table['Day of the Week'].to_numpy(dtype=str), day.fillna(np.inf).to_numpy(), table['Week'].to_numpy(dtype=str)))
+    return table.iloc[order].reset_index(drop=True)
+
+
+def extend_sessions(previous, new_rows):
+    """Replace the weeks of `new_rows` in a session table; sessions of other weeks do not depend on them."""
+    new_sessions = session_table(new_rows)
+    if new_sessions.empty:
+        return previous
+    kept = previous[~previous['Week'].isin(new_sessions['Week'])]
+    return sort_sessions(pd.concat([kept, new_sessions], ignore_index=True))
+
+
+def sessions_per_week(table):
+    """Performed and prescribed session counts per week."""
+    counts = table.assign(Prescribed=table['Prescribed_Sets'] > 0)
+    return counts.groupby('Week', sort=True).agg(
+        Performed_Sessions=('Performed', 'sum'),
+        Prescribed_Sessions=('Prescribed', 'sum'),
+    ).reset_index()
+
+
+def attendance_table(squad_sessions):
+    """Performed sessions per athlete (rows) and week (columns); blank where the athlete has no sessions that week."""
+    return squad_sessions.pivot_table(index='Athlete', columns='Week', values='Performed', aggfunc='sum')
+
+
+def sheet_sessions(data):
+    """Prescribed sets and performed flag per 'Day of the Week' of one wide weekly sheet.
+
+    A day is performed when any 'Set i Reps' cell is filled in, even with text rather than a number.
+    """
+    rep_columns = [f'Set {i} Reps' for i in range(1, metrics.SET_COUNT + 1) if f'Set {i} Reps' in data.columns]
+    frame = pd.DataFrame({
+        'Day of the Week': data['Day of the Week'].to_numpy(),
+        'Prescribed_Sets': pd.to_numeric(data['Sets'], errors='coerce').to_numpy(dtype=float, na_value=np.nan) if 'Sets' in data.columns else np.nan,
+        'Performed': data[rep_columns].notna().any(axis=1).to_numpy(),
+    })
+    return frame.groupby('Day of the Week', sort=True).agg(Prescribed_Sets=('Prescribed_Sets', 'sum'), Performed=('Performed', 'any'))
+
+
+def sessions_path(output_dir, athlete):
+    return os.path.join(output_dir, SESSIONS_DIR, f"{store.athlete_key(athlete)}.parquet")
+
+
+def has_sessions(output_dir, athlete):
+    return os.path.exists(sessions_path(output_dir, athlete))
+
+
+def write_sessions(output_dir, athlete, table):
+    path = sessions_path(output_dir, athlete)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    table.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def remove_sessions(output_dir, athlete):
+    if has_sessions(output_dir, athlete):
+        os.remove(sessions_path(output_dir, athlete))
+
+
+def read_sessions(output_dir, athlete):
+    return pd.read_parquet(sessions_path(output_dir, athlete))
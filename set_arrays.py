@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import shutil
+import numpy as np
+import pandas as pd
+
+import store
+import athlete_index
+import week_calendar
+
+ARRAYS_DIR = "arrays"  # Sub-directory of the aggregated output, one <build>/ directory of .npy columns per build
+CURRENT_FILE = "_current.json"  # In ARRAYS_DIR: which build is current, its dictionaries and athlete row ranges
+ARRAYS_VERSION = 3
+# Column -> dtype of its .npy file; text columns hold codes into the dictionaries, -1 for missing (also in counts)
+ARRAY_DTYPES = {
+    'Athlete': 'int16',
+    'Week': 'int32',  # Week ordinal (week_calendar), decoded back to the week code
+    'Day of the Week': 'int8',
+    'Category': 'int16',
+    'Exercise': 'int32',
+    'Set': 'int8',
+    'Set_Reps': 'int16',
+    'Set_Weight': 'float64',
+}
+CODED_COLUMNS = ['Athlete', 'Category', 'Exercise']
+
+
+def arrays_dir(output_dir):
+    return os.path.join(output_dir, ARRAYS_DIR)
+
+
+def current_path(output_dir):
+    return os.path.join(arrays_dir(output_dir), CURRENT_FILE)
+
+
+def column_file(column):
+    return column.replace(' ', '_') + '.npy'
+
+
+def store_stats(output_dir, athlete):
+    """[file, mtime_ns, size] of an athlete's store files, to tell whether the arrays still match them."""
+    store_dir = store.athlete_store_dir(output_dir, athlete)
+    stats = []
+    for f in sorted(os.listdir(store_dir)):
+        if f.endswith('.parquet'):
+            st = os.stat(os.path.join(store_dir, f))
+            stats.append([f, st.st_mtime_ns, st.st_size])
+    return stats
+
+
+def encodable(rows):
+    """Whether an athlete's rows fit the fixed-width columns: valid week codes, integer days and set numbers."""
+    # Days must come back as the same text: '2', not '2.0' or '02'
+    valid_days = rows['Day of the Week'].dropna().str.fullmatch(r'[1-9]?\d')
+    sets = rows['Set'].astype('Float64')
+    valid_sets = sets.isna() | sets.between(0, 127)
+    ordinals = week_calendar.week_calendar(rows['Week'].astype(str).unique())['Ordinal']
+    return bool(valid_days.all() and valid_sets.all() and (ordinals >= 0).all())
+
+
+def encode(values, codes):
+    """Codes of text values in the `codes` dictionary {value: code}, adding unseen values to it."""
+    text = values.astype('string')
+    for value in text.dropna().unique():
+        codes.setdefault(str(value), len(codes))
+    return text.map(codes).astype('Float64').fillna(-1).to_numpy(dtype='int64')
+
+
+def build(output_dir):
+    """Write the set columns of every indexed athlete as memory-mappable .npy files and make them current.
+
+    Rows are the store rows with a category (the viewer's rows), athlete after athlete in store
+    order. Athletes whose rows do not fit the fixed-width columns are left out; the viewer reads
+    them from the store. Each build goes to its own directory so processes still mapping the
+    previous one keep valid pages; older builds are removed when no longer open.
+
+    Athletes whose store has not changed since the current build keep their coded rows from it
+    (the dictionaries are extended, not rebuilt), so only changed stores are read. When no store
+    changed, nothing is written.
+    """
+    previous = load_current(output_dir)
+    if previous is not None and not os.path.isdir(os.path.join(arrays_dir(output_dir), previous['build'])):
+        previous = None
+    indexed = [a for a in sorted(athlete_index.load_index(output_dir) or {}) if store.has_athlete(output_dir, a)]
+    stats = {athlete: store_stats(output_dir, athlete) for athlete in indexed}
+    reused = set()
+    if previous is not None:
+        known = {**previous.get('excluded', {}), **{key: entry['store'] for key, entry in previous['athletes'].items()}}
+        unchanged = {a for a in indexed if known.get(store.athlete_key(a)) == stats[a]}
+        if len(unchanged) == len(indexed) and len(known) == len(indexed):
+            return
+        reused = {a for a in unchanged if store.athlete_key(a) in previous['athletes']}
+    old = SetArrays(output_dir, previous) if reused else None
+
+    codes = {column: {value: code for code, value in enumerate(old.current[column])} if old else {} for column in CODED_COLUMNS}
+    weeks = {week: ordinal for ordinal, week in old.current['weeks']} if old else {}
+    athletes = {}
+    excluded = {}
+    parts = {column: [] for column in ARRAY_DTYPES}
+    start = 0
+    for athlete in indexed:
+        key = store.athlete_key(athlete)
+        if athlete in reused:
+            columns = old.athlete_columns(athlete)
+            for column in ARRAY_DTYPES:
+                parts[column].append(np.asarray(columns[column]))
+            rows = len(columns['Set'])
+            athletes[key] = {**previous['athletes'][key], 'rows': [start, start + rows]}
+            start += rows
+            continue
+        if previous is not None and previous.get('excluded', {}).get(key) == stats[athlete]:
+            excluded[key] = stats[athlete]
+            continue
+        rows = store.read_athlete(output_dir, athlete, columns=list(ARRAY_DTYPES))
+        rows = rows[rows['Category'].notna()]
+        if not encodable(rows):
+            excluded[key] = stats[athlete]
+            continue
+        for column in CODED_COLUMNS:
+            parts[column].append(encode(rows[column], codes[column]))
+        calendar = week_calendar.week_calendar(rows['Week'].astype(str).unique())
+        weeks.update(zip(calendar['Week'], calendar['Ordinal'].astype(int)))
+        parts['Week'].append(rows['Week'].astype(str).map(dict(zip(calendar['Week'], calendar['Ordinal']))).to_numpy(dtype='int64'))
+        parts['Day of the Week'].append(pd.to_numeric(rows['Day of the Week'], errors='coerce').fillna(-1).to_numpy(dtype='int64'))
+        parts['Set'].append(rows['Set'].to_numpy(dtype='int64', na_value=-1))
+        parts['Set_Reps'].append(rows['Set_Reps'].to_numpy(dtype='int64', na_value=-1))
+        parts['Set_Weight'].append(rows['Set_Weight'].to_numpy(dtype='float64', na_value=np.nan))
+        athletes[key] = {
+            'rows': [start, start + len(rows)],
+            'store': stats[athlete],
+            # The store's own category lists, so decoded columns get exactly the same dtype
+            'categories': {column: [str(c) for c in rows[column].cat.categories] for column in CODED_COLUMNS + ['Week', 'Day of the Week']},
+        }
+        start += len(rows)
+
+    root = arrays_dir(output_dir)
+    build_name = str(time.time_ns())
+    tmp_dir = os.path.join(root, build_name + '.tmp')
+    os.makedirs(tmp_dir)
+    for column, dtype in ARRAY_DTYPES.items():
+        values = np.concatenate(parts[column]) if parts[column] else np.empty(0)
+        np.save(os.path.join(tmp_dir, column_file(column)), values.astype(dtype))
+    os.replace(tmp_dir, os.path.join(root, build_name))
+    current = {
+        'version': ARRAYS_VERSION,
+        'build': build_name,
+        'athletes': athletes,
+        'excluded': excluded,  # Athletes read from the store instead, with the store stats they were checked against
+        'weeks': sorted(([ordinal, week] for week, ordinal in weeks.items())),
+        **{column: list(column_codes) for column, column_codes in codes.items()},
+    }
+    path = current_path(output_dir)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(current, f, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+    # Builds still mapped by a viewer cannot be removed on Windows; they go on a later build
+    for name in os.listdir(root):
+        if name not in (build_name, CURRENT_FILE):
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def is_current(output_dir):
+    """Whether the arrays exist and have the current layout."""
+    return load_current(output_dir) is not None
+
+
+def load_current(output_dir):
+    """The current build's description, or None if there is none or it is outdated."""
+    try:
+        with open(current_path(output_dir), encoding='utf-8') as f:
+            current = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return current if current.get('version') == ARRAYS_VERSION else None
+
+
+class SetArrays:
+    """Read-only memory maps of the current build's columns.
+
+    Pages are shared by every session and process that maps the same build, so opening it in
+    another viewer costs no extra memory for the rows.
+    """
+
+    def __init__(self, output_dir, current):
+        self.output_dir = output_dir
+        self.current = current
+        build_dir = os.path.join(arrays_dir(output_dir), current['build'])
+        self.columns = {column: np.load(os.path.join(build_dir, column_file(column)), mmap_mode='r') for column in ARRAY_DTYPES}
+        ordinals, codes = zip(*current['weeks']) if current['weeks'] else ((), ())
+        self.week_ordinals = np.array(ordinals, dtype='int64')
+        self.week_codes = list(codes)
+
+    def has_athlete(self, athlete):
+        """Whether the athlete is in the arrays and its store has not changed since they were built."""
+        entry = self.current['athletes'].get(store.athlete_key(athlete))
+        return entry is not None and store.has_athlete(self.output_dir, athlete) and entry['store'] == store_stats(self.output_dir, athlete)
+
+    def athlete_columns(self, athlete):
+        """{column: read-only view} of an athlete's rows, still coded."""
+        start, end = self.current['athletes'][store.athlete_key(athlete)]['rows']
+        return {column: values[start:end] for column, values in self.columns.items()}
+
+    def athlete_frame(self, athlete):
+        """An athlete's rows decoded to the store's column types.
+
+        Set_Weight is a view on the shared pages; the coded columns are decoded into categoricals
+        with the store's category lists (small code arrays) and the counts into nullable integers.
+        """
+        columns = self.athlete_columns(athlete)
+        store_categories = self.current['athletes'][store.athlete_key(athlete)]['categories']
+
+        def categorical(column, codes, categories):
+            values = pd.Categorical.from_codes(np.asarray(codes, dtype='int64'), categories)
+            return values.set_categories(pd.Index(store_categories[column], dtype='str'))
+
+        day = columns['Day of the Week']
+        sets = columns['Set']
+        reps = columns['Set_Reps']
+        return pd.DataFrame({
+            'Athlete': categorical('Athlete', columns['Athlete'], self.current['Athlete']),
+            'Week': categorical('Week', np.searchsorted(self.week_ordinals, columns['Week']), self.week_codes),
+            'Day of the Week': pd.Categorical(np.where(day >= 0, day.astype(str), None), pd.Index(store_categories['Day of the Week'], dtype='str')),
+            'Category': categorical('Category', columns['Category'], self.current['Category']),
+            'Exercise': categorical('Exercise', columns['Exercise'], self.current['Exercise']),
+            'Set': pd.arrays.IntegerArray(np.asarray(sets), sets < 0),
+            'Set_Reps': pd.arrays.IntegerArray(np.asarray(reps), reps < 0),
+            'Set_Weight': columns['Set_Weight'],
+        }, copy=False)
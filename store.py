@@ -0,0 +1,236 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import normalization
+import intensity
+
+PARQUET_DIR = "parquet"  # Sub-directory of the aggregated output holding the typed columnar store
+PRESCRIPTIONS_FILE = "prescriptions.parquet"  # In an athlete's store directory, next to the <year>.parquet set files
+NOTES_FILE = "notes.parquet"
+
+CATEGORY_COLUMNS = ['Athlete', 'Week', 'Day of the Week', 'Category', 'Exercise']
+NUMERIC_COLUMNS = ['Reps', 'Sets', 'Set_Reps', 'Set_Weight']
+# Rep and set counts are small integers; loads such as 42.4 kg are not exact in float32, so weights stay float64
+NUMERIC_DTYPES = {'Reps': 'Int16', 'Sets': 'Int16', 'Set_Reps': 'Int16', 'Set_Weight': 'float64'}
+STORE_COLUMNS = ['Athlete', 'Week', 'Day of the Week', 'Category', 'Exercise', 'Reps', 'Sets', 'Set', 'Set_Reps', 'Set_Weight', 'Variant', 'Notes', 'Athlete comments']
+# Columns the viewer works with; the long free-text ones are only loaded for a single week
+VIEW_COLUMNS = ['Athlete', 'Week', 'Day of the Week', 'Category', 'Exercise', 'Reps', 'Sets', 'Set', 'Set_Reps', 'Set_Weight', 'Variant']
+# Columns with a value per set slot; every other column describes the sheet row (the prescription)
+SET_COLUMNS = ['Set', 'Set_Reps', 'Set_Weight']
+# Free-text columns -> id column of the prescriptions table; each text is kept once in the notes table
+NOTE_COLUMNS = {'Notes': 'Note_Id', 'Athlete comments': 'Comment_Id'}
+
+
+def athlete_key(athlete):
+    """File-system key for an athlete, the same one used for the per-athlete CSV names."""
+    return athlete.replace(' ', '_')
+
+
+def clean_text(series):
+    """Strip whitespace and turn empty/missing values into <NA>."""
+    text = series.astype('string').str.strip()
+    return text.mask(text == '')
+
+
+def to_count(values, dtype):
+    """Rep or set counts as a nullable integer `dtype`; values that are not whole counts in its range are missing.
+
+    Such values are typing slips (a weight in the reps cell, or 0.5 reps) that no rep count can stand for.
+    """
+    numbers = pd.to_numeric(values, errors='coerce').astype('float64')
+    valid = (numbers % 1 == 0) & numbers.between(0, np.iinfo(dtype.lower()).max)
+    return numbers.where(valid).astype(dtype)
+
+
+def to_store_frame(df):
+    """Type and clean an aggregated athlete frame (typed or read back as strings) for the store.
+
+    Category and Exercise are normalized to their canonical names once here, so the viewer does not have to.
+    """
+    out = pd.DataFrame(index=df.index)
+    for col in STORE_COLUMNS + [c for c in df.columns if c not in STORE_COLUMNS]:
+        values = df[col] if col in df.columns else pd.Series(pd.NA, index=df.index, dtype='object')
+        if col in NUMERIC_COLUMNS and NUMERIC_DTYPES[col].startswith('Int'):
+            out[col] = to_count(values, NUMERIC_DTYPES[col])
+        elif col in NUMERIC_COLUMNS:
+            out[col] = pd.to_numeric(values, errors='coerce').astype(NUMERIC_DTYPES[col])
+        elif col == 'Set':
+            out[col] = to_count(values, 'Int8')
+        elif col in normalization.RULES:
+            out[col] = normalization.normalize(values, col)
+        elif col in CATEGORY_COLUMNS:
+            out[col] = clean_text(values).astype('category')
+        else:
+            out[col] = clean_text(values)
+    return out.reset_index(drop=True)
+
+
+def athlete_store_dir(output_dir, athlete):
+    return os.path.join(output_dir, PARQUET_DIR, athlete_key(athlete))
+
+
+def has_athlete(output_dir, athlete):
+    return os.path.isdir(athlete_store_dir(output_dir, athlete))
+
+
+def year_slices(store_df):
+    """[(year, start row, end row)] of a week-sorted store frame; each year is a contiguous slice."""
+    years = store_df['Week'].astype(str).str.split('_').str[0].to_numpy()
+    if not len(years):
+        return []
+    starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+    ends = np.r_[starts[1:], len(years)]
+    return [(years[start], int(start), int(end)) for start, end in zip(starts, ends)]
+
+
+def split_facts(df, set_columns=SET_COLUMNS):
+    """Split a flat frame with one row per set slot into (sets, prescriptions, notes) tables.
+
+    The slots melted from a sheet row repeat every column but `set_columns`, so those columns are
+    kept once per prescription and the sets keep the row order with a Prescription id into it.
+    The NOTE_COLUMNS texts are kept once in notes and referenced by id; missing texts are NA or,
+    in frames of CSV strings, ''.
+    """
+    note_columns = [c for c in NOTE_COLUMNS if c in df.columns]
+    texts = pd.concat([df[c].astype(object) for c in note_columns], ignore_index=True) if note_columns else pd.Series(dtype=object)
+    texts = texts.dropna()
+    texts = pd.Index(pd.unique(texts[texts != ''].to_numpy(dtype=object)), dtype=object)
+    prescription_columns = [c for c in df.columns if c not in set_columns]
+    ids = df.groupby(prescription_columns, sort=False, dropna=False, observed=True).ngroup().to_numpy()
+    first = np.unique(ids, return_index=True)[1]
+    prescriptions = df.iloc[first][prescription_columns].reset_index(drop=True)
+    for column in note_columns:
+        codes = texts.get_indexer(prescriptions[column].astype(object))
+        prescriptions[column] = pd.Series(codes, dtype='Int32').mask(codes < 0)
+    prescriptions = prescriptions.rename(columns=NOTE_COLUMNS)
+    prescriptions.insert(0, 'Prescription', np.arange(len(prescriptions), dtype='int32'))
+    sets = pd.DataFrame({'Prescription': ids.astype('int32')})
+    for column in set_columns:
+        if column in df.columns:
+            sets[column] = df[column].reset_index(drop=True)
+    notes = pd.DataFrame({'Note': np.arange(len(texts), dtype='int32'), 'Text': pd.array(texts, dtype='string')})
+    return sets, prescriptions, notes
+
+
+def join_facts(sets, prescriptions, notes, missing=pd.NA):
+    """The flat frame of split_facts() tables: one row per set, in the order of `sets`.
+
+    Ids are row positions of the prescriptions and notes tables. The SET_COLUMNS go after 'Sets'
+    as in the aggregated sheets, other set columns last; texts of missing note ids are `missing`.
+    """
+    rows = sets['Prescription'].to_numpy(dtype='int64')
+    text_columns = {v: k for k, v in NOTE_COLUMNS.items()}
+    set_columns = [c for c in sets.columns if c != 'Prescription' and c not in prescriptions.columns]
+    after_sets = [c for c in set_columns if c in SET_COLUMNS] if 'Sets' in prescriptions.columns else []
+    out = {}
+    for column in prescriptions.columns[1:]:
+        if column in text_columns:
+            ids = prescriptions[column].to_numpy(dtype='float64', na_value=np.nan)[rows]
+            known = ~np.isnan(ids)
+            values = np.full(len(rows), missing, dtype=object)
+            values[known] = notes['Text'].to_numpy(dtype=object)[ids[known].astype('int64')]
+            out[text_columns[column]] = pd.array(values, dtype=notes['Text'].dtype)
+        else:
+            out[column] = prescriptions[column].array.take(rows)
+        if column == 'Sets':
+            out.update((c, sets[c].array) for c in after_sets)
+    out.update((c, sets[c].array) for c in set_columns if c not in out)
+    return pd.DataFrame(out, copy=False)
+
+
+def write_athlete(output_dir, athlete, df):
+    """Write one athlete's rows to <PARQUET_DIR>/<athlete>/ and return the typed frame.
+
+    The store holds split_facts() tables: the sets as <year>.parquet files plus the athlete's
+    PRESCRIPTIONS_FILE and NOTES_FILE, so the sheet columns and note texts are not repeated on
+    every set slot. Set files also carry the Week (for week selection) and the estimated-1RM and
+    intensity columns (intensity.INTENSITY_COLUMNS). Each year file is a single row group: an
+    athlete-year is only a few thousand rows, and finer row groups cost more in per-group overhead
+    than they save. Files are written to a temporary directory first and swapped in, so readers
+    never see a partially written athlete.
+    """
+    store_df = to_store_frame(df)
+    store_df = store_df.sort_values('Week', kind='mergesort').reset_index(drop=True)
+    store_df = intensity.add_intensity_columns(store_df)
+    for col in ['E1RM', 'E1RM_Best', 'E1RM_Intensity']:
+        store_df[col] = store_df[col].astype('float32')
+    sets, prescriptions, notes = split_facts(store_df, SET_COLUMNS + intensity.INTENSITY_COLUMNS)
+    sets.insert(0, 'Week', store_df['Week'])
+    final_dir = athlete_store_dir(output_dir, athlete)
+    tmp_dir = final_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    table = pa.Table.from_pandas(sets, preserve_index=False)
+    for year, start, end in year_slices(store_df):
+        pq.write_table(table.slice(start, end - start), os.path.join(tmp_dir, f"{year}.parquet"))
+    prescriptions.to_parquet(os.path.join(tmp_dir, PRESCRIPTIONS_FILE), index=False)
+    notes.to_parquet(os.path.join(tmp_dir, NOTES_FILE), index=False)
+    old_dir = final_dir + '.old'
+    if os.path.isdir(final_dir):
+        os.replace(final_dir, old_dir)
+    os.replace(tmp_dir, final_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return store_df
+
+
+def remove_athlete(output_dir, athlete):
+    shutil.rmtree(athlete_store_dir(output_dir, athlete), ignore_errors=True)
+
+
+def is_split(output_dir, athlete):
+    """Whether an athlete's store has the prescriptions and notes tables (stores written before them are flat)."""
+    return os.path.exists(os.path.join(athlete_store_dir(output_dir, athlete), PRESCRIPTIONS_FILE))
+
+
+def read_athlete(output_dir, athlete, columns=None, weeks=None):
+    """Read an athlete from the store, optionally only some columns and weeks.
+
+    The set files are joined with the prescriptions, and with the notes only when a NOTE_COLUMNS
+    column is asked for. Week selection only opens the year files that contain those weeks.
+    Requested columns an older store does not have are left out.
+    """
+    store_dir = athlete_store_dir(output_dir, athlete)
+    files = sorted(f for f in os.listdir(store_dir) if f.endswith('.parquet') and f.split('.')[0].isdigit())
+    split = is_split(output_dir, athlete)
+    set_names = pq.read_schema(os.path.join(store_dir, files[0])).names if files else []
+    names = set_names
+    if split:
+        text_columns = {v: k for k, v in NOTE_COLUMNS.items()}
+        prescription_names = pq.read_schema(os.path.join(store_dir, PRESCRIPTIONS_FILE)).names
+        names = [text_columns.get(c, c) for c in prescription_names] + set_names
+    if columns is not None and files:
+        columns = [c for c in columns if c in names]
+    filters = None
+    if weeks is not None:
+        weeks = [str(w) for w in weeks]
+        years = {w.split('_')[0] for w in weeks}
+        files = [f for f in files if f.split('.')[0] in years]
+        filters = [('Week', 'in', weeks)]
+    if not files:
+        return pd.DataFrame(columns=columns or STORE_COLUMNS)
+    set_columns = columns
+    if split:
+        # The Week, like every sheet column, comes from the prescriptions
+        set_columns = ['Prescription'] + [c for c in set_names if c not in ('Week', 'Prescription') and (columns is None or c in columns)]
+    if filters is None:
+        tables = [pq.ParquetFile(os.path.join(store_dir, f)).read(columns=set_columns) for f in files]
+    else:
+        tables = [pq.read_table(os.path.join(store_dir, f), columns=set_columns, filters=filters) for f in files]
+    df = pa.concat_tables(tables).to_pandas()
+    if split:
+        sheet_columns = [c for c in prescription_names[1:] if columns is None or text_columns.get(c, c) in columns]
+        prescriptions = pq.ParquetFile(os.path.join(store_dir, PRESCRIPTIONS_FILE)).read(columns=['Prescription'] + sheet_columns).to_pandas()
+        notes = None
+        if any(c in text_columns for c in sheet_columns):
+            notes = pq.ParquetFile(os.path.join(store_dir, NOTES_FILE)).read().to_pandas()
+        df = join_facts(df, prescriptions, notes)
+        if columns is not None:
+            df = df[columns]
+    if filters is not None:
+        for col in df.select_dtypes('category').columns:
+            df[col] = df[col].cat.remove_unused_categories()
+    return df
@@ -0,0 +1,142 @@
+import os
+import json
+import argparse
+import datetime
+import numpy as np
+from openpyxl import Workbook
+
+SET_COUNT = 8
+HEADER = ['Day of the Week', 'Category', 'Exercise', 'Variant', 'Reps', 'Sets', 'Notes'] + \
+    [f'Set {i} {kind}' for i in range(1, SET_COUNT + 1) for kind in ('Reps', 'Weight')] + ['Athlete comments']
+# Category -> (exercise names as the coaches write them, typical working weight in kg)
+EXERCISES = {
+    'Snatch': (['Strappo', 'Strappo sosp', 'Strappo no piedi', 'Strappo forza', 'Hang snatch', 'Snatch'], 70),
+    'Clean and Jerk': (['Slancio', 'Girata in piedi + spinta', 'Clean and Jerk'], 90),
+    'Clean': (['Girata sosp', 'Girata in piedi', 'Power clean'], 95),
+    'Jerk': (['Spinte in spaccata', 'Push press', 'Split jerk', 'Spinte dai blocchi'], 95),
+    'Squat': (['Back Squat', 'Front Squat', 'Gambe dietro', 'Gambe avanti'], 120),
+    'Snatch pull': (['Tirate strappo', 'Snatch pull'], 105),
+    'Clean pull': (['Tirate slancio', 'Clean pull', 'Tirate slancio deficit'], 125),
+    'Accessory': (['Stacchi rumeni', 'Romanian deadlift', 'Routine schiena', 'Caricamenti'], 50),
+}
+# Spellings that show up in the real workbooks, used for a few percent of the rows
+CATEGORY_VARIANTS = {
+    'Snatch': ['Snatch ', 'snatch'],
+    'Clean and Jerk': ['Clean and jerk', 'Clean & jerk'],
+    'Squat': ['Squat ', 'squat'],
+    'Snatch pull': ['Snatch Pull'],
+    'Clean pull': ['Clean Pull'],
+    'Accessory': ['accessory', 'Accssory'],
+}
+VARIANTS = ['1 + 1', '1 + 1 + 1', 'con stop sopra ginocchio', 'below the knee', 'with pause in the dip', 'deficit']
+NOTES = ['Segui il numero di serie esatte per tutti gli esercizi.', '1 + 1 - 85 kg', 'Seach for some load increments when reps are the same.']
+# Paragraphs of the 'NOTES:'/'Notation:' rows closing every sheet; the real workbooks put them in the Exercise column
+SHEET_NOTES = {
+    'NOTES:': 'Se hai commenti lasciali nelle caselle qui di lato oppure vicino agli esercizi. Userò i tuoi commenti per orientarmi sulla settimana successiva.',
+    'Notation:': 'Considera il numero di serie degli esercizi fondamentali con un margine di errore di uno; segui il numero di serie esatte per gli altri.',
+}
+COMMENTS = ['Schiena ok', 'Felt heavy today', 'Ginocchio un po\' dolorante', 'Good session']
+FIRST_NAMES = ['Alessio', 'Costanza', 'Daniele', 'Giulia', 'Jakob', 'Klara', 'Paola', 'Simone', 'Sofia', 'Valentina']
+LAST_NAMES = ['Bianchi', 'Martorelli', 'Conca', 'Pavese', 'Håkansson', 'Skärskog', 'Cascone', 'Ferro', 'Tralli', 'Cesaroni']
+DAYS = 6
+ROWS_PER_DAY = 4
+FIRST_WEEK = (2024, 1)
+
+
+def athlete_names(count):
+    """Deterministic, unique athlete names (first x last name combinations, numbered beyond 100)."""
+    n = len(FIRST_NAMES)
+    names = [f"{FIRST_NAMES[i % n]} {LAST_NAMES[(i % n + i // n) % n]}" for i in range(n * n)]
+    return [names[i % len(names)] + (f" {i // len(names) + 1}" if i >= len(names) else '') for i in range(count)]
+
+
+def week_names(count, first_week=FIRST_WEEK):
+    """Consecutive ISO week codes ('2024_01', '2024_02', ...) as used for the workbook file names."""
+    monday = datetime.date.fromisocalendar(first_week[0], first_week[1], 1)
+    names = []
+    for _ in range(count):
+        year, week, _ = monday.isocalendar()
+        names.append(f"{year}_{week:02d}")
+        monday += datetime.timedelta(days=7)
+    return names
+
+
+def sheet_rows(rng, strength):
+    """Rows of one athlete sheet: ROWS_PER_DAY rows per day (blank on rest days) and the notes footer."""
+    categories = list(EXERCISES)
+    rows = []
+    training_days = set(rng.choice(np.arange(1, DAYS + 1), size=rng.integers(3, DAYS), replace=False).tolist())
+    for day in range(1, DAYS + 1):
+        exercises = rng.integers(2, ROWS_PER_DAY + 1) if day in training_days else 0
+        for slot in range(ROWS_PER_DAY):
+            if slot >= exercises:
+                rows.append([day] + [None] * (len(HEADER) - 1))
+                continue
+            category = categories[rng.integers(len(categories))]
+            names, base_weight = EXERCISES[category]
+            written = category
+            if category in CATEGORY_VARIANTS and rng.random() < 0.05:
+                written = CATEGORY_VARIANTS[category][rng.integers(len(CATEGORY_VARIANTS[category]))]
+            reps = int(rng.integers(1, 6))
+            sets = int(rng.integers(3, 7))
+            row = [day, written, names[rng.integers(len(names))],
+                   VARIANTS[rng.integers(len(VARIANTS))] if rng.random() < 0.1 else None,
+                   reps, sets, NOTES[rng.integers(len(NOTES))] if rng.random() < 0.15 else None]
+            # Sets beyond the prescription stay empty; a few prescribed ones are skipped or missed
+            top = base_weight * strength * rng.uniform(0.7, 0.95)
+            for i in range(SET_COUNT):
+                if i >= sets or rng.random() < 0.05:
+                    row += [None, None]
+                    continue
+                done = reps if rng.random() > 0.08 else int(rng.integers(0, reps))
+                row += [done, round(top * (0.9 + 0.1 * min(i, 3) / 3) * 2) / 2]
+            row.append(COMMENTS[rng.integers(len(COMMENTS))] if rng.random() < 0.05 else None)
+            rows.append(row)
+    for label, text in SHEET_NOTES.items():
+        rows.append([label, None, text] + [None] * (len(HEADER) - 3))
+    return rows
+
+
+def write_workbook(path, athletes, rng, strengths):
+    workbook = Workbook(write_only=True)
+    for athlete in athletes:
+        worksheet = workbook.create_sheet(athlete)
+        worksheet.append(HEADER)
+        for row in sheet_rows(rng, strengths[athlete]):
+            worksheet.append(row)
+    workbook.save(path)
+
+
+def generate_archive(raw_dir, athletes, weeks, seed=0):
+    """Write `weeks` weekly workbooks with one sheet per athlete into raw_dir, deterministically for a seed.
+
+    Reuses the archive when raw_dir already holds one generated with the same parameters.
+    """
+    params = {'athletes': athletes, 'weeks': weeks, 'seed': seed}
+    marker = os.path.join(raw_dir, '_synthetic.json')
+    if os.path.exists(marker):
+        with open(marker, encoding='utf-8') as f:
+            if json.load(f) == params:
+                return
+    os.makedirs(raw_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    names = athlete_names(athletes)
+    strengths = {name: rng.uniform(0.6, 1.4) for name in names}
+    for week in week_names(weeks):
+        write_workbook(os.path.join(raw_dir, f"{week}.xlsx"), names, rng, strengths)
+    with open(marker, 'w', encoding='utf-8') as f:
+        json.dump(params, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic weekly training workbooks.")
+    parser.add_argument('raw_dir', help="Directory to write the <year>_<week>.xlsx workbooks to.")
+    parser.add_argument('--athletes', type=int, default=10)
+    parser.add_argument('--weeks', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate_archive(args.raw_dir, args.athletes, args.weeks, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import aggregator
+import store
+import synthetic_workbooks
+
+ATHLETES = 3
+WEEKS = 5
+
+
+@pytest.fixture(scope='session')
+def synthetic_raw(tmp_path_factory):
+    """A small synthetic archive: ATHLETES athletes over WEEKS weekly workbooks."""
+    raw_dir = str(tmp_path_factory.mktemp('raw'))
+    synthetic_workbooks.generate_archive(raw_dir, ATHLETES, WEEKS, seed=1)
+    return raw_dir
+
+
+@pytest.fixture(scope='session')
+def synthetic_output(synthetic_raw, tmp_path_factory):
+    """Full aggregator output of the synthetic archive; tests must not change it."""
+    output_dir = str(tmp_path_factory.mktemp('out'))
+    aggregator.run_full(synthetic_raw, output_dir)
+    return output_dir
+
+
+@pytest.fixture(scope='session')
+def athlete_rows(synthetic_raw):
+    """(athlete, flat rows as CSV strings) of the first athlete over the whole archive, as a full run writes them."""
+    parts = {}
+    for file, athlete, df in aggregator.iter_parsed(synthetic_raw, aggregator.list_week_files(synthetic_raw)):
+        parts.setdefault(athlete, []).append(aggregator.as_csv_strings(df))
+    athlete = sorted(parts)[0]
+    return athlete, pd.concat(parts[athlete], ignore_index=True).fillna('')
+
+
+@pytest.fixture(scope='session')
+def store_frame(athlete_rows, tmp_path_factory):
+    """The typed store frame of athlete_rows, which the derived tables are built from."""
+    athlete, rows = athlete_rows
+    return store.write_athlete(str(tmp_path_factory.mktemp('store')), athlete, rows)
@@ -0,0 +1,152 @@
+import os
+import re
+import shutil
+import pandas as pd
+
+import aggregator
+import athlete_index
+import records
+import set_arrays
+import sessions
+import synthetic_workbooks
+import training_db
+from conftest import ATHLETES, WEEKS
+
+
+def copy_archive(raw_dir, target, skip=()):
+    """Copy the weekly workbooks of raw_dir, except `skip`, into a new directory."""
+    os.makedirs(target)
+    for file in aggregator.list_week_files(raw_dir):
+        if file not in skip:
+            shutil.copy2(os.path.join(raw_dir, file), target)
+    return str(target)
+
+
+def full_build(raw_dir, output_dir):
+    aggregator.run_full(raw_dir, str(output_dir))
+    return str(output_dir)
+
+
+def snapshot(output_dir):
+    """{name: content} of everything an aggregator run leaves in output_dir, in comparable form."""
+    tables = {}
+    for root, dirs, files in os.walk(output_dir):
+        dirs[:] = [d for d in dirs if d != set_arrays.ARRAYS_DIR]
+        for file in files:
+            path = os.path.join(root, file)
+            name = os.path.relpath(path, output_dir)
+            if file.endswith('.csv'):
+                # Versions count an athlete's rewrites, which differ between an update and a full build
+                table = pd.read_csv(path, dtype=str, keep_default_na=False)
+                tables[re.sub(r'\.\d+\.csv$', '.csv', name)] = table.drop(columns='Version', errors='ignore')
+            elif file.endswith('.parquet'):
+                tables[name] = pd.read_parquet(path)
+    tables[athlete_index.INDEX_FILE] = athlete_index.load_index(output_dir)
+    manifest = aggregator.load_manifest(output_dir)
+    tables[aggregator.MANIFEST_FILE] = {file: entry['rows'] for file, entry in manifest['files'].items()}
+    # Row ids of the database depend on the order athletes were written in
+    db_sets = training_db.query(output_dir, "SELECT * FROM sets")
+    columns = [c for c in db_sets.columns if not c.endswith('_Id')]
+    tables[training_db.DB_FILE] = db_sets[columns].sort_values(columns, ignore_index=True)
+    current = set_arrays.load_current(output_dir)
+    arrays = set_arrays.SetArrays(output_dir, current)
+    for athlete in current['athletes']:
+        tables[f"{set_arrays.ARRAYS_DIR}/{athlete}"] = arrays.athlete_frame(athlete)
+    return tables
+
+
+def assert_same_snapshots(actual, expected):
+    assert sorted(actual) == sorted(expected)
+    for name, table in expected.items():
+        if isinstance(table, pd.DataFrame):
+            pd.testing.assert_frame_equal(actual[name], table, obj=name)
+        else:
+            assert actual[name] == table, name
+
+
+def assert_same_outputs(output_dir, expected_dir):
+    assert_same_snapshots(snapshot(output_dir), snapshot(expected_dir))
+
+
+def test_full_build_writes_every_athlete(synthetic_raw, tmp_path):
+    output_dir = full_build(synthetic_raw, tmp_path / 'out')
+    index = athlete_index.load_index(output_dir)
+    assert sorted(index) == sorted(synthetic_workbooks.athlete_names(ATHLETES))
+    for athlete, entry in index.items():
+        assert len(entry['weeks']) == WEEKS
+        assert sessions.has_sessions(output_dir, athlete)
+        paths = aggregator.athlete_csv_paths(output_dir, athlete)
+        assert len(paths) == 3 and all(os.path.exists(p) for p in paths)
+
+
+def test_parallel_build_matches_serial(synthetic_raw, tmp_path):
+    expected = snapshot(full_build(synthetic_raw, tmp_path / 'serial'))
+    # With more workers than workbooks the sheets are the unit of work
+    for workers in (2, WEEKS + 1):
+        output_dir = str(tmp_path / f'workers_{workers}')
+        aggregator.run_full(synthetic_raw, output_dir, workers)
+        assert_same_snapshots(snapshot(output_dir), expected)
+
+
+def test_added_week_matches_full_rebuild(synthetic_raw, tmp_path):
+    last = aggregator.list_week_files(synthetic_raw)[-1]
+    raw_dir = copy_archive(synthetic_raw, tmp_path / 'raw', skip=[last])
+    output_dir = full_build(raw_dir, tmp_path / 'out')
+    shutil.copy2(os.path.join(synthetic_raw, last), raw_dir)
+    aggregator.run_incremental(raw_dir, output_dir)
+    assert_same_outputs(output_dir, full_build(raw_dir, tmp_path / 'expected'))
+
+
+def test_removed_week_matches_full_rebuild(synthetic_raw, tmp_path):
+    raw_dir = copy_archive(synthetic_raw, tmp_path / 'raw')
+    output_dir = full_build(raw_dir, tmp_path / 'out')
+    os.remove(os.path.join(raw_dir, aggregator.list_week_files(raw_dir)[1]))
+    aggregator.run_incremental(raw_dir, output_dir)
+    assert_same_outputs(output_dir, full_build(raw_dir, tmp_path / 'expected'))
+
+
+def test_modified_week_matches_full_rebuild(synthetic_raw, tmp_path):
+    raw_dir = copy_archive(synthetic_raw, tmp_path / 'raw')
+    output_dir = full_build(raw_dir, tmp_path / 'out')
+    other_dir = str(tmp_path / 'other')
+    synthetic_workbooks.generate_archive(other_dir, ATHLETES, WEEKS, seed=2)
+    week = aggregator.list_week_files(raw_dir)[2]
+    shutil.copy(os.path.join(other_dir, week), raw_dir)
+    aggregator.run_incremental(raw_dir, output_dir)
+    assert_same_outputs(output_dir, full_build(raw_dir, tmp_path / 'expected'))
+
+
+def test_outdated_athlete_is_rebuilt_with_added_week(synthetic_raw, tmp_path):
+    last = aggregator.list_week_files(synthetic_raw)[-1]
+    raw_dir = copy_archive(synthetic_raw, tmp_path / 'raw', skip=[last])
+    output_dir = full_build(raw_dir, tmp_path / 'out')
+    athlete = synthetic_workbooks.athlete_names(ATHLETES)[0]
+    # Tables built with other normalization rules must be rebuilt from every set, not extended
+    index = athlete_index.load_index(output_dir)
+    index[athlete]['normalization'] = 'outdated'
+    athlete_index.save_index(output_dir, index)
+    records.write_records(output_dir, athlete, records.read_records(output_dir, athlete).iloc[:0])
+    shutil.copy2(os.path.join(synthetic_raw, last), raw_dir)
+    aggregator.run_incremental(raw_dir, output_dir)
+    assert_same_outputs(output_dir, full_build(raw_dir, tmp_path / 'expected'))
+
+
+def test_flat_csv_is_split(synthetic_raw, tmp_path):
+    output_dir = full_build(synthetic_raw, tmp_path / 'out')
+    athlete = synthetic_workbooks.athlete_names(ATHLETES)[0]
+    sets_path, prescriptions_path, notes_path = aggregator.athlete_csv_paths(output_dir, athlete)
+    # The layout before the set rows were split from the prescriptions and notes
+    aggregator.read_athlete_csv(output_dir, athlete).to_csv(sets_path, index=False)
+    os.remove(prescriptions_path)
+    os.remove(notes_path)
+    aggregator.run_incremental(synthetic_raw, output_dir)
+    assert_same_outputs(output_dir, full_build(synthetic_raw, tmp_path / 'expected'))
+
+
+def test_unchanged_archive_is_left_alone(synthetic_raw, tmp_path, capsys):
+    output_dir = full_build(synthetic_raw, tmp_path / 'out')
+    before = snapshot(output_dir)
+    capsys.readouterr()
+    aggregator.run_incremental(synthetic_raw, output_dir)
+    assert "No new or modified workbooks." in capsys.readouterr().out
+    assert_same_snapshots(snapshot(output_dir), before)
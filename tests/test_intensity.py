@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+import intensity
+
+
+def test_intensity_is_against_the_best_estimate_so_far():
+    sets = pd.DataFrame({
+        'Week': ['2024_01', '2024_01', '2024_02', '2024_03', '2024_03'],
+        'Day of the Week': ['1', '1', '2', '1', '1'],
+        'Exercise': ['Strappo'] * 5,
+        'Set_Reps': [3, 1, 1, 0, 2],
+        'Set_Weight': [90.0, 95.0, 80.0, 100.0, 105.0],
+    })
+    out = intensity.add_intensity_columns(sets, formula='epley')
+    np.testing.assert_allclose(out['E1RM'], [99.0, 95.0, 80.0, np.nan, 112.0])
+    # The best estimate includes the set's own session, never later ones; a missed lift has none
+    np.testing.assert_allclose(out['E1RM_Best'], [99.0, 99.0, 99.0, np.nan, 112.0])
+    np.testing.assert_allclose(out['E1RM_Intensity'], [90 / 99, 95 / 99, 80 / 99, np.nan, 105 / 112])
+    assert out['Intensity_Zone'].astype(object).tolist()[:3] == ['90%+', '90%+', '80-89%']
+
+
+def test_intensity_does_not_look_at_later_weeks(store_frame):
+    weeks = store_frame['Week'].astype(str)
+    full = intensity.add_intensity_columns(store_frame)
+    for week in sorted(weeks.unique()):
+        part = store_frame[weeks <= week]
+        pd.testing.assert_frame_equal(intensity.add_intensity_columns(part), full[weeks <= week])
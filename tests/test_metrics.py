@@ -0,0 +1,116 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+import aggregator
+import metrics
+
+
+def loop_row_metrics(data):
+    """The per-row loops the viewer used before metrics.py, one metric at a time."""
+    rows = []
+    for _, row in data.iterrows():
+        planned_sets = row.get('Sets', 0)
+        completed_sets = sum(pd.notna(row.get(f'Set {i} Reps')) for i in range(1, 9))
+        done = [i for i in range(1, 9) if pd.notna(row.get(f'Set {i} Reps'))]
+        both = [i for i in done if pd.notna(row.get(f'Set {i} Weight'))]
+        lifted = [i for i in both if row[f'Set {i} Reps'] > 0]
+        lifted_weight = sum((row[f'Set {i} Reps'] or 0) * (row[f'Set {i} Weight'] or 0) for i in lifted)
+        lifted_reps = sum((row[f'Set {i} Reps'] or 0) for i in lifted)
+        average_load = lifted_weight / lifted_reps if lifted_reps else np.nan
+        rows.append({
+            'Adherence': completed_sets / planned_sets if planned_sets > 0 else 0,
+            'Total Volume': sum((row[f'Set {i} Reps'] or 0) * (row[f'Set {i} Weight'] or 0) for i in both),
+            'Missed Lifts': sum(max(0, (row.get('Reps', 0) or 0) - (row[f'Set {i} Reps'] or 0)) for i in done),
+            'Total_Executed_Sets': completed_sets,
+            'Executed Reps': sum(row[f'Set {i} Reps'] or 0 for i in done),
+            'Total Lifted Weight': lifted_weight,
+            'Total Reps': lifted_reps,
+            'Total Executed Sets': len(lifted),
+            'Average Load': 0 if pd.isna(average_load) else average_load,
+            'Max Weight': max([(row[f'Set {i} Weight'] or 0) for i in lifted] or [0]),
+        })
+    return pd.DataFrame(rows, index=data.index)
+
+
+def loop_category_metrics(data, categories):
+    """calculate_all_category_metrics() before metrics.py."""
+    data = data.join(loop_row_metrics(data)[['Total_Executed_Sets', 'Missed Lifts']])
+    out = []
+    for category in categories:
+        category_data = data[data['Category'] == category]
+        total_prescribed_sets = category_data['Sets'].sum()
+        total_lifted_weight = sum(
+            sum((row[f'Set {i} Reps'] or 0) * (row[f'Set {i} Weight'] or 0)
+                for i in range(1, 9)
+                if pd.notna(row[f'Set {i} Reps']) and pd.notna(row[f'Set {i} Weight']))
+            for _, row in category_data.iterrows()
+        )
+        total_reps = sum(
+            sum(row[f'Set {i} Reps'] or 0 for i in range(1, 9) if pd.notna(row[f'Set {i} Reps']))
+            for _, row in category_data.iterrows()
+        )
+        average_load = round(total_lifted_weight / total_reps, 2) if total_reps > 0 else 0
+        out.append({
+            'Category': category,
+            'Total Prescribed Sets': round(total_prescribed_sets, 2),
+            'Total Executed Sets': round(category_data['Total_Executed_Sets'].sum(), 2),
+            'Total Missed Lifts': round(category_data['Missed Lifts'].sum(), 2),
+            'Average Load Lifted': round(average_load, 2) if total_prescribed_sets > 0 else 0,
+        })
+    return pd.DataFrame(out)
+
+
+def loop_best_lift(category_data):
+    """The heaviest successful lift of calculate_personal_records() before metrics.py."""
+    max_weight, exercise_name = 0, None
+    for _, row in category_data.iterrows():
+        weights = [row.get(f'Set {i} Weight', 0) for i in range(1, 9)
+                   if pd.notna(row.get(f'Set {i} Weight')) and pd.notna(row.get(f'Set {i} Reps')) and row.get(f'Set {i} Reps') > 0]
+        if weights and max(weights) > max_weight:
+            max_weight, exercise_name = max(weights), row['Exercise']
+    return max_weight, exercise_name
+
+
+@pytest.fixture(scope='module')
+def sheets(synthetic_raw):
+    """Every athlete sheet of the synthetic archive, as the viewer reads them."""
+    frames = []
+    for file in aggregator.list_week_files(synthetic_raw):
+        frames.extend(pd.read_excel(os.path.join(synthetic_raw, file), sheet_name=None).values())
+    return frames
+
+
+@pytest.fixture
+def edge_rows():
+    """Missed, weightless, zero-rep and empty rows, and a set prescription of 0."""
+    data = pd.DataFrame({'Category': ['Snatch', 'Snatch', 'Squat', 'Squat', 'Jerk'],
+                         'Exercise': ['Strappo', 'Strappo sosp', 'Back Squat', 'Front Squat', 'Push press'],
+                         'Reps': [3, 2, 5, np.nan, 1], 'Sets': [3, 2, 0, np.nan, 1]})
+    for i in range(1, 9):
+        data[f'Set {i} Reps'] = [3, 0, 5, np.nan, np.nan] if i == 1 else [2, np.nan, 4, np.nan, np.nan] if i == 2 else np.nan
+        data[f'Set {i} Weight'] = [60, 70, np.nan, np.nan, np.nan] if i == 1 else [62.5, np.nan, 100, np.nan, np.nan] if i == 2 else np.nan
+    return data
+
+
+def test_row_metrics_match_loops(sheets, edge_rows):
+    for data in sheets + [edge_rows]:
+        expected = loop_row_metrics(data)
+        pd.testing.assert_frame_equal(metrics.row_metrics(data), expected, check_dtype=False)
+
+
+def test_category_metrics_match_loops(sheets, edge_rows):
+    for data in sheets + [edge_rows]:
+        categories = sorted(data['Category'].dropna().unique()) + ['Category without rows']
+        expected = loop_category_metrics(data, categories)
+        # Summing in another order can round an average ending in 5 the other way
+        pd.testing.assert_frame_equal(metrics.category_metrics(data, categories), expected, check_dtype=False, rtol=0, atol=0.01 + 1e-9)
+
+
+def test_best_lift_matches_loop(sheets, edge_rows):
+    for data in sheets + [edge_rows]:
+        for _, category_data in data.groupby('Category'):
+            weight, label = metrics.best_lift(metrics.row_metrics(category_data)['Max Weight'])
+            exercise = category_data.loc[label, 'Exercise'] if label is not None else None
+            assert (weight, exercise) == loop_best_lift(category_data)
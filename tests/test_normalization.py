@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+
+import normalization
+
+
+def test_canonical_names():
+    canonical = normalization.canonical
+    assert canonical('Category', '  clean &  JERK ') == 'Clean And Jerk'  # Folded alias
+    assert canonical('Category', 'Accessorio') == 'Accessory'
+    assert canonical('Category', 'snatch pull') == 'Snatch Pull'  # Vocabulary, case-folded
+    assert canonical('Category', 'Accssory') == 'Accessory'  # Close enough to a known name
+    assert canonical('Category', 'Accssory', fuzzy=False) == 'Accssory'
+    assert canonical('Category', 'Mobility') == 'Mobility'  # Unknown names are kept, title-cased
+    assert canonical('Exercise', 'gambe  dietro') == 'Back Squat'
+    assert canonical('Exercise', 'strappo sosp') == 'Strappo Sosp'  # No fuzzy matching onto 'Strappo'
+    assert canonical('Category', '   ') is None
+
+
+def test_normalize_keeps_rows_and_missing_values():
+    series = pd.Series(['Snatch ', None, 'snatch', 'Clean & jerk', '', np.nan], index=[5, 6, 7, 8, 9, 10])
+    normalized = normalization.normalize(series, 'Category')
+    assert list(normalized.index) == list(series.index)
+    assert list(normalized.cat.categories) == ['Clean And Jerk', 'Snatch']
+    assert normalized.astype(object).where(normalized.notna(), None).tolist() == ['Snatch', None, 'Snatch', 'Clean And Jerk', None, None]
@@ -0,0 +1,33 @@
+import pandas as pd
+
+import records
+
+
+def sets_frame(rows):
+    """A store frame of (week, day, category, exercise, reps, weight) sets."""
+    return pd.DataFrame(rows, columns=['Week', 'Day of the Week', 'Category', 'Exercise', 'Set_Reps', 'Set_Weight'])
+
+
+def test_history_keeps_sessions_that_beat_the_record():
+    history = records.pr_history(sets_frame([
+        ('2024_01', '1', 'Snatch', 'Strappo', 1, 80.0),
+        ('2024_01', '1', 'Snatch', 'Strappo', 1, 85.0),
+        ('2024_01', '3', 'Snatch', 'Hang snatch', 1, 85.0),  # Ties the category record
+        ('2024_02', '1', 'Snatch', 'Strappo', 2, 80.0),
+        ('2024_02', '2', 'Snatch', 'Strappo', 1, 87.5),
+        ('2024_02', '2', 'Snatch', 'Strappo', 0.5, 90.0),  # Not a whole rep count
+    ]))
+    singles = history[(history['Scope'] == 'Category') & (history['Reps'] == 1)]
+    assert singles['Week'].tolist() == ['2024_01', '2024_02'] and singles['Weight'].tolist() == [85.0, 87.5]
+    assert singles['Previous_Weight'].isna().tolist() == [True, False] and singles['Previous_Weight'].iloc[1] == 85.0
+    assert records.current_records(history).set_index(['Scope', 'Name', 'Reps'])['Weight'].to_dict() == {
+        ('Category', 'Snatch', 1): 87.5, ('Category', 'Snatch', 2): 80.0, ('Exercise', 'Strappo', 1): 87.5,
+        ('Exercise', 'Hang snatch', 1): 85.0, ('Exercise', 'Strappo', 2): 80.0}
+
+
+def test_extended_history_matches_full_history(store_frame):
+    weeks = store_frame['Week'].astype(str)
+    full = records.pr_history(store_frame)
+    for week in sorted(weeks.unique())[1:]:
+        extended = records.extend_history(records.pr_history(store_frame[weeks < week]), store_frame[weeks >= week])
+        pd.testing.assert_frame_equal(extended, full)
@@ -0,0 +1,18 @@
+import sys
+import pytest
+
+import report
+
+
+@pytest.mark.parametrize('week, message', [
+    ('2024_53', "is not a week code"),  # 2024 has 52 ISO weeks
+    ('last', "is not a week code"),
+    ('2023_10', "none of the athletes has data"),
+])
+def test_week_without_data_is_rejected(synthetic_output, tmp_path, monkeypatch, capsys, week, message):
+    monkeypatch.setattr(sys, 'argv', ['report.py', '--aggregated-dir', synthetic_output, '--report-dir', str(tmp_path), '--week', week, '--workers', '1'])
+    with pytest.raises(SystemExit) as exit_info:
+        report.main()
+    assert exit_info.value.code == 2
+    assert message in capsys.readouterr().err
+    assert not list(tmp_path.iterdir())
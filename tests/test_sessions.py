@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+
+import sessions
+
+
+def test_extended_sessions_match_full_table(store_frame):
+    weeks = store_frame['Week'].astype(str)
+    full = sessions.session_table(store_frame)
+    for week in sorted(weeks.unique())[1:]:
+        # An added week, and a week replaced by its new rows
+        added = sessions.extend_sessions(sessions.session_table(store_frame[weeks < week]), store_frame[weeks == week])
+        pd.testing.assert_frame_equal(added, sessions.session_table(store_frame[weeks <= week]))
+        replaced = sessions.extend_sessions(full, store_frame[weeks == week])
+        pd.testing.assert_frame_equal(replaced, full)
+
+
+def test_days_with_text_in_the_rep_cells_are_performed():
+    sheet = pd.DataFrame({'Day of the Week': [1, 1, 2, 3], 'Sets': [3, 2, 4, 3],
+                          'Set 1 Reps': [3, np.nan, 'x', np.nan], 'Set 2 Reps': [np.nan, np.nan, 'fatto', np.nan]})
+    days = sessions.sheet_sessions(sheet)
+    assert days['Performed'].tolist() == [True, True, False]
+    assert days['Prescribed_Sets'].tolist() == [5, 4, 3]
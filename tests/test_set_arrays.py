@@ -0,0 +1,24 @@
+import pandas as pd
+
+import set_arrays
+import store
+
+
+def test_arrays_decode_to_the_store_rows(synthetic_output):
+    current = set_arrays.load_current(synthetic_output)
+    arrays = set_arrays.SetArrays(synthetic_output, current)
+    assert current['athletes'] and not current['excluded']
+    for key in current['athletes']:
+        rows = store.read_athlete(synthetic_output, key, columns=list(set_arrays.ARRAY_DTYPES))
+        rows = rows[rows['Category'].notna()].reset_index(drop=True)
+        assert arrays.has_athlete(key)
+        pd.testing.assert_frame_equal(arrays.athlete_frame(key), rows)
+
+
+def test_unencodable_rows_are_left_to_the_store():
+    rows = pd.DataFrame({'Week': pd.Categorical(['2024_01', '2024_01']), 'Set': pd.array([1, 2], dtype='Int8'),
+                         'Day of the Week': pd.Categorical(['1', '2'])})
+    assert set_arrays.encodable(rows)
+    assert not set_arrays.encodable(rows.assign(**{'Day of the Week': pd.Categorical(['1', 'Day 2'])}))
+    assert not set_arrays.encodable(rows.assign(**{'Day of the Week': pd.Categorical(['1', '02'])}))
+    assert not set_arrays.encodable(rows.assign(Week=pd.Categorical(['2024_01', 'Week 2'])))
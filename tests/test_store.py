@@ -0,0 +1,74 @@
+import os
+import pandas as pd
+
+import aggregator
+import store
+
+
+def test_split_keeps_each_prescription_and_note_once(athlete_rows):
+    _, rows = athlete_rows
+    sets, prescriptions, notes = store.split_facts(rows)
+    assert len(sets) == len(rows)
+    assert len(prescriptions) < len(rows)
+    assert not prescriptions.drop(columns='Prescription').duplicated().any()
+    assert notes['Text'].is_unique and '' not in set(notes['Text'])
+    assert list(sets.columns) == ['Prescription'] + store.SET_COLUMNS
+
+
+def test_csv_round_trip(athlete_rows, tmp_path):
+    athlete, rows = athlete_rows
+    aggregator.write_athlete_csv(str(tmp_path), athlete, rows)
+    pd.testing.assert_frame_equal(aggregator.read_athlete_csv(str(tmp_path), athlete), rows)
+
+
+def test_csv_rewrite_publishes_a_new_version(athlete_rows, tmp_path):
+    athlete, rows = athlete_rows
+    aggregator.write_athlete_csv(str(tmp_path), athlete, rows)
+    first = aggregator.athlete_csv_paths(str(tmp_path), athlete)
+    week = rows[rows['Week'] != rows['Week'].iloc[0]].reset_index(drop=True)
+    aggregator.write_athlete_csv(str(tmp_path), athlete, week)
+    # The tables of the new version are written before the set CSV names it; the old ones go after
+    assert aggregator.csv_versions(str(tmp_path), athlete) == [aggregator.csv_version(str(tmp_path), athlete)] == [2]
+    assert not any(os.path.exists(p) for p in first[1:])
+    pd.testing.assert_frame_equal(aggregator.read_athlete_csv(str(tmp_path), athlete), week)
+
+
+def test_flat_csv_is_still_read(athlete_rows, tmp_path):
+    athlete, rows = athlete_rows
+    rows.to_csv(aggregator.athlete_csv_path(str(tmp_path), athlete), index=False)
+    pd.testing.assert_frame_equal(aggregator.read_athlete_csv(str(tmp_path), athlete), rows)
+
+
+def test_store_round_trip(athlete_rows, tmp_path):
+    athlete, rows = athlete_rows
+    store_df = store.write_athlete(str(tmp_path), athlete, rows)
+    assert store.is_split(str(tmp_path), athlete)
+    back = store.read_athlete(str(tmp_path), athlete)
+    assert list(back.columns) == list(store_df.columns)
+    for col in store_df.columns:
+        pd.testing.assert_series_equal(back[col], store_df[col], check_dtype=False, check_categorical=False)
+    dtypes = back.dtypes.astype(str)
+    assert dtypes['Set'] == 'Int8' and dtypes['Set_Weight'] == 'float64'
+    assert (dtypes[['Reps', 'Sets', 'Set_Reps']] == 'Int16').all()
+    assert (dtypes[['Week', 'Day of the Week', 'Category', 'Exercise']] == 'category').all()
+
+
+def test_counts_that_are_not_whole_numbers_are_missing():
+    counts = store.to_count(pd.Series(['3', '2.0', '0.5', '42.5', '', None, '-1', '40000']), 'Int16')
+    assert counts.tolist() == [3, 2, pd.NA, pd.NA, pd.NA, pd.NA, pd.NA, pd.NA]
+
+
+def test_store_reads_columns_and_weeks(athlete_rows, tmp_path):
+    athlete, rows = athlete_rows
+    store_df = store.write_athlete(str(tmp_path), athlete, rows)
+    week = sorted(store_df['Week'].astype(str).unique())[1]
+    columns = ['Notes', 'Week', 'Set_Weight', 'Exercise']
+    part = store.read_athlete(str(tmp_path), athlete, columns=columns, weeks=[week])
+    expected = store_df[store_df['Week'] == week][columns].reset_index(drop=True)
+    assert list(part.columns) == columns
+    assert list(part['Week'].cat.categories) == [week]
+    for col in columns:
+        pd.testing.assert_series_equal(part[col], expected[col], check_dtype=False, check_categorical=False)
+    # The notes table is only needed for the free-text columns
+    os.remove(os.path.join(store.athlete_store_dir(str(tmp_path), athlete), store.NOTES_FILE))
+    assert len(store.read_athlete(str(tmp_path), athlete, columns=store.VIEW_COLUMNS)) == len(store_df)
@@ -0,0 +1,36 @@
+import threading
+import tracemalloc
+
+import timing
+
+
+def test_memory_tracing_lasts_until_the_last_trace_stops():
+    assert not tracemalloc.is_tracing()
+    started, stop = threading.Event(), threading.Event()
+
+    def other_session():
+        timing.start(memory=True)
+        started.set()
+        stop.wait()
+        timing.stop()
+
+    thread = threading.Thread(target=other_session)
+    thread.start()
+    started.wait()
+    timing.start(memory=True)
+    # The other session stopping its trace must not stop tracing under this one
+    stop.set()
+    thread.join()
+    assert tracemalloc.is_tracing()
+    with timing.span('load'):
+        data = [0] * 100_000
+    trace = timing.stop()
+    assert trace.spans[0]['memory_delta_mb'] > 0 and data
+    assert not tracemalloc.is_tracing()
+
+
+def test_restart_releases_the_previous_trace():
+    timing.start(memory=True)
+    timing.start(memory=True)
+    timing.stop()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,40 @@
+import sqlite3
+import pytest
+
+import athlete_index
+import training_db
+
+
+def test_sets_view_has_every_categorized_set(synthetic_output):
+    index = athlete_index.load_index(synthetic_output)
+    counts = training_db.query(synthetic_output, "SELECT Athlete, COUNT(*) AS Sets FROM sets GROUP BY Athlete")
+    assert sorted(counts['Athlete']) == sorted(index)
+    for name, query in training_db.PRESET_QUERIES.items():
+        assert list(training_db.query(synthetic_output, query).columns), name
+
+
+@pytest.mark.parametrize('sql', [
+    "ATTACH DATABASE 'other.sqlite' AS other",
+    "DELETE FROM prescriptions",
+    "INSERT INTO athletes (Athlete) VALUES ('x')",
+    "CREATE TABLE t (x)",
+    "PRAGMA user_version = 5",
+    "PRAGMA writable_schema = 1",
+    "PRAGMA journal_mode = DELETE",
+])
+def test_read_only_connections_deny_changes(synthetic_output, tmp_path, monkeypatch, sql):
+    monkeypatch.chdir(tmp_path)
+    con = training_db.connect(synthetic_output)
+    try:
+        with pytest.raises(sqlite3.DatabaseError, match='not authorized'):
+            con.execute(sql)
+    finally:
+        con.close()
+    assert not list(tmp_path.iterdir())
+    assert training_db.is_current(synthetic_output)
+
+
+def test_read_only_connections_allow_reads(synthetic_output):
+    assert training_db.query(synthetic_output, "PRAGMA user_version").iloc[0, 0] == training_db.SCHEMA_VERSION
+    assert 'Set_Reps' in set(training_db.query(synthetic_output, "PRAGMA table_info(set_facts)")['name'])
+    assert 'Set_Reps' in set(training_db.query(synthetic_output, "SELECT name FROM pragma_table_info('set_facts')")['name'])
@@ -0,0 +1,48 @@
+import os
+import shutil
+import pytest
+
+import aggregator
+import watcher
+
+
+def test_incomplete_files_are_the_changed_unreadable_ones(synthetic_raw, tmp_path):
+    first, second, third = aggregator.list_week_files(synthetic_raw)[:3]
+    for file in (first, second):
+        shutil.copy2(os.path.join(synthetic_raw, file), tmp_path)
+    # A workbook still being copied: its zip directory, at the end of the file, is missing
+    with open(os.path.join(synthetic_raw, third), 'rb') as f:
+        data = f.read()
+    with open(os.path.join(tmp_path, third), 'wb') as f:
+        f.write(data[:len(data) // 2])
+    previous = watcher.snapshot(str(tmp_path))
+    assert watcher.incomplete_files(str(tmp_path), previous, {}) == [third]
+    # Unchanged since the last ingest: not waited for again
+    assert watcher.incomplete_files(str(tmp_path), previous, previous) == []
+
+
+class Stop(Exception):
+    pass
+
+
+def test_failed_runs_are_retried_with_backoff(synthetic_raw, monkeypatch):
+    clock = [0.0]
+    runs = []
+    results = iter([False, False, True])
+
+    def sleep(seconds):
+        if clock[0] > 500:
+            raise Stop
+        clock[0] += seconds
+
+    def ingest(raw_dir, output_dir, workers):
+        runs.append(clock[0])
+        return next(results)
+
+    monkeypatch.setattr(watcher.time, 'sleep', sleep)
+    monkeypatch.setattr(watcher.time, 'monotonic', lambda: clock[0])
+    monkeypatch.setattr(watcher, 'ingest', ingest)
+    with pytest.raises(Stop):
+        watcher.watch(synthetic_raw, 'unused', poll=1, debounce=5, retry=30)
+    # Caught up at the first poll, then retried after 30 s and 60 s; the folder is not ingested again once it succeeded
+    assert runs == [1, 31, 91]
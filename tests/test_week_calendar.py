@@ -0,0 +1,23 @@
+import pandas as pd
+
+import week_calendar
+
+
+def test_iso_weeks_across_year_boundaries():
+    calendar = week_calendar.week_calendar(['2020_53', '2021_01', '2026_01', '2025_52']).set_index('Week')
+    # 2020 has 53 ISO weeks and its last one ends in 2021; 2026_01 starts in 2025
+    assert calendar.loc['2020_53', 'Start'] == pd.Timestamp('2020-12-28')
+    assert calendar.loc['2020_53', 'End'] == pd.Timestamp('2021-01-03')
+    assert calendar.loc['2021_01', 'Ordinal'] == calendar.loc['2020_53', 'Ordinal'] + 1
+    assert calendar.loc['2026_01', 'Start'] == pd.Timestamp('2025-12-29')
+    assert calendar.loc['2026_01', 'Label'] == '2026 Dec 29th - 2026 Jan 4th'
+    assert calendar.loc['2026_01', 'Ordinal'] == calendar.loc['2025_52', 'Ordinal'] + 1
+    assert calendar.loc['2026_01', 'Season'] == 2026 and calendar.loc['2025_52', 'Block'] == 13
+
+
+def test_codes_that_are_not_iso_weeks():
+    calendar = week_calendar.week_calendar(['2021_53', '2024_00', 'Week 3', ' 2024_02 ']).set_index('Week')
+    assert (calendar.loc[['2021_53', '2024_00', 'Week 3'], 'Ordinal'] == -1).all()
+    assert calendar.loc[['2021_53', '2024_00', 'Week 3'], 'Start'].isna().all()
+    assert calendar.loc['Week 3', 'Label'] == 'Week 3'
+    assert calendar.loc[' 2024_02 ', 'Start'] == pd.Timestamp('2024-01-08')
@@ -0,0 +1,11 @@
+import pandas as pd
+
+import workload
+
+
+def test_extended_workload_matches_full_table(store_frame):
+    weeks = store_frame['Week'].astype(str)
+    full = workload.athlete_workload(store_frame)
+    for week in sorted(weeks.unique())[1:]:
+        extended = workload.extend_workload(workload.athlete_workload(store_frame[weeks < week]), store_frame[weeks >= week])
+        pd.testing.assert_frame_equal(extended, full, rtol=1e-9)
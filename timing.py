@@ -0,0 +1,112 @@
+import json
+import time
+import threading
+import contextlib
+import tracemalloc
+import pandas as pd
+
+_local = threading.local()  # Each Streamlit session runs in its own thread and gets its own trace
+# tracemalloc is process-wide: it runs while any thread's trace records memory
+_memory_lock = threading.Lock()
+_memory_traces = 0
+_started_tracing = False  # Whether tracemalloc was started here rather than already tracing
+
+
+class Trace:
+    """Timing spans recorded on one thread between start() and stop()."""
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.spans = []
+        self.depth = 0
+        self.started = time.perf_counter()
+
+
+def _acquire_memory():
+    """Count a memory trace, starting tracemalloc for the first one."""
+    global _memory_traces, _started_tracing
+    with _memory_lock:
+        if _memory_traces == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _memory_traces += 1
+
+
+def _release_memory():
+    """Uncount a memory trace, stopping tracemalloc after the last one if it was started here."""
+    global _memory_traces, _started_tracing
+    with _memory_lock:
+        _memory_traces -= 1
+        if _memory_traces == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+def start(memory=False):
+    """Start recording spans on this thread; with `memory`, spans also record traced allocation deltas (slower)."""
+    # A run interrupted before stop() leaves its trace behind
+    stop()
+    if memory:
+        _acquire_memory()
+    _local.trace = Trace(memory)
+    return _local.trace
+
+
+def stop():
+    """Stop recording on this thread and return the trace (None if none was started)."""
+    trace = getattr(_local, 'trace', None)
+    _local.trace = None
+    if trace is not None and trace.memory:
+        _release_memory()
+    return trace
+
+
+@contextlib.contextmanager
+def span(name, **fields):
+    """Time a block as a named span of the current trace; a no-op when nothing is being recorded.
+
+    Yields a dict of extra fields for the span record, e.g. `info['rows'] = len(df)`.
+    """
+    trace = getattr(_local, 'trace', None)
+    info = dict(fields)
+    if trace is None:
+        yield info
+        return
+    memory_start = tracemalloc.get_traced_memory()[0] if trace.memory else 0
+    depth = trace.depth
+    trace.depth += 1
+    start_time = time.perf_counter()
+    try:
+        yield info
+    finally:
+        seconds = time.perf_counter() - start_time
+        trace.depth = depth
+        record = {'name': name, 'depth': depth, 'start': round(start_time - trace.started, 6), 'seconds': round(seconds, 6), **info}
+        if trace.memory:
+            record['memory_delta_mb'] = round((tracemalloc.get_traced_memory()[0] - memory_start) / 2**20, 3)
+        trace.spans.append(record)
+
+
+def spans_frame(trace):
+    """Spans of a trace in start order, one row each."""
+    return pd.DataFrame(sorted(trace.spans, key=lambda s: s['start'])) if trace and trace.spans else pd.DataFrame()
+
+
+def summary(trace):
+    """Calls, total/max seconds, rows and memory delta per span name, in order of first use."""
+    spans = spans_frame(trace)
+    if spans.empty:
+        return spans
+    aggregations = {'calls': ('seconds', 'size'), 'total_seconds': ('seconds', 'sum'), 'max_seconds': ('seconds', 'max')}
+    if 'rows' in spans.columns:
+        aggregations['rows'] = ('rows', lambda rows: rows.sum(min_count=1))  # Blank for spans without a row count
+    if 'memory_delta_mb' in spans.columns:
+        aggregations['memory_delta_mb'] = ('memory_delta_mb', 'sum')
+    return spans.groupby('name', sort=False).agg(**aggregations).reset_index()
+
+
+def write_trace(trace, path):
+    """Append the spans of a trace to a JSON-lines file."""
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in sorted(trace.spans, key=lambda s: s['start']):
+            f.write(json.dumps(record, default=str) + '\n')
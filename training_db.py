@@ -0,0 +1,315 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+
+import store
+import rollups
+import records
+import athlete_index
+import week_calendar
+
+DB_FILE = "_training.sqlite"  # Lives in the aggregated output next to the index and manifest
+SCHEMA_VERSION = 2  # Stored as PRAGMA user_version; bump when the tables or views below change
+MASK_BITS = 32  # Prescribed set slots covered by the prescribed-sets view
+# Actions a read-only connection may run: reading tables and views, and the PRAGMAs that only describe the schema
+READ_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+READ_PRAGMAS = {'user_version', 'table_info', 'table_xinfo', 'table_list', 'index_list', 'index_info', 'index_xinfo', 'foreign_key_list'}
+
+TABLES = {
+    'rollup': ['Athlete', 'Week', 'Day', 'Category', 'Exercise', 'Prescribed_Sets', 'Prescribed_Set_Mask', 'Executed_Sets',
+               'Total_Lifted_Weight', 'Total_Reps', 'Max_Weight'],
+    'records': ['Athlete', 'Scope', 'Name', 'Reps', 'Weight', 'Previous_Weight', 'Week', 'Day', 'Category', 'Exercise'],
+}
+# Sets are stored normalized: one small set_facts row per set slot, pointing at its prescription row
+# (the sheet row it was melted from) whose names and texts are ids into the dimension tables. The
+# sets view joins them back into one row per set. Per-athlete rows are replaced athlete by athlete;
+# calendar and category_groups are rebuilt with them and unused dimension rows dropped.
+SCHEMA = """
+CREATE TABLE athletes (Athlete_Id INTEGER PRIMARY KEY, Athlete TEXT UNIQUE);
+CREATE TABLE categories (Category_Id INTEGER PRIMARY KEY, Category TEXT UNIQUE);
+CREATE TABLE exercises (Exercise_Id INTEGER PRIMARY KEY, Exercise TEXT UNIQUE);
+CREATE TABLE notes (Note_Id INTEGER PRIMARY KEY, Text TEXT UNIQUE);
+CREATE TABLE prescriptions (Prescription_Id INTEGER PRIMARY KEY, Athlete_Id INTEGER, Week TEXT, Day TEXT, Category_Id INTEGER,
+                            Exercise_Id INTEGER, Reps REAL, Sets REAL, Variant TEXT, Note_Id INTEGER, Comment_Id INTEGER);
+CREATE INDEX prescriptions_athlete_week ON prescriptions (Athlete_Id, Week);
+CREATE INDEX prescriptions_category ON prescriptions (Category_Id, Athlete_Id, Week);
+CREATE TABLE set_facts (Prescription_Id INTEGER, Set_Number INTEGER, Set_Reps REAL, Set_Weight REAL);
+CREATE INDEX set_facts_prescription ON set_facts (Prescription_Id);
+-- Sheet notes (rows without a category, e.g. 'NOTES:' paragraphs), once per athlete, week and day
+CREATE TABLE week_notes (Athlete_Id INTEGER, Week TEXT, Day TEXT, Note_Id INTEGER);
+CREATE INDEX week_notes_athlete ON week_notes (Athlete_Id, Week);
+CREATE TABLE rollup (Athlete TEXT, Week TEXT, Day TEXT, Category TEXT, Exercise TEXT, Prescribed_Sets INTEGER,
+                     Prescribed_Set_Mask INTEGER, Executed_Sets INTEGER, Total_Lifted_Weight REAL, Total_Reps REAL, Max_Weight REAL);
+CREATE INDEX rollup_athlete_week ON rollup (Athlete, Week, Category);
+CREATE TABLE records (Athlete TEXT, Scope TEXT, Name TEXT, Reps INTEGER, Weight REAL, Previous_Weight REAL, Week TEXT,
+                      Day TEXT, Category TEXT, Exercise TEXT);
+CREATE INDEX records_athlete ON records (Athlete, Scope, Name, Reps);
+CREATE TABLE calendar (Week TEXT PRIMARY KEY, Season INTEGER, Week_Number INTEGER, Start TEXT, End TEXT, Label TEXT,
+                       Ordinal INTEGER, Block INTEGER);
+CREATE TABLE category_groups (Category TEXT, Category_Group TEXT, PRIMARY KEY (Category, Category_Group));
+
+-- One row per set slot with names and texts, like the flat per-athlete files
+CREATE VIEW sets AS
+SELECT a.Athlete, p.Week, p.Day, c.Category, e.Exercise, p.Variant, p.Reps, p.Sets, f.Set_Number, f.Set_Reps, f.Set_Weight,
+       f.Set_Reps * f.Set_Weight AS Volume, n.Text AS Notes, m.Text AS Athlete_Comments
+FROM set_facts f JOIN prescriptions p USING (Prescription_Id) JOIN athletes a USING (Athlete_Id) JOIN categories c USING (Category_Id)
+LEFT JOIN exercises e USING (Exercise_Id) LEFT JOIN notes n ON n.Note_Id = p.Note_Id LEFT JOIN notes m ON m.Note_Id = p.Comment_Id;
+
+-- Same definitions as rollups.category_week_trend, for every athlete, week and (virtual) category;
+-- weeks without rows in a category are absent rather than zero
+CREATE VIEW category_week_trend AS
+WITH grouped AS (
+    SELECT r.*, g.Category_Group FROM rollup r JOIN category_groups g ON g.Category = r.Category
+), slots AS (
+    SELECT Athlete, Week, Day, Category_Group, {slot_sum} AS Prescribed_Sets
+    FROM grouped GROUP BY Athlete, Week, Day, Category_Group
+), prescribed AS (
+    SELECT Athlete, Week, Category_Group, SUM(Prescribed_Sets) AS Total_Prescribed_Sets
+    FROM slots GROUP BY Athlete, Week, Category_Group
+), executed AS (
+    SELECT Athlete, Week, Category_Group, SUM(Executed_Sets) AS Total_Executed_Sets,
+           SUM(Total_Lifted_Weight) AS Total_Lifted_Weight, SUM(Total_Reps) AS Total_Reps, MAX(Max_Weight) AS Max_Weight
+    FROM grouped WHERE Executed_Sets > 0 GROUP BY Athlete, Week, Category_Group
+)
+SELECT p.Athlete, p.Week, p.Category_Group AS Category, p.Total_Prescribed_Sets,
+       COALESCE(e.Total_Executed_Sets, 0) AS Total_Executed_Sets, COALESCE(e.Total_Lifted_Weight, 0) AS Total_Lifted_Weight,
+       COALESCE(e.Total_Reps, 0) AS Total_Reps, COALESCE(e.Max_Weight, 0) AS Max_Weight,
+       CASE WHEN e.Total_Reps > 0 THEN e.Total_Lifted_Weight / e.Total_Reps ELSE 0 END AS Average_Load
+FROM prescribed p LEFT JOIN executed e USING (Athlete, Week, Category_Group);
+
+-- Current record per key; SQLite takes the other columns from the row holding the maximum
+CREATE VIEW current_records AS
+SELECT Athlete, Scope, Name, Reps, MAX(Weight) AS Weight, Week, Exercise FROM records GROUP BY Athlete, Scope, Name, Reps;
+
+-- Heaviest successful set per athlete and category at any rep count (cohort.category_prs)
+CREATE VIEW athlete_prs AS
+SELECT Athlete, Name AS Category, MAX(Weight) AS PR FROM records WHERE Scope = 'Category' GROUP BY Athlete, Name;
+
+-- Successful sets with their load relative to the athlete's category PR and their place in the calendar
+CREATE VIEW set_intensity AS
+SELECT s.*, c.Season, c.Block, c.Ordinal, c.Label, p.PR, s.Set_Weight / p.PR AS Relative_Intensity
+FROM sets s LEFT JOIN athlete_prs p USING (Athlete, Category) LEFT JOIN calendar c USING (Week)
+WHERE s.Set_Reps > 0 AND s.Set_Weight > 0;
+""".format(slot_sum=' + '.join(f"MAX((Prescribed_Set_Mask >> {bit}) & 1)" for bit in range(MASK_BITS)))
+
+# Name -> SQL of the ready-made queries offered in the viewer
+PRESET_QUERIES = {
+    "Snatch volume above 85% of PR per block": """SELECT Athlete, Season, Block, SUM(Volume) AS Volume, SUM(Set_Reps) AS Reps, COUNT(*) AS Sets
+FROM set_intensity
+WHERE Category = 'Snatch' AND Relative_Intensity > 0.85
+GROUP BY Athlete, Season, Block
+ORDER BY Athlete, Season, Block""",
+    "Weekly volume by category": """SELECT Athlete, Week, Category, Total_Lifted_Weight, Total_Executed_Sets, Average_Load, Max_Weight
+FROM category_week_trend
+WHERE Category <> 'Overall'
+ORDER BY Athlete, Week, Category""",
+    "Current 1RM per category": """SELECT Athlete, Name AS Category, Weight, Week, Exercise
+FROM current_records
+WHERE Scope = 'Category' AND Reps = 1
+ORDER BY Athlete, Category""",
+    "Sets per intensity zone": """SELECT Athlete, Category, CAST(Relative_Intensity * 10 AS INTEGER) * 10 AS Zone_Percent, COUNT(*) AS Sets, SUM(Set_Reps) AS Reps
+FROM set_intensity
+WHERE PR IS NOT NULL
+GROUP BY Athlete, Category, Zone_Percent
+ORDER BY Athlete, Category, Zone_Percent""",
+}
+
+
+def db_path(output_dir):
+    return os.path.join(output_dir, DB_FILE)
+
+
+def _read_only_authorizer(action, arg1, arg2, db_name, trigger):
+    # mode=ro keeps the database file unchanged but still allows ATTACH (which creates files) and PRAGMA writes
+    if action in READ_ACTIONS:
+        return sqlite3.SQLITE_OK
+    if action == sqlite3.SQLITE_UPDATE and arg1 == 'sqlite_master':
+        return sqlite3.SQLITE_OK  # Reported when pragma table-valued functions load the schema; writing it needs writable_schema
+    if action == sqlite3.SQLITE_PRAGMA and arg1.lower() in READ_PRAGMAS:
+        # The schema PRAGMAs take a table or index name; user_version is only read without a value
+        return sqlite3.SQLITE_OK if arg2 is None or arg1.lower() != 'user_version' else sqlite3.SQLITE_DENY
+    return sqlite3.SQLITE_DENY
+
+
+def connect(output_dir, read_only=True):
+    """Connection to the training database; read-only unless asked, so ad-hoc queries cannot change anything."""
+    if read_only:
+        uri = 'file:' + os.path.abspath(db_path(output_dir)).replace('\\', '/') + '?mode=ro'
+        con = sqlite3.connect(uri, uri=True)
+        con.set_authorizer(_read_only_authorizer)
+        return con
+    return sqlite3.connect(db_path(output_dir))
+
+
+def is_current(output_dir):
+    """Whether the database exists and has the current schema."""
+    if not os.path.exists(db_path(output_dir)):
+        return False
+    con = connect(output_dir)
+    try:
+        return con.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+    finally:
+        con.close()
+
+
+def athlete_tables(output_dir, athlete):
+    """{table: frame} of one athlete's rows, from the store, rollup and PR history files.
+
+    'sets' is still flat here (one row per set slot, with texts); _insert_sets normalizes it.
+    """
+    rows = store.read_athlete(output_dir, athlete, columns=store.VIEW_COLUMNS + ['Notes', 'Athlete comments'])
+    sets = rows[rows['Category'].notna()]
+    sets = pd.DataFrame({
+        'Week': sets['Week'].astype(str).to_numpy(),
+        'Day': sets['Day of the Week'].to_numpy(),
+        'Category': sets['Category'].astype(str).to_numpy(),
+        'Exercise': sets['Exercise'].astype(object).to_numpy(),
+        'Variant': sets['Variant'].to_numpy(),
+        'Reps': sets['Reps'].to_numpy(),
+        'Sets': sets['Sets'].to_numpy(),
+        'Notes': sets['Notes'].to_numpy(),
+        'Athlete_Comments': sets['Athlete comments'].to_numpy(),
+        'Set_Number': sets['Set'].to_numpy(),
+        'Set_Reps': sets['Set_Reps'].to_numpy(),
+        'Set_Weight': sets['Set_Weight'].to_numpy(),
+    })
+    # A sheet note is melted into every set slot like a prescription; keep it once
+    notes = rows[rows['Category'].isna() & rows['Exercise'].notna()]
+    notes = pd.DataFrame({
+        'Week': notes['Week'].astype(str).to_numpy(),
+        'Day': notes['Day of the Week'].to_numpy(),
+        'Text': notes['Exercise'].astype(str).to_numpy(),
+    }).drop_duplicates()
+    rollup = rollups.read_rollup(output_dir, athlete).rename(columns={'Day of the Week': 'Day'}).assign(Athlete=athlete)
+    history = records.read_records(output_dir, athlete).rename(columns={'Day of the Week': 'Day'}).assign(Athlete=athlete)
+    return {'sets': sets, 'week_notes': notes, 'rollup': rollup, 'records': history}
+
+
+def _rows(df):
+    return df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+
+
+def _insert(con, table, df):
+    placeholders = ', '.join('?' * len(TABLES[table]))
+    con.executemany(f"INSERT INTO {table} VALUES ({placeholders})", _rows(df[TABLES[table]]))
+
+
+def _ids(con, table, column, values):
+    """{value: id} in a dimension table, adding the values it does not have yet."""
+    id_column = con.execute(f"SELECT name FROM pragma_table_info('{table}') WHERE pk = 1").fetchone()[0]
+    con.executemany(f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", ((v,) for v in pd.unique(np.asarray(values, dtype=object)) if pd.notna(v)))
+    return dict(con.execute(f"SELECT {column}, {id_column} FROM {table}"))
+
+
+def _insert_sets(con, athlete, sets, notes):
+    """Insert an athlete's flat set rows as prescriptions and set facts, and its sheet notes."""
+    athlete_id = _ids(con, 'athletes', 'Athlete', [athlete])[athlete]
+    note_ids = _ids(con, 'notes', 'Text', pd.concat([sets['Notes'], sets['Athlete_Comments'], notes['Text']]).to_numpy())
+    # Set slots melted from the same sheet row share every prescription column
+    keys = ['Week', 'Day', 'Category', 'Exercise', 'Reps', 'Sets', 'Variant', 'Notes', 'Athlete_Comments']
+    first_id = con.execute("SELECT COALESCE(MAX(Prescription_Id), 0) + 1 FROM prescriptions").fetchone()[0]
+    prescription_ids = sets.groupby(keys, dropna=False, sort=False).ngroup().to_numpy() + first_id
+    prescriptions = sets.assign(Prescription_Id=prescription_ids).drop_duplicates('Prescription_Id')
+    prescriptions = pd.DataFrame({
+        'Prescription_Id': prescriptions['Prescription_Id'].to_numpy(),
+        'Athlete_Id': athlete_id,
+        'Week': prescriptions['Week'].to_numpy(),
+        'Day': prescriptions['Day'].to_numpy(),
+        'Category_Id': prescriptions['Category'].map(_ids(con, 'categories', 'Category', sets['Category'].to_numpy())).to_numpy(),
+        'Exercise_Id': prescriptions['Exercise'].map(_ids(con, 'exercises', 'Exercise', sets['Exercise'].to_numpy())).to_numpy(),
+        'Reps': prescriptions['Reps'].to_numpy(),
+        'Sets': prescriptions['Sets'].to_numpy(),
+        'Variant': prescriptions['Variant'].to_numpy(),
+        'Note_Id': prescriptions['Notes'].map(note_ids).to_numpy(),
+        'Comment_Id': prescriptions['Athlete_Comments'].map(note_ids).to_numpy(),
+    })
+    con.executemany("INSERT INTO prescriptions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", _rows(prescriptions))
+    facts = pd.DataFrame({'Prescription_Id': prescription_ids, 'Set_Number': sets['Set_Number'].to_numpy(),
+                          'Set_Reps': sets['Set_Reps'].to_numpy(), 'Set_Weight': sets['Set_Weight'].to_numpy()})
+    con.executemany("INSERT INTO set_facts VALUES (?, ?, ?, ?)", _rows(facts))
+    notes = pd.DataFrame({'Athlete_Id': athlete_id, 'Week': notes['Week'].to_numpy(), 'Day': notes['Day'].to_numpy(),
+                          'Note_Id': notes['Text'].map(note_ids).to_numpy()})
+    con.executemany("INSERT INTO week_notes VALUES (?, ?, ?, ?)", _rows(notes))
+
+
+def _insert_athlete(con, output_dir, athlete):
+    tables = athlete_tables(output_dir, athlete)
+    _insert_sets(con, athlete, tables['sets'], tables['week_notes'])
+    for table in TABLES:
+        _insert(con, table, tables[table])
+
+
+def _delete_athlete(con, athlete):
+    for table in TABLES:
+        con.execute(f"DELETE FROM {table} WHERE Athlete = ?", (athlete,))
+    athlete_ids = "(SELECT Athlete_Id FROM athletes WHERE Athlete = ?)"
+    con.execute(f"DELETE FROM set_facts WHERE Prescription_Id IN (SELECT Prescription_Id FROM prescriptions WHERE Athlete_Id IN {athlete_ids})", (athlete,))
+    con.execute(f"DELETE FROM prescriptions WHERE Athlete_Id IN {athlete_ids}", (athlete,))
+    con.execute(f"DELETE FROM week_notes WHERE Athlete_Id IN {athlete_ids}", (athlete,))
+
+
+def _refresh_lookups(con):
+    """Rebuild the calendar and category groups from the weeks and categories now in the database, and drop unused dimension rows."""
+    con.execute("DELETE FROM calendar")
+    con.execute("DELETE FROM category_groups")
+    con.execute("DELETE FROM athletes WHERE Athlete_Id NOT IN (SELECT Athlete_Id FROM prescriptions UNION SELECT Athlete_Id FROM week_notes)")
+    con.execute("DELETE FROM categories WHERE Category_Id NOT IN (SELECT Category_Id FROM prescriptions)")
+    con.execute("DELETE FROM exercises WHERE Exercise_Id NOT IN (SELECT Exercise_Id FROM prescriptions WHERE Exercise_Id IS NOT NULL)")
+    con.execute("DELETE FROM notes WHERE Note_Id NOT IN (SELECT Note_Id FROM prescriptions WHERE Note_Id IS NOT NULL "
+                "UNION SELECT Comment_Id FROM prescriptions WHERE Comment_Id IS NOT NULL UNION SELECT Note_Id FROM week_notes)")
+    weeks = [row[0] for row in con.execute("SELECT DISTINCT Week FROM rollup UNION SELECT DISTINCT Week FROM prescriptions")]
+    calendar = week_calendar.week_calendar(weeks)
+    calendar['Start'] = calendar['Start'].dt.strftime('%Y-%m-%d')
+    calendar['End'] = calendar['End'].dt.strftime('%Y-%m-%d')
+    con.executemany("INSERT INTO calendar VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    calendar.astype(object).where(calendar.notna(), None).itertuples(index=False, name=None))
+    categories = pd.Series([row[0] for row in con.execute("SELECT DISTINCT Category FROM rollup WHERE Category IS NOT NULL")], dtype=object)
+    groups = [(category, category) for category in categories]
+    for group in ['Overall', 'Pulls']:
+        groups += [(category, group) for category in categories[rollups.category_mask(categories, group)]]
+    con.executemany("INSERT OR IGNORE INTO category_groups VALUES (?, ?)", groups)
+
+
+def build(output_dir):
+    """Build the database of every indexed athlete from scratch, next to the old one, and swap it in."""
+    path = db_path(output_dir)
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    con = sqlite3.connect(tmp_path)
+    try:
+        con.executescript(SCHEMA)
+        for athlete in sorted(athlete_index.load_index(output_dir) or {}):
+            _insert_athlete(con, output_dir, athlete)
+        _refresh_lookups(con)
+        con.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        con.commit()
+    finally:
+        con.close()
+    os.replace(tmp_path, path)
+
+
+def update(output_dir, athletes):
+    """Replace the rows of some athletes (dropping those without a store any more) in one transaction."""
+    if not is_current(output_dir):
+        return build(output_dir)
+    con = connect(output_dir, read_only=False)
+    try:
+        with con:
+            for athlete in athletes:
+                _delete_athlete(con, athlete)
+                if store.has_athlete(output_dir, athlete):
+                    _insert_athlete(con, output_dir, athlete)
+            _refresh_lookups(con)
+    finally:
+        con.close()
+
+
+def query(output_dir, sql, params=()):
+    """Result of a read-only SQL query as a DataFrame."""
+    con = connect(output_dir)
+    try:
+        return pd.read_sql_query(sql, con, params=params)
+    finally:
+        con.close()
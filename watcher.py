@@ -0,0 +1,106 @@
+import os
+import time
+import zipfile
+import argparse
+import traceback
+
+import aggregator
+
+POLL_SECONDS = 2.0  # How often the raw folder is listed
+DEBOUNCE_SECONDS = 5.0  # The folder must be unchanged this long before ingesting; sync clients write in bursts
+RETRY_SECONDS = 30.0  # Wait after a failed aggregation before the next attempt; doubles with every further failure
+MAX_RETRY_SECONDS = 600.0
+
+
+def snapshot(raw_dir):
+    """{week workbook: (size, mtime_ns)} of the raw folder."""
+    files = {}
+    for file in aggregator.list_week_files(raw_dir):
+        try:
+            st = os.stat(os.path.join(raw_dir, file))
+        except FileNotFoundError:
+            continue  # Renamed or deleted between listing and stat
+        files[file] = (st.st_size, st.st_mtime_ns)
+    return files
+
+
+def incomplete_files(raw_dir, current, previous):
+    """New or changed workbooks that are not readable yet.
+
+    An .xlsx is a zip archive whose directory is written last, so a file still being
+    copied or synced is not a valid zip.
+    """
+    return [f for f, stat in current.items() if previous.get(f) != stat and not zipfile.is_zipfile(os.path.join(raw_dir, f))]
+
+
+def ingest(raw_dir, output_dir, workers):
+    """Run an incremental aggregation; returns False (after logging) if it failed."""
+    try:
+        aggregator.run_incremental(raw_dir, output_dir, workers)
+        return True
+    except Exception:
+        traceback.print_exc()
+        return False
+
+
+def watch(raw_dir, output_dir, workers=1, poll=POLL_SECONDS, debounce=DEBOUNCE_SECONDS, retry=RETRY_SECONDS):
+    """Aggregate new or modified weekly workbooks as they land in raw_dir, until interrupted.
+
+    The folder is polled rather than watched with OS notifications so this also works on
+    synced and network folders. Once a change has settled for `debounce` seconds (and every
+    changed workbook is complete) only the changed workbooks are parsed. Each output file is
+    swapped into place whole, so the viewer never reads a partly written one, but the files of a
+    run are published one after another: until the run ends the viewer can show an athlete's new
+    sets next to tables that are still from the previous run. A run that fails is retried, after
+    `retry` seconds and twice as long after every further failure (up to MAX_RETRY_SECONDS).
+    """
+    print(f"Watching {raw_dir} -> {output_dir}")
+    seen = snapshot(raw_dir)
+    # Nothing ingested yet: catch up on anything that changed while not watching, without waiting for it to settle
+    ingested = None
+    changed_at = time.monotonic() - debounce
+    waiting = []
+    failures = 0
+    retry_at = 0.0
+    while True:
+        time.sleep(poll)
+        current = snapshot(raw_dir)
+        if current != seen:
+            seen, changed_at = current, time.monotonic()
+            continue
+        if current == ingested or time.monotonic() - changed_at < debounce or time.monotonic() < retry_at:
+            continue
+        incomplete = incomplete_files(raw_dir, current, ingested or {})
+        if incomplete:
+            if incomplete != waiting:
+                print(f"Waiting for incomplete workbooks: {', '.join(incomplete)}")
+                waiting = incomplete
+            continue
+        waiting = []
+        print(f"Change detected, aggregating ({time.strftime('%Y-%m-%d %H:%M:%S')})")
+        if ingest(raw_dir, output_dir, workers):
+            ingested, failures = current, 0
+            continue
+        failures += 1
+        delay = min(retry * 2 ** (failures - 1), MAX_RETRY_SECONDS)
+        retry_at = time.monotonic() + delay
+        print(f"Aggregation failed, retrying in {delay:.0f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch the raw data folder and aggregate new or modified weekly workbooks as they arrive.")
+    parser.add_argument('--raw-dir', default=aggregator.RAW_DATA_DIR)
+    parser.add_argument('--output-dir', default=aggregator.OUTPUT_DIR)
+    parser.add_argument('--workers', type=int, default=1, help="Number of worker processes for workbook parsing (1 = serial).")
+    parser.add_argument('--poll', type=float, default=POLL_SECONDS, help="Seconds between folder scans.")
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE_SECONDS, help="Seconds a change must settle before it is ingested.")
+    parser.add_argument('--retry', type=float, default=RETRY_SECONDS, help="Seconds to wait after a failed aggregation before retrying.")
+    args = parser.parse_args()
+    try:
+        watch(args.raw_dir, args.output_dir, args.workers, args.poll, args.debounce, args.retry)
+    except KeyboardInterrupt:
+        print("Stopped.")
+
+
+if __name__ == "__main__":
+    main()
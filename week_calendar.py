@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+BLOCK_WEEKS = 4  # Weeks per training block within a season
+EPOCH_MONDAY = np.datetime64('1970-01-05')  # Ordinals count ISO weeks from this Monday
+CALENDAR_COLUMNS = ['Week', 'Season', 'Week_Number', 'Start', 'End', 'Label', 'Ordinal', 'Block']
+
+
+def day_suffix(days):
+    """'st'/'nd'/'rd'/'th' for an array of day-of-month numbers."""
+    suffix = np.full(days.shape, 'th', dtype=object)
+    last = days % 10
+    regular = (days < 11) | (days > 13)
+    suffix[regular & (last == 1)] = 'st'
+    suffix[regular & (last == 2)] = 'nd'
+    suffix[regular & (last == 3)] = 'rd'
+    return suffix
+
+
+def week_calendar(weeks):
+    """Calendar table for '<ISO year>_<ISO week>' codes, one row per code in the given order.
+
+    Start/End are the Monday and Sunday of the ISO week, Label the display text
+    ('2026 Dec 29th - 2026 Jan 4th' for 2026_01), Ordinal a consecutive week number across years for range
+    filters, Season the ISO year and Block the BLOCK_WEEKS-week block within it. Codes that are not
+    valid ISO weeks keep their text as label and get no dates and an ordinal of -1.
+    """
+    codes = pd.Series([str(w) for w in weeks], dtype=object)
+    parts = codes.str.extract(r'^\s*(\d+)_(\d+)\s*$')
+    year = pd.to_numeric(parts[0]).to_numpy(dtype=float)
+    week = pd.to_numeric(parts[1]).to_numpy(dtype=float)
+    valid = ~np.isnan(year) & ~np.isnan(week) & (week >= 1) & (year >= 1) & (year <= 9999)
+    year = np.where(valid, year, 1970).astype('int64')
+    week = np.where(valid, week, 1).astype('int64')
+
+    # ISO week 1 is the week containing January 4th
+    jan4 = (year - 1970).astype('datetime64[Y]') + np.timedelta64(3, 'D')
+    jan4_weekday = (jan4 - EPOCH_MONDAY).astype('int64') % 7
+    start = jan4 - jan4_weekday + (week - 1) * 7
+    end = start + np.timedelta64(6, 'D')
+    # A week number past the last ISO week of its year is not valid (e.g. 2025_53)
+    next_jan4 = (year + 1 - 1970).astype('datetime64[Y]') + np.timedelta64(3, 'D')
+    valid &= start < next_jan4 - (next_jan4 - EPOCH_MONDAY).astype('int64') % 7
+
+    start_ts = pd.DatetimeIndex(start)
+    end_ts = pd.DatetimeIndex(end)
+    start_str = start_ts.strftime('%b ').to_numpy(dtype=object) + start_ts.day.astype(str).to_numpy(dtype=object) + day_suffix(start_ts.day.to_numpy())
+    end_str = end_ts.strftime('%b ').to_numpy(dtype=object) + end_ts.day.astype(str).to_numpy(dtype=object) + day_suffix(end_ts.day.to_numpy())
+    end_str = np.where(start_ts.year != end_ts.year, end_ts.year.astype(str).to_numpy(dtype=object) + ' ' + end_str, end_str)
+    label = year.astype(str).astype(object) + ' ' + start_str + ' - ' + end_str
+
+    return pd.DataFrame({
+        'Week': codes.to_numpy(),
+        'Season': np.where(valid, year, -1),
+        'Week_Number': np.where(valid, week, -1),
+        'Start': start_ts.where(valid),
+        'End': end_ts.where(valid),
+        'Label': np.where(valid, label, codes.to_numpy()),
+        'Ordinal': np.where(valid, (start - EPOCH_MONDAY).astype('int64') // 7, -1),
+        'Block': np.where(valid, (week - 1) // BLOCK_WEEKS + 1, -1),
+    })[CALENDAR_COLUMNS]
@@ -0,0 +1,141 @@
+import os
+import numpy as np
+import pandas as pd
+
+import store
+import rollups
+import week_calendar
+
+WORKLOAD_DIR = "workload"  # Sub-directory of the aggregated output, one <athlete>.parquet of daily workload per athlete
+ACUTE_DAYS = 7
+CHRONIC_DAYS = 28
+ACUTE_ALPHA = 2 / (ACUTE_DAYS + 1)  # EWMA decay of the acute and chronic loads (Williams et al.)
+CHRONIC_ALPHA = 2 / (CHRONIC_DAYS + 1)
+WORKLOAD_COLUMNS = ['Category', 'Date', 'Week', 'Load', 'Acute_Load', 'Chronic_Load', 'ACWR',
+                    'EWMA_Acute', 'EWMA_Chronic', 'EWMA_ACWR', 'Monotony', 'Strain']
+WORKLOAD_METRICS = WORKLOAD_COLUMNS[3:]
+
+
+def daily_loads(store_df):
+    """Lifted volume (reps x weight of executed sets) per category and calendar day, plus 'Overall'.
+
+    'Day of the Week' is the day within the ISO week (1 = Monday); sets of weeks without a valid
+    week code have no date and are left out.
+    """
+    sets = store_df[store_df['Category'].notna() & (store_df['Set_Reps'] > 0) & store_df['Set_Weight'].notna()]
+    weeks = sets['Week'].astype(str)
+    calendar = week_calendar.week_calendar(weeks.unique()).set_index('Week')
+    day = pd.to_numeric(sets['Day of the Week'], errors='coerce').fillna(1).clip(1, 7).to_numpy(dtype='int64')
+    loads = pd.DataFrame({
+        'Category': sets['Category'].astype(str).to_numpy(),
+        'Date': calendar['Start'].reindex(weeks).to_numpy() + pd.to_timedelta(day - 1, unit='D'),
+        'Load': (sets['Set_Reps'] * sets['Set_Weight']).to_numpy(dtype=float),
+    })
+    loads = loads[loads['Date'].notna()]
+    overall = loads[rollups.category_mask(loads['Category'], 'Overall')].assign(Category='Overall')
+    return pd.concat([loads, overall], ignore_index=True).groupby(['Category', 'Date'], as_index=False)['Load'].sum()
+
+
+def workload_table(loads, previous=None):
+    """Daily rolling workload per category from daily_loads(), optionally continuing a `previous` table.
+
+    Every category runs day by day from its first load to the last day of the latest week.
+    Acute/chronic loads are the 7-day sum and the 28-day sum per week; ACWR their ratio. The EWMA
+    loads decay with ACUTE_ALPHA/CHRONIC_ALPHA. Monotony is the 7-day mean over its standard
+    deviation and strain the 7-day load times monotony. Windows not yet full are left blank.
+
+    With `previous` (a table ending before the first new load) only the new days are computed:
+    the rolling windows are primed with its last 27 days and the EWMAs seeded with its last
+    values, so the result equals a table computed from every load at once.
+    """
+    if loads.empty:
+        return previous if previous is not None else pd.DataFrame({c: pd.Series(dtype='float64') for c in WORKLOAD_COLUMNS})
+    end = loads['Date'].max()
+    end += pd.Timedelta(days=6 - end.weekday())
+    prefix = pd.DataFrame()
+    start = loads.groupby('Category')['Date'].min()
+    if previous is not None and not previous.empty:
+        prefix = previous[previous['Date'] > previous['Date'].max() - pd.Timedelta(days=CHRONIC_DAYS - 1)]
+        # Categories already in the table continue right after it
+        continued = previous.groupby('Category')['Date'].max() + pd.Timedelta(days=1)
+        start = pd.concat([start[~start.index.isin(continued.index)], continued])
+
+    # Continuous days per category: the primed days of `previous`, then zeros except where loaded
+    days = pd.concat([pd.DataFrame({'Category': category, 'Date': pd.date_range(first, end, freq='D')})
+                      for category, first in start.items() if first <= end], ignore_index=True)
+    days = days.merge(loads, on=['Category', 'Date'], how='left').fillna({'Load': 0.0})
+    primed = prefix[['Category', 'Date', 'Load', 'EWMA_Acute', 'EWMA_Chronic']] if not prefix.empty else prefix
+    grid = pd.concat([primed.assign(Primed=True), days.assign(Primed=False)], ignore_index=True)
+    grid = grid.sort_values(['Category', 'Date'], kind='mergesort').reset_index(drop=True)
+
+    group = grid.groupby('Category', sort=False)['Load']
+    acute = group.rolling(ACUTE_DAYS, min_periods=ACUTE_DAYS).sum().droplevel(0)
+    chronic = group.rolling(CHRONIC_DAYS, min_periods=CHRONIC_DAYS).sum().droplevel(0) * ACUTE_DAYS / CHRONIC_DAYS
+    std = group.rolling(ACUTE_DAYS, min_periods=ACUTE_DAYS).std().droplevel(0)
+
+    # EWMAs start at the first day of a category, or continue from the last primed day's value
+    seeded = grid.index.isin(grid[grid['Primed']].groupby('Category', sort=False).tail(1).index)
+    ewma = {}
+    for name, alpha in [('EWMA_Acute', ACUTE_ALPHA), ('EWMA_Chronic', CHRONIC_ALPHA)]:
+        series = grid['Load'].where(~grid['Primed'])
+        if seeded.any():
+            series[seeded] = grid.loc[seeded, name]
+        ewma[name] = series.groupby(grid['Category'], sort=False).ewm(alpha=alpha, adjust=False).mean().droplevel(0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        table = grid.assign(
+            Acute_Load=acute,
+            Chronic_Load=chronic,
+            ACWR=(acute / chronic).where(chronic > 0),
+            EWMA_Acute=ewma['EWMA_Acute'],
+            EWMA_Chronic=ewma['EWMA_Chronic'],
+            EWMA_ACWR=(ewma['EWMA_Acute'] / ewma['EWMA_Chronic']).where(ewma['EWMA_Chronic'] > 0),
+            Monotony=(acute / ACUTE_DAYS / std).where(std > 0),
+        )
+    table['Strain'] = table['Acute_Load'] * table['Monotony']
+    iso = table['Date'].dt.isocalendar()
+    table['Week'] = iso['year'].astype(str) + '_' + iso['week'].astype(str).str.zfill(2)
+    table = table[~table['Primed']][WORKLOAD_COLUMNS]
+    if previous is not None and not previous.empty:
+        table = pd.concat([previous, table], ignore_index=True)
+    return table.sort_values(['Category', 'Date'], kind='mergesort').reset_index(drop=True)
+
+
+def athlete_workload(store_df):
+    """Full daily workload table of an athlete."""
+    return workload_table(daily_loads(store_df))
+
+
+def extend_workload(previous, new_rows):
+    """Extend a workload table with rows from weeks after everything it covers, without recomputing older days."""
+    return workload_table(daily_loads(new_rows), previous)
+
+
+def weekly_workload(table):
+    """The workload at the end (Sunday) of every week: one row per category and week."""
+    return table[table['Date'].dt.weekday == 6].reset_index(drop=True)
+
+
+def workload_path(output_dir, athlete):
+    return os.path.join(output_dir, WORKLOAD_DIR, f"{store.athlete_key(athlete)}.parquet")
+
+
+def has_workload(output_dir, athlete):
+    return os.path.exists(workload_path(output_dir, athlete))
+
+
+def write_workload(output_dir, athlete, table):
+    path = workload_path(output_dir, athlete)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    table.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def remove_workload(output_dir, athlete):
+    if has_workload(output_dir, athlete):
+        os.remove(workload_path(output_dir, athlete))
+
+
+def read_workload(output_dir, athlete):
+    return pd.read_parquet(workload_path(output_dir, athlete))
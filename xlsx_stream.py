@@ -0,0 +1,94 @@
+import zipfile
+import posixpath
+import xml.etree.ElementTree as ET
+import numpy as np
+from openpyxl import load_workbook
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+from pandas.io.parsers import TextParser
+
+REQUIRED_COLUMNS = ['Category', 'Exercise']  # Needed to tell prescription rows from blank ones
+
+
+def convert_cell(cell):
+    """Cell value converted the way pandas' openpyxl reader does it, so frames match pd.read_excel."""
+    if cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return np.nan
+    if cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        if val == cell.value:
+            return val
+        return float(cell.value)
+    return cell.value
+
+
+def trimmed_rows(worksheet):
+    """Lazily yield the worksheet's rows as lists of converted values, without trailing empty cells."""
+    worksheet.reset_dimensions()
+    for row in worksheet.rows:
+        values = [convert_cell(cell) for cell in row]
+        while values and values[-1] == "":
+            values.pop()
+        yield values
+
+
+def sheet_names(file_path):
+    """Sheet names of a workbook, in workbook order, read from its workbook part only.
+
+    Much cheaper than opening the workbook with openpyxl, which also loads the shared strings
+    and styles.
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        workbook_part = 'xl/workbook.xml'
+        # The package relationships name the workbook part; it is xl/workbook.xml in practice
+        for rel in ET.fromstring(archive.read('_rels/.rels')):
+            if rel.get('Type', '').endswith('/officeDocument'):
+                workbook_part = posixpath.normpath(rel.get('Target').lstrip('/'))
+        root = ET.fromstring(archive.read(workbook_part))
+    return [el.get('name') for el in root.iter() if el.tag.rsplit('}', 1)[-1] == 'sheet']
+
+
+def iter_sheets(file_path, names=None):
+    """Yield (sheet name, row iterator) per worksheet (or only the named ones) of a workbook opened in read-only mode.
+
+    Rows are parsed from the file as they are consumed; nothing beyond the current row is held.
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        for name in names or workbook.sheetnames:
+            yield name, trimmed_rows(workbook[name])
+    finally:
+        workbook.close()
+
+
+def missing_columns(header):
+    return [c for c in REQUIRED_COLUMNS if c not in header]
+
+
+def read_sheet(rows):
+    """Build a sheet DataFrame from its rows, the same frame pd.read_excel would return.
+
+    Returns None when the sheet is empty or its header lacks a required column; in the latter
+    case the body of the sheet is never read.
+    """
+    header = None
+    for values in rows:
+        if values:
+            header = values
+            break
+    if header is None:
+        return None
+    if missing_columns(header):
+        raise ValueError(f"missing columns {missing_columns(header)}")
+
+    data = [header]
+    last_row_with_data = 0
+    for values in rows:
+        data.append(values)
+        if values:
+            last_row_with_data = len(data) - 1
+    data = data[:last_row_with_data + 1]
+    width = max(len(values) for values in data)
+    data = [values + [""] * (width - len(values)) for values in data]
+    return TextParser(data, header=0).read()